@@ -0,0 +1,37 @@
+"""Create chat_sessions table
+
+Revision ID: 7b3e91c4a2f6
+Revises: d24f8c0597d5
+Create Date: 2026-10-18 12:00:00.000000
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "7b3e91c4a2f6"
+down_revision = "d24f8c0597d5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "chat_sessions",
+        sa.Column("session_id", sa.String(length=128), primary_key=True, nullable=False),
+        sa.Column("state", sa.String(length=50), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        op.f("ix_chat_sessions_updated_at"),
+        "chat_sessions",
+        ["updated_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_chat_sessions_updated_at"), table_name="chat_sessions")
+    op.drop_table("chat_sessions")
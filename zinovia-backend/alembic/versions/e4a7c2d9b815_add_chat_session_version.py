@@ -0,0 +1,27 @@
+"""Add version to chat_sessions
+
+Revision ID: e4a7c2d9b815
+Revises: 7b3e91c4a2f6
+Create Date: 2026-10-18 18:00:00.000000
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "e4a7c2d9b815"
+down_revision = "7b3e91c4a2f6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "chat_sessions",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("chat_sessions", "version")
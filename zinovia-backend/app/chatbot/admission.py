@@ -0,0 +1,172 @@
+"""
+Admission control for outbound LLM calls.
+
+Caps the number of concurrent completions sent to the model server and queues
+the overflow in priority order with a bounded wait. Visitors who are about to
+hand over contact details are served ahead of DONE-state small talk. When the
+queue is full, or a request waits past its deadline, the call fails fast so
+the router can serve the rule-based fallback instead.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from .llm_client import BaseLLMClient
+from .metrics import LatencyRecorder
+
+# Lower value = served first.
+STATE_PRIORITIES: Dict[str, int] = {
+    "COLLECT_CONTACT_EMAIL": 0,
+    "SUMMARY": 0,
+    "COLLECT_CONTACT_NAME": 1,
+    "SHOW_SERVICES": 1,
+    "GREETING": 2,
+    "ASK_USER_TYPE": 2,
+    "ASK_GOAL": 2,
+    "DONE": 3,
+}
+DEFAULT_PRIORITY = 2
+
+
+class AdmissionRejectedError(HTTPException):
+    def __init__(self, reason: str) -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Language model capacity exhausted ({reason}).",
+        )
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        *,
+        max_in_flight: int = 16,
+        max_queue: int = 64,
+        queue_timeout_seconds: float = 5.0,
+    ) -> None:
+        self._max_in_flight = max_in_flight
+        self._max_queue = max_queue
+        self._queue_timeout = queue_timeout_seconds
+        self._in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self.wait_time = LatencyRecorder()
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, waiter in self._waiters if not waiter.done())
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free and nobody is queued for it; never waits."""
+        if self._in_flight >= self._max_in_flight or self.queue_depth:
+            return False
+        self._in_flight += 1
+        self.admitted += 1
+        return True
+
+    async def acquire(self, priority: int) -> None:
+        if self.try_acquire():
+            self.wait_time.observe(0.0)
+            return
+
+        if self.queue_depth >= self._max_queue:
+            self.rejected_queue_full += 1
+            raise AdmissionRejectedError("queue full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self._queue_timeout)
+        except asyncio.TimeoutError as exc:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over just as the deadline hit; give it back.
+                self.release()
+            else:
+                waiter.cancel()
+            self.rejected_timeout += 1
+            raise AdmissionRejectedError("queue wait deadline exceeded") from exc
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        self.admitted += 1
+        self.wait_time.observe(time.monotonic() - started)
+
+    def release(self) -> None:
+        # Hand the slot directly to the highest-priority live waiter.
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight = max(0, self._in_flight - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self._max_in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue": self._max_queue,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "wait_time": self.wait_time.snapshot(),
+        }
+
+
+class AdmissionLLMClient(BaseLLMClient):
+    """Run every upstream call inside an AdmissionController slot."""
+
+    def __init__(self, inner: BaseLLMClient, controller: AdmissionController) -> None:
+        self._inner = inner
+        self._controller = controller
+
+    @staticmethod
+    def _priority(state: Optional[str]) -> int:
+        return STATE_PRIORITIES.get(state or "", DEFAULT_PRIORITY)
+
+    async def chat(
+        self,
+        system_prompt: str,
+        messages: List[Dict[str, str]],
+        *,
+        state: Optional[str] = None,
+    ) -> str:
+        await self._controller.acquire(self._priority(state))
+        try:
+            return await self._inner.chat(system_prompt, messages, state=state)
+        finally:
+            self._controller.release()
+
+    async def stream_chat(
+        self,
+        system_prompt: str,
+        messages: List[Dict[str, str]],
+        *,
+        state: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        await self._controller.acquire(self._priority(state))
+        try:
+            async for delta in self._inner.stream_chat(system_prompt, messages, state=state):
+                yield delta
+        finally:
+            self._controller.release()
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._inner.stats(), "admission": self._controller.stats()}
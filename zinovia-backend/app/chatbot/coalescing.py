@@ -0,0 +1,129 @@
+"""
+Single-flight coalescing for identical concurrent LLM requests.
+
+When several visitors send the same first message at the same moment, every
+request builds an identical payload. Only the first caller goes upstream; the
+others await the same task and receive the same reply or the same exception.
+A successful result can optionally stay shareable for a short window so
+requests arriving just after completion are collapsed as well.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .llm_client import BaseLLMClient
+
+
+class CoalescingLLMClient(BaseLLMClient):
+    """Share one upstream call between concurrent callers with identical payloads.
+
+    Streaming calls are passed straight through; partial deltas are not shared.
+    """
+
+    def __init__(self, inner: BaseLLMClient, *, window_seconds: float = 0.0) -> None:
+        self._inner = inner
+        self._window = window_seconds
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._recent: Dict[str, Tuple[float, str]] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.shared_errors = 0
+
+    @staticmethod
+    def _request_key(system_prompt: str, messages: List[Dict[str, str]]) -> str:
+        encoded = json.dumps([system_prompt, messages], separators=(",", ":"), sort_keys=True)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def _recent_reply(self, key: str) -> Optional[str]:
+        entry = self._recent.get(key)
+        if entry is None:
+            return None
+        expires_at, reply = entry
+        if expires_at <= time.monotonic():
+            del self._recent[key]
+            return None
+        return reply
+
+    async def chat(
+        self,
+        system_prompt: str,
+        messages: List[Dict[str, str]],
+        *,
+        state: Optional[str] = None,
+    ) -> str:
+        key = self._request_key(system_prompt, messages)
+
+        recent = self._recent_reply(key) if self._window > 0 else None
+        if recent is not None:
+            self.coalesced += 1
+            return recent
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.get_running_loop().create_task(
+                self._inner.chat(system_prompt, messages, state=state)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda finished: self._on_done(key, finished))
+            is_leader = True
+        else:
+            self.coalesced += 1
+            is_leader = False
+
+        try:
+            # Shield so a disconnecting caller does not cancel the call for other waiters.
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if not is_leader:
+                self.shared_errors += 1
+            raise
+
+    def _on_done(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        if self._window > 0:
+            self._prune_recent()
+            self._recent[key] = (time.monotonic() + self._window, task.result())
+
+    def _prune_recent(self) -> None:
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self._recent.items() if expires_at <= now]
+        for key in expired:
+            del self._recent[key]
+
+    async def stream_chat(
+        self,
+        system_prompt: str,
+        messages: List[Dict[str, str]],
+        *,
+        state: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        async for delta in self._inner.stream_chat(system_prompt, messages, state=state):
+            yield delta
+
+    async def aclose(self) -> None:
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._inner.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._inner.stats(),
+            "coalescing": {
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "shared_errors": self.shared_errors,
+                "in_flight": len(self._inflight),
+            },
+        }
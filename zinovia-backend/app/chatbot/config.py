@@ -1,13 +1,27 @@
 from functools import lru_cache
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from pydantic_settings import BaseSettings
 
 
+class LLMEndpointConfig(BaseModel):
+    """One replica in LLM_ENDPOINTS. Unset fields fall back to the LLM_* defaults."""
+
+    model_config = ConfigDict(protected_namespaces=())
+
+    base_url: str
+    name: Optional[str] = None
+    model_name: Optional[str] = None
+    api_path: Optional[str] = None
+    api_key: Optional[str] = None
+    identity_audience: Optional[str] = None
+    weight: float = Field(default=1.0, gt=0)
+
+
 class Settings(BaseSettings):
     app_env: str = Field(default="dev", alias="APP_ENV")
-    llm_api_base_url: str = Field(alias="LLM_API_BASE_URL")
+    llm_api_base_url: Optional[str] = Field(default=None, alias="LLM_API_BASE_URL")
     llm_api_key: Optional[str] = Field(default=None, alias="LLM_API_KEY")
     llm_model_name: str = Field(alias="LLM_MODEL_NAME")
     llm_api_path: str = Field(
@@ -21,14 +35,224 @@ class Settings(BaseSettings):
         alias="LLM_IDENTITY_AUDIENCE",
         description="Optional audience for generating Google Cloud ID tokens when calling a protected Cloud Run LLM service.",
     )
+    llm_identity_refresh_margin_seconds: float = Field(
+        default=300.0,
+        alias="LLM_IDENTITY_REFRESH_MARGIN_SECONDS",
+        description="Refresh cached identity tokens in the background this long before they expire.",
+    )
+    llm_timeout_seconds: float = Field(default=15.0, alias="LLM_TIMEOUT_SECONDS")
+    llm_http2: bool = Field(
+        default=True,
+        alias="LLM_HTTP2",
+        description="Negotiate HTTP/2 with the LLM service when supported (requires the h2 package).",
+    )
+    llm_pool_max_connections: int = Field(default=100, alias="LLM_POOL_MAX_CONNECTIONS")
+    llm_pool_max_keepalive: int = Field(default=20, alias="LLM_POOL_MAX_KEEPALIVE")
+    llm_keepalive_expiry_seconds: float = Field(
+        default=30.0,
+        alias="LLM_KEEPALIVE_EXPIRY_SECONDS",
+        description="Idle time after which pooled keep-alive connections to the LLM service are closed.",
+    )
+    llm_reply_cache_enabled: bool = Field(default=False, alias="LLM_REPLY_CACHE_ENABLED")
+    llm_reply_cache_states: str = Field(
+        default="GREETING,ASK_USER_TYPE,ASK_GOAL",
+        alias="LLM_REPLY_CACHE_STATES",
+        description="Comma-separated onboarding states whose replies may be cached. SUMMARY and DONE are never cached.",
+    )
+    llm_reply_cache_max_entries: int = Field(default=1024, alias="LLM_REPLY_CACHE_MAX_ENTRIES")
+    llm_reply_cache_ttl_seconds: float = Field(default=600.0, alias="LLM_REPLY_CACHE_TTL_SECONDS")
+    llm_coalescing_enabled: bool = Field(
+        default=True,
+        alias="LLM_COALESCING_ENABLED",
+        description="Share one upstream completion between concurrent requests with identical payloads.",
+    )
+    llm_coalescing_window_seconds: float = Field(
+        default=0.0,
+        alias="LLM_COALESCING_WINDOW_SECONDS",
+        description="Keep a completed reply shareable for this long after it returns (0 = in-flight only).",
+    )
+    llm_breaker_enabled: bool = Field(default=True, alias="LLM_BREAKER_ENABLED")
+    llm_breaker_window: int = Field(default=20, alias="LLM_BREAKER_WINDOW")
+    llm_breaker_min_calls: int = Field(default=5, alias="LLM_BREAKER_MIN_CALLS")
+    llm_breaker_failure_rate: float = Field(default=0.5, alias="LLM_BREAKER_FAILURE_RATE")
+    llm_breaker_slow_call_seconds: float = Field(default=8.0, alias="LLM_BREAKER_SLOW_CALL_SECONDS")
+    llm_breaker_slow_call_rate: float = Field(default=0.8, alias="LLM_BREAKER_SLOW_CALL_RATE")
+    llm_breaker_open_seconds: float = Field(
+        default=30.0,
+        alias="LLM_BREAKER_OPEN_SECONDS",
+        description="How long the breaker stays open before allowing half-open probe requests.",
+    )
+    llm_breaker_half_open_calls: int = Field(default=1, alias="LLM_BREAKER_HALF_OPEN_CALLS")
+    llm_adaptive_timeout_enabled: bool = Field(default=True, alias="LLM_ADAPTIVE_TIMEOUT_ENABLED")
+    llm_adaptive_timeout_multiplier: float = Field(default=3.0, alias="LLM_ADAPTIVE_TIMEOUT_MULTIPLIER")
+    llm_adaptive_timeout_min_seconds: float = Field(default=2.0, alias="LLM_ADAPTIVE_TIMEOUT_MIN_SECONDS")
+    llm_hedge_enabled: bool = Field(default=False, alias="LLM_HEDGE_ENABLED")
+    llm_hedge_percentile: float = Field(
+        default=95.0,
+        alias="LLM_HEDGE_PERCENTILE",
+        description="Send a hedged second request once the first exceeds this latency percentile.",
+    )
+    llm_admission_enabled: bool = Field(default=True, alias="LLM_ADMISSION_ENABLED")
+    llm_max_in_flight: int = Field(
+        default=16,
+        alias="LLM_MAX_IN_FLIGHT",
+        description="Maximum concurrent completions sent to the LLM service from this process.",
+    )
+    llm_admission_max_queue: int = Field(default=64, alias="LLM_ADMISSION_MAX_QUEUE")
+    llm_admission_queue_timeout_seconds: float = Field(
+        default=5.0,
+        alias="LLM_ADMISSION_QUEUE_TIMEOUT_SECONDS",
+        description="Longest a queued request waits for an LLM slot before falling back.",
+    )
+    chat_history_token_budget: int = Field(
+        default=1500,
+        alias="CHAT_HISTORY_TOKEN_BUDGET",
+        description="Estimated tokens of recent history (including the latest message) sent verbatim to the LLM.",
+    )
+    chat_summary_token_budget: int = Field(
+        default=300,
+        alias="CHAT_SUMMARY_TOKEN_BUDGET",
+        description="Upper bound for the rolling summary of turns that no longer fit the history budget.",
+    )
+    chat_session_max_sessions: int = Field(
+        default=10_000,
+        alias="CHAT_SESSION_MAX_SESSIONS",
+        description="Sessions kept in memory per process; the least recently used is evicted beyond this.",
+    )
+    chat_session_max_bytes: Optional[int] = Field(
+        default=None,
+        alias="CHAT_SESSION_MAX_BYTES",
+        description="Optional cap on the estimated memory held by all sessions; unset or 0 disables it.",
+    )
+    chat_session_ttl_seconds: float = Field(
+        default=1800.0,
+        alias="CHAT_SESSION_TTL_SECONDS",
+        description="Idle time after which a session expires and the visitor starts over.",
+    )
+    chat_session_sweep_interval_seconds: float = Field(
+        default=60.0,
+        alias="CHAT_SESSION_SWEEP_INTERVAL_SECONDS",
+        description="How often a background task drops expired sessions; 0 leaves expiry to lookups.",
+    )
+    chat_session_backend: str = Field(
+        default="memory",
+        alias="CHAT_SESSION_BACKEND",
+        description="Where sessions live: 'memory' (per process), 'redis' (shared across workers and instances) or 'sql' (the application database, survives restarts).",
+    )
+    chat_session_lock_enabled: bool = Field(
+        default=True,
+        alias="CHAT_SESSION_LOCK_ENABLED",
+        description="Queue concurrent requests for the same session instead of rejecting the later one with 409.",
+    )
+    chat_session_lock_timeout_seconds: float = Field(
+        default=30.0,
+        alias="CHAT_SESSION_LOCK_TIMEOUT_SECONDS",
+        description="How long a request waits for the same session's previous turn before answering 409.",
+    )
+    chat_session_sql_flush_interval_seconds: float = Field(
+        default=1.0,
+        alias="CHAT_SESSION_SQL_FLUSH_INTERVAL_SECONDS",
+        description="How often buffered session writes are flushed to the chat_sessions table.",
+    )
+    chat_session_sql_flush_batch_size: int = Field(
+        default=500,
+        alias="CHAT_SESSION_SQL_FLUSH_BATCH_SIZE",
+        description="Rows per bulk upsert; a full buffer is flushed before the interval elapses.",
+    )
+    chat_session_redis_url: str = Field(default="redis://localhost:6379/0", alias="CHAT_SESSION_REDIS_URL")
+    chat_session_redis_key_prefix: str = Field(default="zinovia:chat:session:", alias="CHAT_SESSION_REDIS_KEY_PREFIX")
+    chat_session_redis_max_connections: int = Field(default=50, alias="CHAT_SESSION_REDIS_MAX_CONNECTIONS")
+    chat_session_redis_timeout_seconds: float = Field(
+        default=1.0,
+        alias="CHAT_SESSION_REDIS_TIMEOUT_SECONDS",
+        description="Connect and command timeout for Redis; a failed load answers 503 instead of hanging.",
+    )
+    llm_endpoints: List[LLMEndpointConfig] = Field(
+        default_factory=list,
+        alias="LLM_ENDPOINTS",
+        description="JSON list of LLM replicas to route between; overrides LLM_API_BASE_URL when set.",
+    )
+    llm_routing_strategy: str = Field(
+        default="ewma",
+        alias="LLM_ROUTING_STRATEGY",
+        description="Endpoint selection: 'ewma' (latency-weighted) or 'least_outstanding'.",
+    )
+    llm_routing_eject_after_failures: int = Field(default=3, alias="LLM_ROUTING_EJECT_AFTER_FAILURES")
+    llm_routing_eject_seconds: float = Field(default=10.0, alias="LLM_ROUTING_EJECT_SECONDS")
+    llm_routing_max_eject_seconds: float = Field(default=120.0, alias="LLM_ROUTING_MAX_EJECT_SECONDS")
 
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
         populate_by_name = True
+        # .env also holds keys read by other settings classes (KNOWLEDGE_*).
+        extra = "ignore"
+
+    @model_validator(mode="after")
+    def _require_llm_endpoint(self) -> "Settings":
+        if not self.llm_api_base_url and not self.llm_endpoints:
+            raise ValueError("Either LLM_API_BASE_URL or LLM_ENDPOINTS must be configured")
+        return self
 
 
 @lru_cache
 def get_settings() -> Settings:
     return Settings()
 
+
+class KnowledgeSettings(BaseSettings):
+    """Knowledge-base settings; kept apart from Settings so retrieval works without LLM configuration."""
+
+    knowledge_base_dir: Optional[str] = Field(
+        default=None,
+        alias="KNOWLEDGE_BASE_DIR",
+        description="Directory of markdown documents to index. Defaults to the bundled app/chatbot/data.",
+    )
+    knowledge_reload_interval_seconds: float = Field(
+        default=5.0,
+        alias="KNOWLEDGE_RELOAD_INTERVAL_SECONDS",
+        description="How often to check documents for changes and re-index them; 0 disables hot reload.",
+    )
+    knowledge_index_path: Optional[str] = Field(
+        default=None,
+        alias="KNOWLEDGE_INDEX_PATH",
+        description="Prebuilt index file shared by workers via mmap. Defaults to a file in the system temp directory.",
+    )
+    knowledge_context_cache_size: int = Field(
+        default=2048,
+        alias="KNOWLEDGE_CONTEXT_CACHE_SIZE",
+        description="Normalized queries whose knowledge excerpt is memoized; cleared on reload. 0 disables.",
+    )
+    knowledge_passage_tokens: int = Field(
+        default=120,
+        alias="KNOWLEDGE_PASSAGE_TOKENS",
+        description="Approximate size of the overlapping passages sections are split into at index time.",
+    )
+    knowledge_passage_overlap_tokens: int = Field(default=30, alias="KNOWLEDGE_PASSAGE_OVERLAP_TOKENS")
+    knowledge_context_token_budget: int = Field(
+        default=400,
+        alias="KNOWLEDGE_CONTEXT_TOKEN_BUDGET",
+        description="Upper bound on the knowledge excerpt packed into the system prompt.",
+    )
+    knowledge_hybrid_enabled: bool = Field(
+        default=False,
+        alias="KNOWLEDGE_HYBRID_ENABLED",
+        description="Blend BM25 with hashed character n-gram similarity to tolerate typos and paraphrases.",
+    )
+    knowledge_lexical_weight: float = Field(default=0.6, alias="KNOWLEDGE_LEXICAL_WEIGHT")
+    knowledge_ngram_match_threshold: float = Field(
+        default=0.35,
+        alias="KNOWLEDGE_NGRAM_MATCH_THRESHOLD",
+        description="Minimum n-gram cosine for a message with no exact term hit to count as a knowledge match.",
+    )
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        populate_by_name = True
+        extra = "ignore"
+
+
+@lru_cache
+def get_knowledge_settings() -> KnowledgeSettings:
+    return KnowledgeSettings()
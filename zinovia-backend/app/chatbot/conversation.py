@@ -0,0 +1,163 @@
+"""
+Compact in-process representation of one onboarding conversation.
+
+Every live session is held in memory between turns, so its per-session
+overhead adds up. ``Conversation`` is a ``__slots__`` object rather than a
+pydantic model. Its history is a ``HistoryRing``: two parallel lists of
+roles and contents that grow up to ``MAX_HISTORY_MESSAGES`` and then wrap
+around, so the oldest message is overwritten in place instead of the list
+being copied every turn. Roles are interned, so all sessions share a single
+``"user"`` and a single ``"assistant"`` string.
+
+``version`` counts successful saves. Stores use it for optimistic
+concurrency: a save is rejected when the stored version is no longer the
+one the conversation was loaded at.
+
+The flow, the prompt builder, history packing and the session stores all
+work on ``Conversation`` directly; the stores serialize it with
+``session_store.dump_session`` / ``load_session``.
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+MAX_HISTORY_MESSAGES = 50
+
+ROLE_USER = sys.intern("user")
+ROLE_ASSISTANT = sys.intern("assistant")
+ROLE_SYSTEM = sys.intern("system")
+_KNOWN_ROLES = {role: role for role in (ROLE_USER, ROLE_ASSISTANT, ROLE_SYSTEM)}
+
+# Fields a flow may read and write.
+PROFILE_FIELDS = ("user_type", "goal", "selected_service", "name", "email")
+
+
+def intern_role(role: str) -> str:
+    known = _KNOWN_ROLES.get(role)
+    return known if known is not None else sys.intern(role)
+
+
+class HistoryRing:
+    """
+    The newest ``capacity`` messages of a conversation.
+
+    Indexing is relative to the oldest retained message; ``offset`` is the
+    absolute index of that message, i.e. how many have been dropped so far.
+    """
+
+    __slots__ = ("_roles", "_contents", "_start", "capacity", "offset")
+
+    def __init__(self, capacity: int = MAX_HISTORY_MESSAGES, offset: int = 0) -> None:
+        if capacity < 1:
+            raise ValueError("History capacity must be at least 1")
+        self._roles: List[str] = []
+        self._contents: List[str] = []
+        self._start = 0
+        self.capacity = capacity
+        self.offset = offset
+
+    def __len__(self) -> int:
+        return len(self._roles)
+
+    @property
+    def full(self) -> bool:
+        return len(self._roles) == self.capacity
+
+    def append(self, role: str, content: str) -> None:
+        """Add a message, overwriting the oldest one once the ring is full."""
+        role = intern_role(role)
+        if len(self._roles) < self.capacity:
+            self._roles.append(role)
+            self._contents.append(content)
+            return
+        self._roles[self._start] = role
+        self._contents[self._start] = content
+        self._start = (self._start + 1) % self.capacity
+        self.offset += 1
+
+    def __getitem__(self, index: int) -> Tuple[str, str]:
+        size = len(self._roles)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("history index out of range")
+        slot = (self._start + index) % size
+        return self._roles[slot], self._contents[slot]
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return self.iter_from(0)
+
+    def iter_from(self, index: int) -> Iterator[Tuple[str, str]]:
+        """Messages from relative ``index`` to the newest, oldest first."""
+        size = len(self._roles)
+        roles, contents = self._roles, self._contents
+        for position in range(max(0, index), size):
+            slot = (self._start + position) % size
+            yield roles[slot], contents[slot]
+
+    def extend(self, messages: Iterable[Tuple[str, str]]) -> None:
+        for role, content in messages:
+            self.append(role, content)
+
+    def copy(self) -> "HistoryRing":
+        ring = HistoryRing(self.capacity, self.offset)
+        ring._roles = self._roles[:]
+        ring._contents = self._contents[:]
+        ring._start = self._start
+        return ring
+
+
+class Conversation:
+    __slots__ = ("state",) + PROFILE_FIELDS + ("summary", "summary_upto", "history", "version")
+
+    def __init__(
+        self,
+        state: str,
+        *,
+        user_type: Optional[str] = None,
+        goal: Optional[str] = None,
+        selected_service: Optional[str] = None,
+        name: Optional[str] = None,
+        email: Optional[str] = None,
+        summary: Optional[str] = None,
+        summary_upto: int = 0,
+        history: Optional[HistoryRing] = None,
+        version: int = 0,
+    ) -> None:
+        self.state = state
+        self.user_type = user_type
+        self.goal = goal
+        self.selected_service = selected_service
+        self.name = name
+        self.email = email
+        self.summary = summary
+        self.summary_upto = summary_upto
+        self.history = history if history is not None else HistoryRing()
+        self.version = version
+
+    @property
+    def history_offset(self) -> int:
+        return self.history.offset
+
+    def copy(self) -> "Conversation":
+        """An independent copy, so concurrent turns never mutate each other's state."""
+        conversation = Conversation.__new__(Conversation)
+        for name in self.__slots__:
+            setattr(conversation, name, getattr(self, name))
+        conversation.history = self.history.copy()
+        return conversation
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Conversation):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__ if name != "history"
+        ) and (self.history.offset, list(self.history)) == (other.history.offset, list(other.history))
+
+    def __repr__(self) -> str:
+        return (
+            f"Conversation(state={self.state!r}, messages={len(self.history)}, "
+            f"offset={self.history.offset}, version={self.version})"
+        )
@@ -0,0 +1,245 @@
+"""
+Declarative onboarding flow.
+
+The flow is data (``onboarding_flow.json``). It defines each state's prompt
+instruction, the next state, and extractors that fill conversation fields
+from the user's message:
+
+- ``text`` stores the stripped message
+- ``pattern`` stores it when it matches a regex
+- ``keywords`` maps whole-word phrases to a value, optionally falling back
+  to a lookup on another field. A phrase also matches its plain plural
+  (``-s`` / ``-es``: "startups", "small businesses"); irregular plurals
+  such as "companies" are listed explicitly
+
+A state advances only when all of its ``required`` extractors succeed. Until
+then nothing is written and the conversation stays put.
+
+The definition is validated and compiled once, at startup, into a transition
+table. All keyword extractors of a state share one regex, built as a trie
+(phrases with a common prefix share its branch), so matching a message is
+one left-to-right scan. Its cost depends on the message length and the
+alphabet, not on how many keywords the flow lists.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import string
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Pattern, Tuple
+
+from .conversation import PROFILE_FIELDS, Conversation
+
+FLOW_PATH = Path(__file__).resolve().parent / "onboarding_flow.json"
+
+EXTRACTOR_TYPES = frozenset({"text", "pattern", "keywords"})
+_WHITESPACE = re.compile(r"\s+")
+
+
+class FlowDefinitionError(ValueError):
+    """Raised when the onboarding flow file is malformed or inconsistent."""
+
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", text.strip().lower())
+
+
+def trie_pattern(phrases: Iterable[str]) -> str:
+    """Regex matching any of ``phrases``, factored into a trie so shared prefixes are tried once."""
+    trie: Dict[str, dict] = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}  # end of a phrase
+    return _trie_node_pattern(trie)
+
+
+def _trie_node_pattern(node: Dict[str, dict]) -> str:
+    branches = [re.escape(char) + _trie_node_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    # Greedy optional: the longest phrase wins, shorter ones are found by backtracking.
+    return f"(?:{body})?" if "" in node else body
+
+
+class KeywordMatcher:
+    """Finds whole-word phrases in a message with a single compiled regex."""
+
+    def __init__(self, targets: Mapping[str, List[Tuple[str, str]]]) -> None:
+        # Normalized phrase -> (field, value) pairs it sets.
+        self._targets = dict(targets)
+        self._pattern = re.compile(rf"(?<!\w)({trie_pattern(self._targets)})(?:e?s)?(?!\w)")
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def match(self, message: str) -> Dict[str, str]:
+        """Value for each field, taken from its leftmost phrase in ``message``."""
+        found: Dict[str, str] = {}
+        for match in self._pattern.finditer(_normalize(message)):
+            for field_name, value in self._targets[match.group(1)]:
+                found.setdefault(field_name, value)
+        return found
+
+
+@dataclass(frozen=True)
+class Extractor:
+    field: str
+    type: str
+    required: bool = False
+    pattern: Optional[Pattern[str]] = None
+    # For ``keywords``: the value to use when no phrase matches, looked up by
+    # the current value of ``fallback_field``.
+    fallback_field: Optional[str] = None
+    fallback: Mapping[str, str] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class FlowState:
+    name: str
+    instruction: str
+    next_state: Optional[str]
+    extractors: Tuple[Extractor, ...] = ()
+    # Combined matcher over every ``keywords`` extractor of the state.
+    matcher: Optional[KeywordMatcher] = None
+    # Conversation fields the instruction interpolates, with their defaults.
+    placeholders: Mapping[str, str] = field(default_factory=dict)
+
+    def render_instruction(self, conversation: Conversation) -> str:
+        if not self.placeholders:
+            return self.instruction
+        values = {
+            name: getattr(conversation, name) or default for name, default in self.placeholders.items()
+        }
+        return self.instruction.format(**values)
+
+    def extract(self, conversation: Conversation, message: str) -> Optional[Dict[str, Optional[str]]]:
+        """Field updates for ``message``, or None if a required extractor found nothing."""
+        stripped = message.strip()
+        matched = self.matcher.match(stripped) if self.matcher is not None else {}
+        updates: Dict[str, Optional[str]] = {}
+        for extractor in self.extractors:
+            value: Optional[str] = None
+            if extractor.type == "text":
+                value = stripped or None
+            elif extractor.type == "pattern":
+                value = stripped if extractor.pattern.match(stripped) else None
+            else:
+                value = matched.get(extractor.field)
+                if value is None and extractor.fallback_field:
+                    value = extractor.fallback.get(getattr(conversation, extractor.fallback_field))
+            if value is None and extractor.required:
+                return None
+            updates[extractor.field] = value
+        return updates
+
+
+class OnboardingFlow:
+    def __init__(self, initial: str, states: Dict[str, FlowState]) -> None:
+        self.initial = initial
+        self.states = states
+        self.transitions: Dict[str, Optional[str]] = {name: state.next_state for name, state in states.items()}
+
+    def advance(self, conversation: Conversation, message: str) -> Tuple[Conversation, bool]:
+        """Apply ``message`` to ``conversation``; returns it and whether the state advanced."""
+        state = self.states[conversation.state]
+        if state.next_state is None:
+            return conversation, False
+        updates = state.extract(conversation, message)
+        if updates is None:
+            return conversation, False
+        for name, value in updates.items():
+            setattr(conversation, name, value)
+        conversation.state = state.next_state
+        return conversation, True
+
+
+def _check_field(name: object, where: str) -> str:
+    if not isinstance(name, str) or name not in PROFILE_FIELDS:
+        raise FlowDefinitionError(f"{where}: {name!r} is not a conversation field the flow may set")
+    return name
+
+
+def _compile_extractor(raw: Mapping[str, object], where: str) -> Extractor:
+    field_name = _check_field(raw.get("field"), where)
+    kind = raw.get("type")
+    if kind not in EXTRACTOR_TYPES:
+        raise FlowDefinitionError(f"{where}: unknown extractor type {kind!r}")
+    pattern = None
+    if kind == "pattern":
+        try:
+            pattern = re.compile(str(raw["pattern"]))
+        except (KeyError, re.error) as exc:
+            raise FlowDefinitionError(f"{where}: invalid pattern: {exc}") from exc
+    fallback_field = raw.get("fallback_field")
+    if fallback_field is not None:
+        _check_field(fallback_field, where)
+    return Extractor(
+        field=field_name,
+        type=kind,
+        required=bool(raw.get("required", False)),
+        pattern=pattern,
+        fallback_field=fallback_field,
+        fallback=dict(raw.get("fallback") or {}),
+    )
+
+
+def _compile_state(name: str, raw: Mapping[str, object]) -> FlowState:
+    instruction = raw.get("instruction")
+    if not isinstance(instruction, str) or not instruction:
+        raise FlowDefinitionError(f"State {name}: missing instruction")
+    placeholders = dict(raw.get("placeholders") or {})
+    for _, placeholder, _, _ in string.Formatter().parse(instruction):
+        if placeholder is not None:
+            _check_field(placeholder, f"State {name} instruction")
+            placeholders.setdefault(placeholder, "")
+
+    extractors: List[Extractor] = []
+    targets: Dict[str, List[Tuple[str, str]]] = {}
+    for position, raw_extractor in enumerate(raw.get("extract") or []):
+        extractor = _compile_extractor(raw_extractor, f"State {name} extractor {position}")
+        extractors.append(extractor)
+        if extractor.type != "keywords":
+            continue
+        keywords = raw_extractor.get("keywords")
+        if not isinstance(keywords, dict) or not keywords:
+            raise FlowDefinitionError(f"State {name} extractor {position}: keywords must be a non-empty mapping")
+        for value, phrases in keywords.items():
+            for phrase in phrases:
+                targets.setdefault(_normalize(phrase), []).append((extractor.field, value))
+
+    return FlowState(
+        name=name,
+        instruction=instruction,
+        next_state=raw.get("next"),
+        extractors=tuple(extractors),
+        matcher=KeywordMatcher(targets) if targets else None,
+        placeholders=placeholders,
+    )
+
+
+def compile_flow(definition: Mapping[str, object]) -> OnboardingFlow:
+    raw_states = definition.get("states")
+    if not isinstance(raw_states, dict) or not raw_states:
+        raise FlowDefinitionError("Flow defines no states")
+    states = {name: _compile_state(name, raw) for name, raw in raw_states.items()}
+    initial = definition.get("initial")
+    if initial not in states:
+        raise FlowDefinitionError(f"Initial state {initial!r} is not defined")
+    for state in states.values():
+        if state.next_state is not None and state.next_state not in states:
+            raise FlowDefinitionError(f"State {state.name}: next state {state.next_state!r} is not defined")
+    return OnboardingFlow(initial, states)
+
+
+def load_flow(path: Path = FLOW_PATH) -> OnboardingFlow:
+    try:
+        definition = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        raise FlowDefinitionError(f"Cannot read onboarding flow {path}: {exc}") from exc
+    return compile_flow(definition)
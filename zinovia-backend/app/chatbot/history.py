@@ -0,0 +1,129 @@
+"""
+Token-budgeted conversation history for LLM prompts.
+
+The most recent turns are sent verbatim while they fit the history budget;
+anything older is folded into ``Conversation.summary``. Folding is
+incremental: ``summary_upto`` records how far the summary reaches, so each
+turn only condenses the messages that newly fell out of the budget.
+Messages about to be overwritten in the fixed-size history ring are folded
+first, so nothing leaves the conversation unsummarized.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Tuple
+
+from .conversation import ROLE_USER, Conversation
+
+# Rough local stand-in for a BPE tokenizer: word pieces of up to four
+# characters plus individual punctuation marks.
+_TOKEN_PIECE = re.compile(r"\w{1,4}|[^\w\s]")
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_LINE_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    return len(_TOKEN_PIECE.findall(text))
+
+
+def message_tokens(content: str) -> int:
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass
+class PackedHistory:
+    messages: List[Dict[str, str]] = field(default_factory=list)
+    tokens_before: int = 0
+    tokens_after: int = 0
+    folded: int = 0
+
+
+def _summary_line(role: str, content: str) -> str:
+    content = " ".join(content.split())
+    if len(content) > SUMMARY_LINE_CHARS:
+        content = content[: SUMMARY_LINE_CHARS - 3].rstrip() + "..."
+    speaker = "User" if role == ROLE_USER else "Assistant"
+    return f"{speaker}: {content}"
+
+
+def fold_into_summary(
+    conversation: Conversation, upto: int, summary_budget_tokens: int
+) -> int:
+    """Fold messages with absolute index in ``[summary_upto, upto)`` into the summary."""
+    history = conversation.history
+    start = max(conversation.summary_upto, history.offset)
+    upto = min(upto, history.offset + len(history))
+    if upto <= start:
+        return 0
+
+    lines = conversation.summary.splitlines() if conversation.summary else []
+    for absolute_index in range(start, upto):
+        lines.append(_summary_line(*history[absolute_index - history.offset]))
+
+    # Keep the newest lines when the summary outgrows its own budget. No token
+    # spans a newline, so the summary's cost is the sum of its lines' costs.
+    costs = [estimate_tokens(line) for line in lines]
+    total = sum(costs)
+    first = 0
+    while first < len(lines) - 1 and total > summary_budget_tokens:
+        total -= costs[first]
+        first += 1
+
+    conversation.summary = "\n".join(lines[first:])
+    conversation.summary_upto = upto
+    return upto - start
+
+
+def append_messages(
+    conversation: Conversation, messages: Sequence[Tuple[str, str]], summary_budget_tokens: int
+) -> None:
+    """Append ``(role, content)`` pairs, folding whatever the ring will overwrite into the summary first."""
+    history = conversation.history
+    overflow = len(history) + len(messages) - history.capacity
+    if overflow > 0:
+        # Never overwrite a message that has not been condensed into the summary yet.
+        fold_into_summary(conversation, history.offset + overflow, summary_budget_tokens)
+    history.extend(messages)
+
+
+def append_message(conversation: Conversation, role: str, content: str, summary_budget_tokens: int) -> None:
+    append_messages(conversation, ((role, content),), summary_budget_tokens)
+
+
+def pack_history(
+    conversation: Conversation,
+    *,
+    budget_tokens: int,
+    summary_budget_tokens: int,
+    reserved_tokens: int = 0,
+) -> PackedHistory:
+    """
+    Select the newest history messages that fit ``budget_tokens``.
+
+    ``reserved_tokens`` accounts for content that will be appended after the
+    history (the latest user message). Older messages are folded into the
+    rolling summary, whose size counts towards ``tokens_after``. Messages the
+    summary already covers are never sent verbatim again, even when the
+    budget has grown since they were folded.
+    """
+    history = conversation.history
+    costs = [message_tokens(content) for _, content in history]
+    packed = PackedHistory(tokens_before=sum(costs) + reserved_tokens)
+
+    remaining = budget_tokens - reserved_tokens
+    summarized = min(len(history), max(0, conversation.summary_upto - history.offset))
+    first_kept = len(history)
+    while first_kept > summarized and costs[first_kept - 1] <= remaining:
+        remaining -= costs[first_kept - 1]
+        first_kept -= 1
+
+    packed.folded = fold_into_summary(
+        conversation, history.offset + first_kept, summary_budget_tokens
+    )
+    packed.messages = [{"role": role, "content": content} for role, content in history.iter_from(first_kept)]
+    packed.tokens_after = sum(costs[first_kept:]) + reserved_tokens
+    if conversation.summary:
+        packed.tokens_after += estimate_tokens(conversation.summary)
+    return packed
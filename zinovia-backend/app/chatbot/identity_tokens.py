@@ -0,0 +1,118 @@
+"""
+Expiry-aware cache for Google identity tokens used to call a protected LLM service.
+
+Tokens are cached per audience until shortly before their ``exp`` claim. Once a
+token enters the refresh window it is still served while a single background
+task mints its replacement, so steady-state chat calls never wait on the
+metadata server.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_LIFETIME_SECONDS = 3600.0
+
+
+@dataclass
+class _CachedToken:
+    token: str
+    expires_at: float
+
+
+def decode_token_expiry(token: str) -> Optional[float]:
+    """Return the ``exp`` claim of a JWT without verifying its signature."""
+    try:
+        payload_segment = token.split(".")[1]
+        padded = payload_segment + "=" * (-len(payload_segment) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(padded))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class IdentityTokenCache:
+    def __init__(
+        self,
+        fetch_token: Callable[[str], str],
+        *,
+        refresh_margin_seconds: float = 300.0,
+        min_validity_seconds: float = 30.0,
+    ) -> None:
+        self._fetch_token = fetch_token
+        self._refresh_margin = refresh_margin_seconds
+        self._min_validity = min_validity_seconds
+        self._tokens: Dict[str, _CachedToken] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.failures = 0
+
+    async def get_token(self, audience: str) -> str:
+        cached = self._tokens.get(audience)
+        now = time.time()
+        if cached is not None and cached.expires_at - now > self._min_validity:
+            self.hits += 1
+            if cached.expires_at - now <= self._refresh_margin:
+                self._start_refresh(audience)
+            return cached.token
+
+        self.misses += 1
+        return await asyncio.shield(self._start_refresh(audience))
+
+    def _start_refresh(self, audience: str) -> asyncio.Task:
+        # Concurrent callers share the same in-flight fetch per audience.
+        task = self._inflight.get(audience)
+        if task is None or task.done():
+            task = asyncio.get_running_loop().create_task(self._refresh(audience))
+            task.add_done_callback(self._log_refresh_failure)
+            self._inflight[audience] = task
+        return task
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Identity token refresh failed: %s", task.exception())
+
+    async def _refresh(self, audience: str) -> str:
+        self.refreshes += 1
+        loop = asyncio.get_running_loop()
+        try:
+            token = await loop.run_in_executor(None, self._fetch_token, audience)
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self._inflight.pop(audience, None)
+
+        expires_at = decode_token_expiry(token)
+        if expires_at is None:
+            logger.warning("Identity token for %s has no exp claim; assuming default lifetime", audience)
+            expires_at = time.time() + DEFAULT_TOKEN_LIFETIME_SECONDS
+        self._tokens[audience] = _CachedToken(token=token, expires_at=expires_at)
+        return token
+
+    async def aclose(self) -> None:
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._inflight.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "cached_audiences": len(self._tokens),
+        }
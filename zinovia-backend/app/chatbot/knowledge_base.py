@@ -1,43 +1,109 @@
+"""
+Knowledge base built from a directory of markdown documents.
+
+Each ``*.md`` file under the corpus directory is split into sections on
+``## `` headings, and each section into overlapping passages (see
+``passages``) that form the rows of the index. Passages remember their
+document and headings so excerpts can cite their source. The directory is
+re-scanned at most every ``KNOWLEDGE_RELOAD_INTERVAL_SECONDS``: files whose mtime and size are
+unchanged are skipped, and only files whose content hash changed are
+re-parsed and re-analyzed. The rescan runs in a background thread started
+by the first query after the interval, so queries never wait on disk I/O or
+an index build: ``snapshot()`` only reads the published reference. A new
+index is built off to the side and published by swapping that single
+reference, so concurrent queries see either the old or the new corpus, never
+a mix. Only the very first load happens in the caller; the app performs it at
+startup.
+
+Scoring is BM25-only unless ``KNOWLEDGE_HYBRID_ENABLED`` is on; hybrid
+scoring has not yet beaten it on the held-out evaluation set. Hybrid queries
+are expanded with ``QUERY_SYNONYMS`` and misspelled words are resolved to
+the nearest indexed term. The normalised BM25 score is then blended with passage
+cosine over hashed character n-gram vectors (see ``ngram_vectors``), which
+also lets a query with no exact term hit match when it is close enough.
+
+The index is persisted to ``KNOWLEDGE_INDEX_PATH``, stamped with a hash of
+the corpus contents, the index/analyzer versions and the chunking settings. Workers memory-map a
+matching file instead of analyzing the corpus, so a host shares one copy;
+a stale or missing file is rebuilt and rewritten by whichever worker notices
+first. ``build_context`` results are memoized per normalized query in a
+bounded LRU that is dropped whenever a new snapshot is published.
+
+Prebuild the index file before starting workers with:
+
+    python -m app.chatbot.knowledge_base build
+"""
+
 from __future__ import annotations
 
-import re
-from collections import Counter
-from functools import lru_cache
+import argparse
+import hashlib
+import logging
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import get_knowledge_settings
+from .knowledge_index import (
+    INDEX_FORMAT_VERSION,
+    BM25Index,
+    IndexFileError,
+    read_index_file,
+    top_k,
+    write_index_file,
+)
+from .ngram_vectors import NGRAM_DIMENSIONS, NgramVectorIndex, encode
+from .passages import KnowledgePassage, chunk_section, pack_passages
+from .text_processing import ANALYZER_VERSION, analyze, expand_query, normalize_user_message
+
+logger = logging.getLogger(__name__)
 
 BASE_PATH = Path(__file__).resolve().parent
-DATA_PATH = BASE_PATH / "data" / "zinovia_enhanced_presentation.md"
+DATA_DIR = BASE_PATH / "data"
+DEFAULT_HEADING = "Overview"
+DEFAULT_INDEX_PATH = Path(tempfile.gettempdir()) / "zinovia_knowledge.idx"
+# Passages scored per query before packing into the context budget; those
+# scoring below MIN_RELATIVE_SCORE of the best one are left out.
+CANDIDATE_PASSAGES = 12
+MIN_RELATIVE_SCORE = 0.5
+# Unknown query words at least this long are mapped to the closest vocabulary
+# term when their n-gram cosine reaches TYPO_SIMILARITY. Only terms with the
+# same first letter and a length within TYPO_LENGTH_SLACK are compared: typos
+# rarely touch the first letter, and requiring it avoids "great" -> "creat".
+TYPO_MIN_LENGTH = 5
+TYPO_SIMILARITY = 0.5
+TYPO_LENGTH_SLACK = 2
 
 
-def _tokenize(text: str) -> List[str]:
-    return re.findall(r"[a-zA-Z0-9']+", text.lower())
+@dataclass(frozen=True)
+class KnowledgeSection:
+    document: str
+    heading: str
+    content: str
 
+    @property
+    def source(self) -> str:
+        return f"{self.document} > {self.heading}"
 
-@lru_cache(maxsize=1)
-def _load_sections() -> List[dict]:
-    if not DATA_PATH.exists():
-        raise FileNotFoundError(f"Knowledge base file missing: {DATA_PATH}")
 
-    raw_text = DATA_PATH.read_text(encoding="utf-8")
-    sections: List[dict] = []
+def parse_sections(document: str, raw_text: str) -> List[KnowledgeSection]:
+    sections: List[KnowledgeSection] = []
 
-    current_title = "Overview"
+    current_title = DEFAULT_HEADING
     current_lines: List[str] = []
 
     def _flush_section() -> None:
         if not current_lines:
             return
         content = "\n".join(line.strip() for line in current_lines if line.strip())
-        tokens = _tokenize(content)
-        sections.append(
-            {
-                "title": current_title,
-                "content": content,
-                "token_counts": Counter(tokens),
-                "token_set": set(tokens),
-            }
-        )
+        if content:
+            sections.append(KnowledgeSection(document, current_title, content))
 
     for line in raw_text.splitlines():
         if line.startswith("## "):
@@ -51,45 +117,543 @@ def _load_sections() -> List[dict]:
     return sections
 
 
-def _score_section(tokens: Iterable[str], section: dict) -> int:
-    return sum(section["token_counts"].get(token, 0) for token in tokens)
+@dataclass
+class _IndexedDocument:
+    mtime_ns: int
+    size: int
+    digest: str
+    sections: List[KnowledgeSection]
+    passages: List[KnowledgePassage]
+    # Analyzed terms and n-gram vectors per passage, reused when other documents
+    # change. A snapshot mapped from the index file leaves them unset; they are
+    # then recovered from that snapshot on the next rebuild instead of
+    # re-analyzing the document.
+    term_counts: Optional[List[Counter]] = None
+    vectors: Optional[List[np.ndarray]] = None
 
 
-def get_relevant_sections(query: str, max_sections: int = 3) -> Tuple[List[str], bool]:
-    sections = _load_sections()
-    query_tokens = _tokenize(query)
-    if not query_tokens:
-        return [], False
+@dataclass(frozen=True)
+class KnowledgeSnapshot:
+    version: int
+    content_hash: str
+    sections: Tuple[KnowledgeSection, ...]
+    # One index row per passage.
+    passages: Tuple[KnowledgePassage, ...]
+    index: BM25Index
+    vectors: NgramVectorIndex
+    # Index vocabulary in row order and its n-gram vectors, for resolving misspelled query words.
+    terms: Tuple[str, ...]
+    term_vectors: NgramVectorIndex
+    # Vocabulary rows grouped by (first letter, length): the typo candidates for a word.
+    term_buckets: Dict[Tuple[str, int], np.ndarray]
+    # Served whenever no passage matches; computed once per snapshot.
+    default_context: str
+
+
+class ContextCache:
+    """LRU of ``build_context`` results keyed by normalized query, scoped to one snapshot version."""
+
+    def __init__(self, max_entries: int = 2048) -> None:
+        self._entries: "OrderedDict[str, Tuple[str, bool]]" = OrderedDict()
+        self._max_entries = max_entries
+        self._version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, version: int) -> None:
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, version: int, key: str) -> Optional[Tuple[str, bool]]:
+        self._check_version(version)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, version: int, key: str, value: Tuple[str, bool]) -> None:
+        self._check_version(version)
+        if self._max_entries <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+def _index_text(passage: KnowledgePassage) -> str:
+    # Headings are indexed with the body so heading words ("Pricing", "Use Cases") count.
+    return " ".join(passage.breadcrumb) + "\n" + passage.text
+
+
+def _term_buckets(terms: Sequence[str]) -> Dict[Tuple[str, int], np.ndarray]:
+    buckets: Dict[Tuple[str, int], List[int]] = {}
+    for row, term in enumerate(terms):
+        buckets.setdefault((term[0], len(term)), []).append(row)
+    return {key: np.asarray(rows, dtype=np.int64) for key, rows in buckets.items()}
+
+
+def _content_hash(documents: Dict[str, _IndexedDocument], layout: str) -> str:
+    digest = hashlib.sha256(f"{INDEX_FORMAT_VERSION}:{ANALYZER_VERSION}:{layout}\n".encode())
+    for name, document in documents.items():
+        digest.update(f"{name}\0{document.digest}\n".encode())
+    return digest.hexdigest()
+
+
+class KnowledgeBase:
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        reload_interval_seconds: float = 5.0,
+        index_path: Optional[Path] = None,
+        context_cache_size: int = 2048,
+        passage_tokens: int = 120,
+        passage_overlap_tokens: int = 30,
+        context_token_budget: int = 400,
+        hybrid: bool = False,
+        lexical_weight: float = 0.6,
+        ngram_match_threshold: float = 0.35,
+    ) -> None:
+        self.directory = directory
+        self.index_path = index_path
+        self._reload_interval = reload_interval_seconds
+        self._documents: Dict[str, _IndexedDocument] = {}
+        self._snapshot: Optional[KnowledgeSnapshot] = None
+        self._refresh_lock = threading.Lock()
+        self._last_check = 0.0
+        self.reloads = 0
+        self.documents_reindexed = 0
+        self.reload_failures = 0
+        self.index_file_loads = 0
+        self.index_file_writes = 0
+        self._context_cache = ContextCache(context_cache_size)
+        self._passage_tokens = passage_tokens
+        self._passage_overlap_tokens = passage_overlap_tokens
+        self._context_token_budget = context_token_budget
+        self._hybrid = hybrid
+        self._lexical_weight = lexical_weight
+        self._ngram_match_threshold = ngram_match_threshold
+
+    def snapshot(self) -> KnowledgeSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._refresh_lock:
+                if self._snapshot is None:
+                    self._refresh_locked()
+            return self._snapshot
+        if self._reload_interval > 0 and time.monotonic() - self._last_check >= self._reload_interval:
+            self._start_background_reload()
+        return snapshot
+
+    def _start_background_reload(self) -> None:
+        # Only one rescan at a time; the thread releases the lock when it is done.
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        self._last_check = time.monotonic()
+        try:
+            threading.Thread(target=self._reload_in_background, name="knowledge-reload", daemon=True).start()
+        except Exception:
+            self._refresh_lock.release()
+            raise
+
+    def _reload_in_background(self) -> None:
+        try:
+            self._refresh_locked()
+        except Exception:  # noqa: BLE001
+            self.reload_failures += 1
+            logger.exception(
+                "Knowledge base reload failed; keeping version %s",
+                self._snapshot.version if self._snapshot else None,
+            )
+        finally:
+            self._refresh_lock.release()
+
+    def refresh(self) -> bool:
+        """Rescan the corpus now; returns True when a new snapshot was published."""
+        with self._refresh_lock:
+            return self._refresh_locked()
+
+    def _refresh_locked(self) -> bool:
+        self._last_check = time.monotonic()
+        if not self.directory.is_dir():
+            raise FileNotFoundError(f"Knowledge base directory missing: {self.directory}")
+
+        documents: Dict[str, _IndexedDocument] = {}
+        changed = False
+        for path in sorted(self.directory.rglob("*.md")):
+            name = path.relative_to(self.directory).as_posix()
+            stat = path.stat()
+            previous = self._documents.get(name)
+            if previous and previous.mtime_ns == stat.st_mtime_ns and previous.size == stat.st_size:
+                documents[name] = previous
+                continue
+
+            raw = path.read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()
+            if previous and previous.digest == digest:
+                # Touched but not edited: keep the analysis, remember the new stat.
+                previous.mtime_ns, previous.size = stat.st_mtime_ns, stat.st_size
+                documents[name] = previous
+                continue
+
+            sections = parse_sections(name, raw.decode("utf-8"))
+            documents[name] = _IndexedDocument(
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                digest=digest,
+                sections=sections,
+                passages=self._chunk(name, sections),
+            )
+            changed = True
+
+        if set(documents) != set(self._documents):
+            changed = True
+        if not changed and self._snapshot is not None:
+            return False
 
-    scored: List[Tuple[int, dict]] = []
-    for section in sections:
-        score = _score_section(query_tokens, section)
-        if score > 0:
-            scored.append((score, section))
+        sections = tuple(section for document in documents.values() for section in document.sections)
+        passages = tuple(passage for document in documents.values() for passage in document.passages)
+        content_hash = _content_hash(
+            documents, f"{self._passage_tokens}/{self._passage_overlap_tokens}/{NGRAM_DIMENSIONS}"
+        )
+        indexes = self._open_index_file(content_hash, len(passages))
+        if indexes is None:
+            indexes = self._build_indexes(documents)
+            self._write_index_file(*indexes, content_hash)
+        index, vectors, term_vectors = indexes
+        terms = tuple(index.terms())
+
+        version = self._snapshot.version + 1 if self._snapshot else 1
+        self._documents = documents
+        self._snapshot = KnowledgeSnapshot(
+            version,
+            content_hash,
+            sections,
+            passages,
+            index,
+            vectors,
+            terms,
+            term_vectors,
+            _term_buckets(terms),
+            default_context=self._default_context(passages),
+        )
+        self.reloads += 1
+        logger.info(
+            "Loaded knowledge base version %s: %s documents, %s sections, %s passages",
+            version,
+            len(documents),
+            len(sections),
+            len(passages),
+        )
+        return True
+
+    def _chunk(self, document: str, sections: List[KnowledgeSection]) -> List[KnowledgePassage]:
+        return [
+            passage
+            for position, section in enumerate(sections)
+            for passage in chunk_section(
+                document,
+                position,
+                section.heading,
+                section.content,
+                passage_tokens=self._passage_tokens,
+                overlap_tokens=self._passage_overlap_tokens,
+            )
+        ]
 
-    if not scored:
-        return [], False
+    def _default_context(self, passages: Sequence[KnowledgePassage]) -> str:
+        # Provide the first two sections as foundational context
+        opening = []
+        for passage in passages:
+            key = (passage.document, passage.section)
+            if key not in opening:
+                if len(opening) == 2:
+                    break
+                opening.append(key)
+        return pack_passages(
+            [passage for passage in passages if (passage.document, passage.section) in opening],
+            self._context_token_budget,
+        )
+
+    def _build_indexes(
+        self, documents: Dict[str, _IndexedDocument]
+    ) -> Tuple[BM25Index, NgramVectorIndex, NgramVectorIndex]:
+        term_counts: List[Counter] = []
+        vectors: List[np.ndarray] = []
+        published_rows = self._published_rows()
+        published_counts: Optional[List[Counter]] = None
+        for document in documents.values():
+            rows = published_rows.get(id(document))
+            if (document.term_counts is None or document.vectors is None) and rows is not None:
+                # Unchanged since a snapshot mapped from the index file: take its analysis from there.
+                if published_counts is None:
+                    published_counts = self._snapshot.index.section_term_counts()
+                document.term_counts = published_counts[rows[0] : rows[1]]
+                document.vectors = list(np.array(self._snapshot.vectors.vectors[rows[0] : rows[1]]))
+            if document.term_counts is None or document.vectors is None:
+                texts = [_index_text(passage) for passage in document.passages]
+                document.term_counts = [Counter(analyze(text)) for text in texts]
+                document.vectors = [encode(text) for text in texts]
+                self.documents_reindexed += 1
+            term_counts.extend(document.term_counts)
+            vectors.extend(document.vectors)
+        matrix = np.stack(vectors) if vectors else np.zeros((0, NGRAM_DIMENSIONS), dtype=np.float32)
+        index = BM25Index.from_term_counts(term_counts)
+        return index, NgramVectorIndex(matrix), self._term_vectors(index.terms())
+
+    def _term_vectors(self, terms: Sequence[str]) -> NgramVectorIndex:
+        """N-gram vectors of ``terms``, copied from the published snapshot where it already has them."""
+        matrix = np.zeros((len(terms), NGRAM_DIMENSIONS), dtype=np.float32)
+        published = self._snapshot
+        known = published.index.vocabulary if published else {}
+        rows = np.fromiter((known.get(term, -1) for term in terms), dtype=np.int64, count=len(terms))
+        reused = rows >= 0
+        if published is not None and reused.any():
+            matrix[reused] = published.term_vectors.vectors[rows[reused]]
+        for row in np.flatnonzero(~reused):
+            matrix[row] = encode(terms[row])
+        return NgramVectorIndex(matrix)
 
-    scored.sort(key=lambda item: item[0], reverse=True)
-    top_sections = [item[1]["content"] for item in scored[:max_sections]]
-    return top_sections, True
+    def _published_rows(self) -> Dict[int, Tuple[int, int]]:
+        """Index rows of each document in the published snapshot, keyed by document identity."""
+        rows: Dict[int, Tuple[int, int]] = {}
+        if self._snapshot is None:
+            return rows
+        start = 0
+        for document in self._documents.values():
+            rows[id(document)] = (start, start + len(document.passages))
+            start += len(document.passages)
+        return rows
+
+    def _open_index_file(
+        self, content_hash: str, passage_count: int
+    ) -> Optional[Tuple[BM25Index, NgramVectorIndex, NgramVectorIndex]]:
+        if self.index_path is None or not self.index_path.exists():
+            return None
+        try:
+            arrays, metadata = read_index_file(self.index_path)
+        except IndexFileError as exc:
+            logger.info("Rebuilding knowledge index: %s", exc)
+            return None
+        if metadata.get("content_hash") != content_hash or metadata.get("passages") != passage_count:
+            logger.info("Rebuilding knowledge index: %s is stale", self.index_path)
+            return None
+        self.index_file_loads += 1
+        return (
+            BM25Index.from_terms(metadata["vocabulary"], arrays, passage_count),
+            NgramVectorIndex(arrays["ngrams"]),
+            NgramVectorIndex(arrays["term_ngrams"]),
+        )
+
+    def _write_index_file(
+        self, index: BM25Index, vectors: NgramVectorIndex, term_vectors: NgramVectorIndex, content_hash: str
+    ) -> None:
+        if self.index_path is None:
+            return
+        metadata = {"content_hash": content_hash, "passages": len(index), "vocabulary": index.terms()}
+        arrays = {**index.arrays(), "ngrams": vectors.vectors, "term_ngrams": term_vectors.vectors}
+        try:
+            write_index_file(self.index_path, arrays, metadata)
+        except OSError as exc:
+            # A read-only filesystem only costs other workers their own build.
+            logger.warning("Could not write knowledge index %s: %s", self.index_path, exc)
+            return
+        self.index_file_writes += 1
+
+    def _query_term_ids(self, snapshot: KnowledgeSnapshot, query: str) -> List[int]:
+        term_ids = snapshot.index.term_ids(query)
+        unknown = [
+            term
+            for term in set(analyze(query))
+            if len(term) >= TYPO_MIN_LENGTH and term not in snapshot.index.vocabulary
+        ]
+        for term in unknown:
+            buckets = [
+                snapshot.term_buckets.get((term[0], length))
+                for length in range(len(term) - TYPO_LENGTH_SLACK, len(term) + TYPO_LENGTH_SLACK + 1)
+            ]
+            candidates = [bucket for bucket in buckets if bucket is not None]
+            if not candidates:
+                continue
+            row = snapshot.term_vectors.nearest_among(term, np.concatenate(candidates), TYPO_SIMILARITY)
+            if row is not None:
+                term_ids.append(row)
+        return sorted(set(term_ids))
+
+    def _score(self, snapshot: KnowledgeSnapshot, queries: Sequence[str]) -> np.ndarray:
+        """Retrieval scores with shape (queries, passages); all zero for a query that matches nothing."""
+        if not self._hybrid:
+            return snapshot.index.score_matrix(queries)
+        expanded = [expand_query(query) for query in queries]
+        lexical = snapshot.index.score_term_ids([self._query_term_ids(snapshot, query) for query in expanded])
+        if not len(snapshot.passages):
+            return lexical
+        semantic = snapshot.vectors.similarity_matrix(expanded)
+        peak = lexical.max(axis=1, keepdims=True)
+        normalized = np.divide(lexical, peak, out=np.zeros_like(lexical), where=peak > 0)
+        combined = self._lexical_weight * normalized + (1 - self._lexical_weight) * semantic
+        # Matched when any (possibly corrected) term hits, or a passage is close in n-gram space.
+        matched = (peak > 0) | (semantic.max(axis=1, keepdims=True) >= self._ngram_match_threshold)
+        return np.where(matched, combined, 0.0)
+
+    def rank(self, query: str, limit: int = 3) -> List[Tuple[float, KnowledgePassage]]:
+        snapshot = self.snapshot()
+        ranked = top_k(self._score(snapshot, [query])[0], limit)
+        return [(score, snapshot.passages[doc_id]) for score, doc_id in ranked]
+
+    def search(self, query: str, limit: int = 3) -> List[KnowledgePassage]:
+        return [passage for _, passage in self.rank(query, limit)]
+
+    def search_batch(self, queries: Sequence[str], limit: int = 3) -> List[List[KnowledgePassage]]:
+        snapshot = self.snapshot()
+        return [
+            [snapshot.passages[doc_id] for _, doc_id in top_k(row, limit)]
+            for row in self._score(snapshot, queries)
+        ]
+
+    def build_context(self, query: str) -> Tuple[str, bool]:
+        """Excerpt for ``query`` and whether it matched; memoized until the corpus changes."""
+        snapshot = self.snapshot()
+        key = normalize_user_message(query)
+        cached = self._context_cache.get(snapshot.version, key)
+        if cached is not None:
+            return cached
+        ranked = top_k(self._score(snapshot, [query])[0], CANDIDATE_PASSAGES)
+        if ranked:
+            floor = ranked[0][0] * MIN_RELATIVE_SCORE
+            passages = [snapshot.passages[doc_id] for score, doc_id in ranked if score >= floor]
+            result = (pack_passages(passages, self._context_token_budget), True)
+        else:
+            result = (snapshot.default_context, False)
+        self._context_cache.put(snapshot.version, key, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else None,
+            "content_hash": snapshot.content_hash if snapshot else None,
+            "documents": len(self._documents),
+            "sections": len(snapshot.sections) if snapshot else 0,
+            "passages": len(snapshot.passages) if snapshot else 0,
+            "reloads": self.reloads,
+            "documents_reindexed": self.documents_reindexed,
+            "reload_failures": self.reload_failures,
+            "index_path": str(self.index_path) if self.index_path else None,
+            "index_file_loads": self.index_file_loads,
+            "index_file_writes": self.index_file_writes,
+            "context_cache": self._context_cache.stats(),
+        }
+
+
+_knowledge_base: Optional[KnowledgeBase] = None
+_knowledge_base_lock = threading.Lock()
+
+
+def get_knowledge_base() -> KnowledgeBase:
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _knowledge_base_lock:
+            if _knowledge_base is None:
+                settings = get_knowledge_settings()
+                _knowledge_base = KnowledgeBase(
+                    _configured_directory(),
+                    reload_interval_seconds=settings.knowledge_reload_interval_seconds,
+                    index_path=_configured_index_path(),
+                    context_cache_size=settings.knowledge_context_cache_size,
+                    passage_tokens=settings.knowledge_passage_tokens,
+                    passage_overlap_tokens=settings.knowledge_passage_overlap_tokens,
+                    context_token_budget=settings.knowledge_context_token_budget,
+                    hybrid=settings.knowledge_hybrid_enabled,
+                    lexical_weight=settings.knowledge_lexical_weight,
+                    ngram_match_threshold=settings.knowledge_ngram_match_threshold,
+                )
+    return _knowledge_base
+
+
+def _configured_directory() -> Path:
+    settings = get_knowledge_settings()
+    return Path(settings.knowledge_base_dir) if settings.knowledge_base_dir else DATA_DIR
+
+
+def _configured_index_path() -> Path:
+    settings = get_knowledge_settings()
+    return Path(settings.knowledge_index_path) if settings.knowledge_index_path else DEFAULT_INDEX_PATH
+
+
+def get_relevant_sections(query: str, max_sections: int = 3) -> Tuple[List[str], bool]:
+    """Texts of the best-matching passages and whether anything matched."""
+    passages = get_knowledge_base().search(query, max_sections)
+    return [passage.text for passage in passages], bool(passages)
+
+
+def get_relevant_sections_batch(
+    queries: Sequence[str], max_sections: int = 3
+) -> List[Tuple[List[str], bool]]:
+    """Batched ``get_relevant_sections`` for offline evaluation and bulk replay."""
+    return [
+        ([passage.text for passage in passages], bool(passages))
+        for passages in get_knowledge_base().search_batch(queries, max_sections)
+    ]
 
 
 def get_default_context() -> str:
-    sections = _load_sections()
-    if not sections:
-        return ""
-    # Provide the first two sections as foundational context
-    snippets = [sections[0]["content"]]
-    if len(sections) > 1:
-        snippets.append(sections[1]["content"])
-    return "\n\n".join(snippets)
+    return get_knowledge_base().snapshot().default_context
 
 
 def build_context(query: str) -> Tuple[str, bool]:
-    sections, matched = get_relevant_sections(query)
-    if matched:
-        return "\n\n".join(sections), True
-    return get_default_context(), False
+    return get_knowledge_base().build_context(query)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the prebuilt knowledge index file.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--source", type=Path, default=None, help="Markdown directory (KNOWLEDGE_BASE_DIR)")
+    parser.add_argument("--output", type=Path, default=None, help="Index file (KNOWLEDGE_INDEX_PATH)")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the existing file is current")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    output = args.output or _configured_index_path()
+    if args.force:
+        output.unlink(missing_ok=True)
+    settings = get_knowledge_settings()
+    knowledge_base = KnowledgeBase(
+        args.source or _configured_directory(),
+        index_path=output,
+        passage_tokens=settings.knowledge_passage_tokens,
+        passage_overlap_tokens=settings.knowledge_passage_overlap_tokens,
+    )
+    snapshot = knowledge_base.snapshot()
+    if not (knowledge_base.index_file_loads or knowledge_base.index_file_writes):
+        raise SystemExit(f"Could not write knowledge index {output}")
+    action = "reused" if knowledge_base.index_file_loads else "built"
+    print(
+        f"Knowledge index {action}: {output} "
+        f"({len(snapshot.passages)} passages, content hash {snapshot.content_hash[:12]})"
+    )
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+BM25 index over knowledge-base sections, scored with NumPy.
+
+At build time every section is analyzed once and its BM25 term weights
+(IDF times the saturated, length-normalised term frequency) are stored as
+term-major postings in three flat arrays: ``indptr`` delimits each term's
+slice of ``doc_ids`` (the sections containing it, ascending) and
+``weights`` (the matching weights). Scoring a query sums the postings of its
+own terms with one ``bincount``, so the cost grows with the number of
+sections those terms occur in, not with the size of the vocabulary or the
+corpus. A batch of queries is scored the same way, each query offset into its
+own row of the output. The raw term frequencies are kept next to the
+weights, so the per-section term counts can be recovered from a mapped file
+when the corpus is re-indexed incrementally.
+
+Index arrays can be saved to a versioned binary file: a fixed header, a JSON
+block (array layout and caller metadata such as the vocabulary), then each
+array aligned to 64 bytes. ``read_index_file`` maps them read-only with
+``mmap``, so every worker on a host shares a single page-cached copy instead
+of holding a private one.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .text_processing import analyze
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Upper bound on queries scored per ``bincount``; keeps the dense score block
+# small when replaying large query sets.
+_BATCH_ROWS = 512
+
+INDEX_MAGIC = b"ZKIX"
+# Bump when the file layout or the weight computation changes.
+INDEX_FORMAT_VERSION = 5
+_FILE_HEADER = struct.Struct("<4sIQ")  # magic, format version, JSON block length
+_MATRIX_ALIGNMENT = 64
+# Array dtypes an index file may hold, always little-endian on disk.
+_FILE_DTYPES = {"float32": "<f4", "int32": "<i4", "int64": "<i8"}
+
+
+class IndexFileError(ValueError):
+    """Raised when an index file is missing, truncated or written by another format version."""
+
+
+class BM25Index:
+    def __init__(
+        self,
+        vocabulary: Dict[str, int],
+        indptr: np.ndarray,
+        doc_ids: np.ndarray,
+        weights: np.ndarray,
+        frequencies: np.ndarray,
+        passages: int,
+    ) -> None:
+        self.vocabulary = vocabulary
+        # Postings of term row ``t`` are ``doc_ids[indptr[t]:indptr[t + 1]]`` and the
+        # same slice of ``weights`` and ``frequencies``.
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.frequencies = frequencies
+        self._passages = passages
+
+    @classmethod
+    def build(
+        cls,
+        documents: Sequence[str],
+        *,
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+    ) -> "BM25Index":
+        return cls.from_term_counts([Counter(analyze(text)) for text in documents], k1=k1, b=b)
+
+    @classmethod
+    def from_term_counts(
+        cls,
+        term_counts: Sequence[Counter],
+        *,
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+    ) -> "BM25Index":
+        """Build from per-section analyzed term counts, so unchanged sections need no re-analysis."""
+        vocabulary: Dict[str, int] = {}
+        term_rows: List[int] = []
+        doc_rows: List[int] = []
+        frequencies: List[int] = []
+        total = len(term_counts)
+        doc_lengths = np.zeros(total, dtype=np.float32)
+        for doc_id, counts in enumerate(term_counts):
+            for term, frequency in counts.items():
+                term_rows.append(vocabulary.setdefault(term, len(vocabulary)))
+                doc_rows.append(doc_id)
+                frequencies.append(frequency)
+            doc_lengths[doc_id] = sum(counts.values())
+
+        # Group the (term, section) pairs by term; a stable sort keeps sections ascending.
+        rows = np.asarray(term_rows, dtype=np.int64)
+        order = np.argsort(rows, kind="stable")
+        rows = rows[order]
+        doc_ids = np.asarray(doc_rows, dtype=np.int32)[order]
+        counts = np.asarray(frequencies, dtype=np.int32)[order]
+        tf = counts.astype(np.float32)
+        document_frequency = np.bincount(rows, minlength=len(vocabulary))
+        indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(document_frequency, out=indptr[1:])
+
+        avg_length = float(doc_lengths.mean()) if total else 0.0
+        length_norm = k1 * (1 - b + b * doc_lengths / avg_length) if avg_length else np.full(total, k1)
+        idf = np.log1p((total - document_frequency + 0.5) / (document_frequency + 0.5))
+        weights = idf[rows] * tf * (k1 + 1) / (tf + length_norm[doc_ids])
+        return cls(vocabulary, indptr, doc_ids, weights.astype(np.float32), counts, total)
+
+    def __len__(self) -> int:
+        return self._passages
+
+    def terms(self) -> List[str]:
+        """Vocabulary in row order, as stored in index files."""
+        return sorted(self.vocabulary, key=self.vocabulary.__getitem__)
+
+    @classmethod
+    def from_terms(cls, terms: Sequence[str], arrays: Dict[str, np.ndarray], passages: int) -> "BM25Index":
+        """Rebuild from ``terms()`` and ``arrays()`` as stored in an index file."""
+        return cls(
+            {term: row for row, term in enumerate(terms)},
+            arrays["bm25_indptr"],
+            arrays["bm25_doc_ids"],
+            arrays["bm25_weights"],
+            arrays["bm25_frequencies"],
+            passages,
+        )
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "bm25_indptr": self.indptr,
+            "bm25_doc_ids": self.doc_ids,
+            "bm25_weights": self.weights,
+            "bm25_frequencies": self.frequencies,
+        }
+
+    def section_term_counts(self) -> List[Counter]:
+        """Analyzed term counts of every section, recovered from the postings."""
+        terms = self.terms()
+        term_rows = np.repeat(np.arange(len(terms)), np.diff(self.indptr))
+        order = np.argsort(self.doc_ids, kind="stable")
+        bounds = np.searchsorted(self.doc_ids[order], np.arange(len(self) + 1)).tolist()
+        rows = term_rows[order].tolist()
+        frequencies = self.frequencies[order].tolist()
+        return [
+            Counter({terms[row]: frequency for row, frequency in zip(rows[start:stop], frequencies[start:stop])})
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+
+    def term_ids(self, query: str) -> List[int]:
+        """Rows of the analyzed query terms that occur in the corpus."""
+        return sorted({self.vocabulary[term] for term in analyze(query) if term in self.vocabulary})
+
+    def _postings(self, term_ids: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Concatenated ``(doc_ids, weights)`` postings of ``term_ids``."""
+        indptr = self.indptr
+        slices = [slice(indptr[row], indptr[row + 1]) for row in term_ids]
+        if len(slices) == 1:
+            return self.doc_ids[slices[0]], self.weights[slices[0]]
+        return (
+            np.concatenate([self.doc_ids[part] for part in slices]),
+            np.concatenate([self.weights[part] for part in slices]),
+        )
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of ``query`` against every section."""
+        return self.score_term_ids([self.term_ids(query)])[0]
+
+    def score_matrix(self, queries: Sequence[str]) -> np.ndarray:
+        """Scores with shape (queries, sections)."""
+        return self.score_term_ids([self.term_ids(query) for query in queries])
+
+    def score_term_ids(self, term_ids: Sequence[Sequence[int]]) -> np.ndarray:
+        """Like ``score_matrix`` for queries already resolved to vocabulary rows."""
+        total = len(self)
+        scores = np.zeros((len(term_ids), total), dtype=np.float32)
+        for start in range(0, len(term_ids), _BATCH_ROWS):
+            chunk = term_ids[start : start + _BATCH_ROWS]
+            positions: List[np.ndarray] = []
+            weights: List[np.ndarray] = []
+            for row, ids in enumerate(chunk):
+                if not ids:
+                    continue
+                doc_ids, term_weights = self._postings(ids)
+                # Offset each query's sections into its own row of the block.
+                positions.append(doc_ids.astype(np.int64) + row * total)
+                weights.append(term_weights)
+            if not positions:
+                continue
+            block = np.bincount(
+                np.concatenate(positions), weights=np.concatenate(weights), minlength=len(chunk) * total
+            )
+            scores[start : start + len(chunk)] = block.reshape(len(chunk), total)
+        return scores
+
+    def search(self, query: str, limit: int) -> List[Tuple[float, int]]:
+        """Return up to ``limit`` ``(score, doc_id)`` pairs with a positive score, best first."""
+        return top_k(self.scores(query), limit)
+
+    def search_batch(self, queries: Sequence[str], limit: int) -> List[List[Tuple[float, int]]]:
+        """Batched ``search``; same output per query."""
+        return [top_k(row_scores, limit) for row_scores in self.score_matrix(queries)]
+
+
+def _aligned(size: int) -> int:
+    return -(-size // _MATRIX_ALIGNMENT) * _MATRIX_ALIGNMENT
+
+
+def write_index_file(path: Path, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]) -> None:
+    """Write named arrays atomically; readers keep their mapping of any previous file."""
+    layout: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    for name, array in arrays.items():
+        if array.dtype.name not in _FILE_DTYPES:
+            raise ValueError(f"Index array {name} has unsupported dtype {array.dtype}")
+        # Offsets are relative to the aligned end of the JSON block.
+        layout[name] = {"offset": offset, "shape": list(array.shape), "dtype": array.dtype.name}
+        offset += _aligned(array.nbytes)
+    block = json.dumps({"arrays": layout, "metadata": metadata}, separators=(",", ":")).encode("utf-8")
+    data_start = _aligned(_FILE_HEADER.size + len(block))
+
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tmp_path.open("wb") as handle:
+        handle.write(_FILE_HEADER.pack(INDEX_MAGIC, INDEX_FORMAT_VERSION, len(block)))
+        handle.write(block)
+        for name, array in arrays.items():
+            handle.write(b"\0" * (data_start + layout[name]["offset"] - handle.tell()))
+            handle.write(np.ascontiguousarray(array, dtype=_FILE_DTYPES[array.dtype.name]).tobytes())
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_index_file(path: Path) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Map a file written by ``write_index_file``; returns its read-only arrays and metadata."""
+    try:
+        with path.open("rb") as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as exc:
+        raise IndexFileError(f"Cannot map knowledge index {path}: {exc}") from exc
+
+    if len(mapped) < _FILE_HEADER.size:
+        raise IndexFileError(f"Knowledge index {path} is truncated")
+    magic, version, block_length = _FILE_HEADER.unpack_from(mapped, 0)
+    if magic != INDEX_MAGIC:
+        raise IndexFileError(f"{path} is not a knowledge index file")
+    if version != INDEX_FORMAT_VERSION:
+        raise IndexFileError(
+            f"Knowledge index {path} has format version {version}, expected {INDEX_FORMAT_VERSION}"
+        )
+    try:
+        block = json.loads(mapped[_FILE_HEADER.size : _FILE_HEADER.size + block_length])
+    except ValueError as exc:
+        raise IndexFileError(f"Knowledge index {path} has a corrupt header") from exc
+
+    data_start = _aligned(_FILE_HEADER.size + block_length)
+    arrays: Dict[str, np.ndarray] = {}
+    for name, entry in block["arrays"].items():
+        shape = tuple(entry["shape"])
+        dtype = np.dtype(_FILE_DTYPES[entry["dtype"]])
+        count = int(np.prod(shape))
+        offset = data_start + entry["offset"]
+        if len(mapped) < offset + count * dtype.itemsize:
+            raise IndexFileError(f"Knowledge index {path} is truncated")
+        # The array keeps the mapping alive; pages are shared with other processes.
+        arrays[name] = np.frombuffer(mapped, dtype=dtype, count=count, offset=offset).reshape(shape)
+    return arrays, block["metadata"]
+
+
+def top_k(scores: np.ndarray, limit: int) -> List[Tuple[float, int]]:
+    if limit <= 0:
+        return []
+    candidates = np.flatnonzero(scores > 0)
+    if candidates.size > limit:
+        candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+    # Highest score first; ties keep document order.
+    ordered = candidates[np.lexsort((candidates, -scores[candidates]))]
+    return [(float(scores[doc_id]), int(doc_id)) for doc_id in ordered]
@@ -1,19 +1,53 @@
 import asyncio
+import json
 import logging
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from collections import deque
+from typing import TYPE_CHECKING, Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
 
 import httpx
 from fastapi import HTTPException, status
 
+from .identity_tokens import IdentityTokenCache
+from .metrics import LatencyRecorder
+
+if TYPE_CHECKING:
+    from .admission import AdmissionController
+
 logger = logging.getLogger(__name__)
 
 
 class BaseLLMClient(ABC):
     @abstractmethod
-    async def chat(self, system_prompt: str, messages: List[Dict[str, str]]) -> str:
+    async def chat(
+        self,
+        system_prompt: str,
+        messages: List[Dict[str, str]],
+        *,
+        state: Optional[str] = None,
+    ) -> str:
+        """Return the assistant reply. ``state`` is the onboarding state the prompt was built for."""
         raise NotImplementedError
 
+    async def aclose(self) -> None:
+        """Release any network resources held by the client."""
+        return None
+
+    async def stream_chat(
+        self,
+        system_prompt: str,
+        messages: List[Dict[str, str]],
+        *,
+        state: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Yield the reply incrementally. Clients without native streaming yield it whole."""
+        yield await self.chat(system_prompt, messages, state=state)
+
+    def stats(self) -> Dict[str, Any]:
+        """Operational counters exposed via the /chat/stats endpoint."""
+        return {}
+
 
 class OpenAICompatibleLLMClient(BaseLLMClient):
     def __init__(
@@ -25,6 +59,11 @@ class OpenAICompatibleLLMClient(BaseLLMClient):
         api_key: Optional[str] = None,
         timeout_seconds: float = 15.0,
         identity_audience: Optional[str] = None,
+        http2: bool = True,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        identity_refresh_margin_seconds: float = 300.0,
     ) -> None:
         self._base_url = base_url.rstrip("/")
         self._api_path = api_path if api_path.startswith("/") else f"/{api_path}"
@@ -32,12 +71,53 @@ class OpenAICompatibleLLMClient(BaseLLMClient):
         self._api_key = api_key
         self._timeout = timeout_seconds
         self._identity_audience = identity_audience
+        self._http2 = http2
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._prefix_cache = PrefixCacheStats()
+        self._token_cache = IdentityTokenCache(
+            _fetch_identity_token,
+            refresh_margin_seconds=identity_refresh_margin_seconds,
+        )
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        # One pooled client per LLM client so connections (and TLS sessions)
+        # are reused across /chat requests instead of re-handshaking per turn.
+        if self._client is None or self._client.is_closed:
+            http2 = self._http2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    logger.warning("h2 package not installed; falling back to HTTP/1.1 for LLM calls")
+                    http2 = False
+            self._client = httpx.AsyncClient(
+                timeout=self._timeout,
+                limits=self._limits,
+                http2=http2,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        await self._token_cache.aclose()
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
 
-    async def chat(self, system_prompt: str, messages: List[Dict[str, str]]) -> str:
-        payload = {
+    async def _prepare_request(
+        self, system_prompt: str, messages: List[Dict[str, str]], *, stream: bool = False
+    ) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+        payload: Dict[str, Any] = {
             "model": self._model_name,
             "messages": [{"role": "system", "content": system_prompt}, *messages],
         }
+        if stream:
+            payload["stream"] = True
+            payload["stream_options"] = {"include_usage": True}
         headers: Dict[str, str] = {"Content-Type": "application/json"}
         if self._api_key:
             headers["Authorization"] = f"Bearer {self._api_key}"
@@ -48,10 +128,19 @@ class OpenAICompatibleLLMClient(BaseLLMClient):
         api_path = self._api_path
         if self._base_url.endswith("/v1") and api_path.startswith("/v1/"):
             api_path = api_path[3:]
-        url = f"{self._base_url}{api_path}"
+        return f"{self._base_url}{api_path}", payload, headers
+
+    async def chat(
+        self,
+        system_prompt: str,
+        messages: List[Dict[str, str]],
+        *,
+        state: Optional[str] = None,
+    ) -> str:
+        url, payload, headers = await self._prepare_request(system_prompt, messages)
         try:
-            async with httpx.AsyncClient(timeout=self._timeout) as client:
-                response = await client.post(url, json=payload, headers=headers)
+            client = self._get_http_client()
+            response = await client.post(url, json=payload, headers=headers)
         except httpx.RequestError as exc:
             logger.exception("LLM request failed: %s", exc)
             raise HTTPException(
@@ -69,6 +158,7 @@ class OpenAICompatibleLLMClient(BaseLLMClient):
             )
 
         data: Dict[str, Any] = response.json()
+        self._prefix_cache.record(data)
         try:
             return data["choices"][0]["message"]["content"]
         except (KeyError, IndexError, TypeError) as exc:
@@ -78,32 +168,452 @@ class OpenAICompatibleLLMClient(BaseLLMClient):
                 detail="Invalid response from language model service.",
             ) from exc
 
+    async def stream_chat(
+        self,
+        system_prompt: str,
+        messages: List[Dict[str, str]],
+        *,
+        state: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        url, payload, headers = await self._prepare_request(system_prompt, messages, stream=True)
+        client = self._get_http_client()
+        try:
+            async with client.stream("POST", url, json=payload, headers=headers) as response:
+                if response.status_code >= 400:
+                    body = await response.aread()
+                    logger.error(
+                        "LLM returned error status %s: %s", response.status_code, body.decode(errors="replace")
+                    )
+                    raise HTTPException(
+                        status_code=status.HTTP_502_BAD_GATEWAY,
+                        detail="Language model service responded with an error.",
+                    )
+                async for line in response.aiter_lines():
+                    chunk = _decode_stream_line(line)
+                    if chunk is _STREAM_DONE:
+                        break
+                    if chunk is None:
+                        continue
+                    self._prefix_cache.record(chunk)
+                    delta = _stream_delta(chunk)
+                    if delta:
+                        yield delta
+                    if chunk.get("done") is True:
+                        break
+        except httpx.RequestError as exc:
+            logger.exception("LLM streaming request failed: %s", exc)
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="Unable to reach language model service. Please try again later.",
+            ) from exc
+
     async def _build_identity_headers(self) -> Dict[str, str]:
         if not self._identity_audience:
             return {}
 
-        def _blocking_fetch() -> str:
-            try:
-                from google.auth.transport.requests import Request
-                from google.oauth2 import id_token
-            except ImportError as exc:  # pragma: no cover - defensive
-                logger.error("google-auth library is required for identity tokens")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Server is missing google-auth dependency required for identity tokens.",
-                ) from exc
+        token = await self._token_cache.get_token(self._identity_audience)
+        return {"Authorization": f"Bearer {token}"}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "identity_tokens": self._token_cache.stats(),
+            "prefix_cache": self._prefix_cache.stats(),
+        }
+
+
+_STREAM_DONE = object()
+
+
+def _decode_stream_line(line: str) -> Any:
+    """Decode one line of an OpenAI SSE or Ollama NDJSON stream into its JSON chunk."""
+    line = line.strip()
+    if not line or line.startswith(":"):
+        return None
+    if line.startswith("data:"):
+        line = line[5:].strip()
+    if line == "[DONE]":
+        return _STREAM_DONE
+    try:
+        return json.loads(line)
+    except ValueError:
+        logger.warning("Skipping malformed LLM stream line: %s", line)
+        return None
+
+
+def _stream_delta(chunk: Dict[str, Any]) -> Optional[str]:
+    try:
+        if "choices" in chunk:
+            # Usage-only chunks (stream_options.include_usage) carry no choices.
+            if not chunk["choices"]:
+                return None
+            return chunk["choices"][0].get("delta", {}).get("content")
+        return chunk["message"]["content"]
+    except (KeyError, IndexError, TypeError, AttributeError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Invalid response from language model service.",
+        ) from exc
+
+
+class PrefixCacheStats:
+    """Aggregate prompt-prefix cache reuse reported by the LLM server."""
+
+    def __init__(self) -> None:
+        self.responses = 0
+        self.responses_with_cache_info = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, body: Dict[str, Any]) -> None:
+        usage = body.get("usage") or {}
+        prompt_tokens = usage.get("prompt_tokens")
+        cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+        timings = body.get("timings")
+        if cached_tokens is None and isinstance(timings, dict) and "cache_n" in timings:
+            # llama.cpp server reports reuse in its timings block instead.
+            cached_tokens = timings["cache_n"]
+            prompt_tokens = prompt_tokens or cached_tokens + timings.get("prompt_n", 0)
+        if not prompt_tokens:
+            return
+        self.responses += 1
+        if cached_tokens is None:
+            return
+        self.responses_with_cache_info += 1
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "responses": self.responses,
+            "responses_with_cache_info": self.responses_with_cache_info,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "hit_ratio": (
+                round(self.cached_tokens / self.prompt_tokens, 4) if self.prompt_tokens else None
+            ),
+        }
+
+
+def _fetch_identity_token(audience: str) -> str:
+    try:
+        from google.auth.transport.requests import Request
+        from google.oauth2 import id_token
+    except ImportError as exc:  # pragma: no cover - defensive
+        logger.error("google-auth library is required for identity tokens")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Server is missing google-auth dependency required for identity tokens.",
+        ) from exc
+
+    request = Request()
+    try:
+        return id_token.fetch_id_token(request, audience)
+    except Exception as exc:  # pragma: no cover
+        logger.exception("Failed to fetch identity token for audience %s", audience)
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Unable to authenticate with language model service.",
+        ) from exc
+
+
+class CircuitOpenError(HTTPException):
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Language model service is temporarily unavailable.",
+        )
+
 
-            request = Request()
+class CircuitBreaker:
+    """Closed/open/half-open breaker driven by recent error and slow-call rates."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        *,
+        window_size: int = 20,
+        min_calls: int = 5,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 8.0,
+        slow_call_rate_threshold: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+    ) -> None:
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)
+        self._min_calls = min_calls
+        self._failure_rate_threshold = failure_rate_threshold
+        self._slow_call_seconds = slow_call_seconds
+        self._slow_call_rate_threshold = slow_call_rate_threshold
+        self._open_seconds = open_seconds
+        self._half_open_max_calls = half_open_max_calls
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self.rejected = 0
+        self.transitions: Deque[Dict[str, Any]] = deque(maxlen=20)
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._open_seconds:
+            self._transition(self.HALF_OPEN)
+        return self._state
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._half_open_in_flight < self._half_open_max_calls:
+            self._half_open_in_flight += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, success: bool, latency_seconds: float) -> None:
+        slow = latency_seconds >= self._slow_call_seconds
+        if self._state == self.HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            self._transition(self.CLOSED if success and not slow else self.OPEN)
+            return
+
+        self._outcomes.append((success, slow))
+        if self._state != self.CLOSED or len(self._outcomes) < self._min_calls:
+            return
+        total = len(self._outcomes)
+        failure_rate = sum(1 for ok, _ in self._outcomes if not ok) / total
+        slow_rate = sum(1 for _, is_slow in self._outcomes if is_slow) / total
+        if failure_rate >= self._failure_rate_threshold or slow_rate >= self._slow_call_rate_threshold:
+            self._transition(self.OPEN)
+
+    def abandon(self) -> None:
+        """Release a half-open probe slot for a call that was cancelled before completing."""
+        if self._state == self.HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def _transition(self, new_state: str) -> None:
+        if new_state == self._state:
+            if new_state == self.OPEN:
+                self._opened_at = time.monotonic()
+            return
+        logger.warning("LLM circuit breaker %s -> %s", self._state, new_state)
+        self.transitions.append({"from": self._state, "to": new_state, "at": time.time()})
+        self._state = new_state
+        if new_state == self.OPEN:
+            self._opened_at = time.monotonic()
+        if new_state != self.HALF_OPEN:
+            self._half_open_in_flight = 0
+        if new_state == self.CLOSED:
+            self._outcomes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "rejected": self.rejected,
+            "window_calls": len(self._outcomes),
+            "transitions": list(self.transitions),
+        }
+
+
+class ResilientLLMClient(BaseLLMClient):
+    """
+    Guard a client with a circuit breaker, a latency-derived timeout and optional hedging.
+
+    The timeout is ``p99 * timeout_multiplier`` of recent successful calls, clamped
+    to ``[min_timeout_seconds, max_timeout_seconds]``; until ``min_samples`` calls
+    have been observed the maximum applies. With hedging enabled, a second
+    identical request is sent once the first exceeds the observed
+    ``hedge_percentile`` latency, and whichever finishes first wins. When
+    this client sits below an ``AdmissionLLMClient``, pass its controller as
+    ``admission``: a hedge then needs a free slot of its own, and is skipped
+    when every slot is taken or requests are queued, so hedging never pushes
+    concurrency past ``max_in_flight``.
+
+    Streams are measured by time-to-first-token in a separate recorder: a long
+    generation is not a slow call, and its total duration must not inflate the
+    non-streaming timeout or hedge delay. The breaker judges streams by that
+    first-token latency too.
+    """
+
+    def __init__(
+        self,
+        inner: BaseLLMClient,
+        *,
+        breaker: Optional[CircuitBreaker] = None,
+        adaptive_timeout: bool = True,
+        timeout_multiplier: float = 3.0,
+        min_timeout_seconds: float = 2.0,
+        max_timeout_seconds: float = 15.0,
+        min_samples: int = 20,
+        hedge_enabled: bool = False,
+        hedge_percentile: float = 95.0,
+        admission: Optional["AdmissionController"] = None,
+    ) -> None:
+        self._inner = inner
+        self._breaker = breaker or CircuitBreaker()
+        self._adaptive_timeout = adaptive_timeout
+        self._timeout_multiplier = timeout_multiplier
+        self._min_timeout = min_timeout_seconds
+        self._max_timeout = max_timeout_seconds
+        self._min_samples = min_samples
+        self._hedge_enabled = hedge_enabled
+        self._hedge_percentile = hedge_percentile
+        self._admission = admission
+        self._latencies = LatencyRecorder(window=512)
+        self._first_token_latencies = LatencyRecorder(window=512)
+        self.timeouts = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.hedges_skipped = 0
+
+    def current_timeout(self) -> float:
+        return self._timeout_from(self._latencies)
+
+    def current_stream_timeout(self) -> float:
+        """Time-to-first-token limit for streamed completions."""
+        return self._timeout_from(self._first_token_latencies)
+
+    def _timeout_from(self, latencies: LatencyRecorder) -> float:
+        if not self._adaptive_timeout or latencies.count < self._min_samples:
+            return self._max_timeout
+        p99 = latencies.percentile(99) or self._max_timeout
+        return min(self._max_timeout, max(self._min_timeout, p99 * self._timeout_multiplier))
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self._hedge_enabled or self._latencies.count < self._min_samples:
+            return None
+        return self._latencies.percentile(self._hedge_percentile)
+
+    async def chat(
+        self,
+        system_prompt: str,
+        messages: List[Dict[str, str]],
+        *,
+        state: Optional[str] = None,
+    ) -> str:
+        if not self._breaker.allow_request():
+            raise CircuitOpenError()
+
+        started = time.monotonic()
+        try:
+            reply = await asyncio.wait_for(
+                self._call_with_hedge(system_prompt, messages, state), self.current_timeout()
+            )
+        except asyncio.TimeoutError as exc:
+            self.timeouts += 1
+            self._breaker.record(False, time.monotonic() - started)
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Language model service timed out.",
+            ) from exc
+        except asyncio.CancelledError:
+            self._breaker.abandon()
+            raise
+        except Exception:
+            self._breaker.record(False, time.monotonic() - started)
+            raise
+
+        latency = time.monotonic() - started
+        self._latencies.observe(latency)
+        self._breaker.record(True, latency)
+        return reply
+
+    async def _call_with_hedge(
+        self, system_prompt: str, messages: List[Dict[str, str]], state: Optional[str]
+    ) -> str:
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is None:
+            return await self._inner.chat(system_prompt, messages, state=state)
+
+        primary = asyncio.ensure_future(self._inner.chat(system_prompt, messages, state=state))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+            if done:
+                return primary.result()
+
+            if self._admission is not None and not self._admission.try_acquire():
+                # No spare capacity: a hedge would overshoot the in-flight cap.
+                self.hedges_skipped += 1
+                return await primary
+
+            self.hedges_sent += 1
+            hedge = asyncio.ensure_future(self._inner.chat(system_prompt, messages, state=state))
+            if self._admission is not None:
+                # A callback, not a finally: it also runs if the hedge is cancelled before it starts.
+                hedge.add_done_callback(lambda _: self._admission.release())
+            pending.add(hedge)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedges_won += 1
+                        return task.result()
+                if not pending:
+                    # Both attempts failed; surface the primary error.
+                    return primary.result()
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream_chat(
+        self,
+        system_prompt: str,
+        messages: List[Dict[str, str]],
+        *,
+        state: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        if not self._breaker.allow_request():
+            raise CircuitOpenError()
+
+        started = time.monotonic()
+        first_token_latency: Optional[float] = None
+        iterator = self._inner.stream_chat(system_prompt, messages, state=state).__aiter__()
+        try:
+            # The adaptive timeout bounds time-to-first-token; later deltas are not cut off.
             try:
-                return id_token.fetch_id_token(request, self._identity_audience)
-            except Exception as exc:  # pragma: no cover
-                logger.exception("Failed to fetch identity token for audience %s", self._identity_audience)
+                first = await asyncio.wait_for(iterator.__anext__(), self.current_stream_timeout())
+            except StopAsyncIteration:
+                first = None
+            except asyncio.TimeoutError as exc:
+                self.timeouts += 1
                 raise HTTPException(
-                    status_code=status.HTTP_502_BAD_GATEWAY,
-                    detail="Unable to authenticate with language model service.",
+                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                    detail="Language model service timed out.",
                 ) from exc
+            first_token_latency = time.monotonic() - started
+            if first is not None:
+                yield first
+                async for delta in iterator:
+                    yield delta
+        except (asyncio.CancelledError, GeneratorExit):
+            self._breaker.abandon()
+            raise
+        except Exception:
+            failed_after = time.monotonic() - started if first_token_latency is None else first_token_latency
+            self._breaker.record(False, failed_after)
+            raise
+        self._first_token_latencies.observe(first_token_latency)
+        self._breaker.record(True, first_token_latency)
 
-        loop = asyncio.get_running_loop()
-        token = await loop.run_in_executor(None, _blocking_fetch)
-        return {"Authorization": f"Bearer {token}"}
+    async def aclose(self) -> None:
+        await self._inner.aclose()
 
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._inner.stats(),
+            "circuit_breaker": self._breaker.stats(),
+            "resilience": {
+                "timeout_seconds": round(self.current_timeout(), 3),
+                "stream_timeout_seconds": round(self.current_stream_timeout(), 3),
+                "latency": self._latencies.snapshot(),
+                "stream_first_token_latency": self._first_token_latencies.snapshot(),
+                "timeouts": self.timeouts,
+                "hedges_sent": self.hedges_sent,
+                "hedges_won": self.hedges_won,
+                "hedges_skipped": self.hedges_skipped,
+            },
+        }
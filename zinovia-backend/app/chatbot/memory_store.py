@@ -1,26 +1,220 @@
 """
-Ephemeral in-memory session store.
+Bounded in-memory session store (``CHAT_SESSION_BACKEND=memory``).
+
+Sessions are kept in LRU order, so the least recently used (and therefore
+longest idle) session is always at the front. The store is capped three ways:
+
+- ``CHAT_SESSION_MAX_SESSIONS``: count; the LRU session is evicted on overflow
+- ``CHAT_SESSION_MAX_BYTES``: optional cap on the estimated size of all
+  sessions, enforced the same way
+- ``CHAT_SESSION_TTL_SECONDS``: idle expiry
+
+Expired sessions are dropped when looked up. A background task also sweeps
+the store every ``CHAT_SESSION_SWEEP_INTERVAL_SECONDS``. Because LRU order is
+idle order, a sweep only pops expired sessions off the front and never scans
+the live ones. Size, evictions and expirations are reported under
+``sessions`` in ``GET /chat/stats``.
+
+``get`` hands out a copy of the stored conversation, and ``save`` is
+compare-and-set on its version, so two concurrent turns of one session never
+share state and the slower one fails with a conflict instead of
+overwriting the other.
 
 IMPORTANT: Cloud Run instances are stateless and may be restarted at any time.
-This module is suitable only for local development or single-instance demos.
-For production deployments, replace with a shared data store such as Redis,
-Firestore, or a relational database.
+Sessions held here are private to one worker process, so this backend is
+suitable only for local development or single-instance demos. Use the Redis
+backend (see ``session_store``) to share sessions across workers and instances.
 """
 
-from typing import Dict
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
 
-from .models import ConversationState
+from .conversation import Conversation
+from .session_store import SessionConflictError, SessionStore
 from .state import get_initial_state
 
-_sessions: Dict[str, ConversationState] = {}
+logger = logging.getLogger(__name__)
+
+# Approximate CPython footprint of an empty Conversation and of each history
+# message on top of its text, measured with tracemalloc
+# (see benchmarks/bench_sessions.py).
+SESSION_OVERHEAD_BYTES = 300
+MESSAGE_OVERHEAD_BYTES = 70
+# Sessions expired per sweep batch before yielding to the event loop.
+_SWEEP_BATCH = 1000
+
+
+def estimate_session_bytes(conversation: Conversation) -> int:
+    size = SESSION_OVERHEAD_BYTES
+    for value in (conversation.goal, conversation.name, conversation.email, conversation.summary):
+        if value:
+            size += len(value)
+    for _, content in conversation.history:
+        size += MESSAGE_OVERHEAD_BYTES + len(content)
+    return size
+
+
+class _Entry:
+    __slots__ = ("conversation", "size", "expires_at")
+
+    def __init__(self, conversation: Conversation, size: int, expires_at: float) -> None:
+        self.conversation = conversation
+        self.size = size
+        self.expires_at = expires_at
+
+
+class InMemorySessionStore(SessionStore):
+    def __init__(
+        self,
+        *,
+        max_sessions: int = 10_000,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: float = 1800.0,
+        sweep_interval_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._max_sessions = max_sessions
+        self._max_bytes = max_bytes or None
+        self._ttl = ttl_seconds
+        self._sweep_interval = sweep_interval_seconds
+        self._clock = clock
+        self._sweeper: Optional[asyncio.Task] = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.sweeps = 0
+        self.conflicts = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, session_id: str) -> Conversation:
+        """The stored session, or a fresh one (not stored until ``save``) when unknown or expired."""
+        conversation = self.lookup(session_id)
+        return conversation.copy() if conversation is not None else get_initial_state()
+
+    def lookup(self, session_id: str) -> Optional[Conversation]:
+        """
+        The stored session itself (not a copy), or None when unknown or
+        expired; a hit counts as an access.
+        """
+        entry = self._entries.get(session_id)
+        if entry is not None and entry.expires_at <= self._clock():
+            self._remove(session_id)
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Refreshing the expiry on every access keeps LRU order and expiry order identical.
+        entry.expires_at = self._clock() + self._ttl
+        self._entries.move_to_end(session_id)
+        return entry.conversation
+
+    async def save(self, session_id: str, conversation: Conversation) -> None:
+        current = self._entries.get(session_id)
+        if (
+            current is not None
+            and current.expires_at > self._clock()
+            and current.conversation.version != conversation.version
+        ):
+            self.conflicts += 1
+            raise SessionConflictError()
+        conversation.version += 1
+        self.put(session_id, conversation)
+
+    def put(self, session_id: str, conversation: Conversation) -> None:
+        """Store ``conversation`` as is, without a version check (read-through fills)."""
+        self._ensure_sweeper()
+        previous = self._entries.pop(session_id, None)
+        if previous is not None:
+            self.bytes -= previous.size
+        size = estimate_session_bytes(conversation)
+        self._entries[session_id] = _Entry(conversation, size, self._clock() + self._ttl)
+        self.bytes += size
+        self._enforce_limits()
+
+    async def delete(self, session_id: str) -> None:
+        if session_id in self._entries:
+            self._remove(session_id)
+
+    def _remove(self, session_id: str) -> None:
+        self.bytes -= self._entries.pop(session_id).size
+
+    def _enforce_limits(self) -> None:
+        # The session just saved is at the back and is never evicted by its own save.
+        while len(self._entries) > 1 and (
+            len(self._entries) > self._max_sessions
+            or (self._max_bytes is not None and self.bytes > self._max_bytes)
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self.bytes -= entry.size
+            self.evictions += 1
+
+    def sweep(self, limit: Optional[int] = None) -> int:
+        """Drop expired sessions from the idle end; returns how many were removed."""
+        now = self._clock()
+        removed = 0
+        while self._entries and (limit is None or removed < limit):
+            session_id, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now:
+                break
+            self._remove(session_id)
+            removed += 1
+        self.expirations += removed
+        return removed
 
+    def _ensure_sweeper(self) -> None:
+        if self._sweep_interval <= 0 or (self._sweeper is not None and not self._sweeper.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # synchronous use (scripts, benchmarks): expiry stays lazy
+        self._sweeper = loop.create_task(self._sweep_forever())
 
-def get_session(session_id: str) -> ConversationState:
-    if session_id not in _sessions:
-        _sessions[session_id] = get_initial_state()
-    return _sessions[session_id]
+    async def _sweep_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self._sweep_interval)
+            self.sweeps += 1
+            removed = batch = self.sweep(_SWEEP_BATCH)
+            # Sweep in batches so a mass expiry does not stall request handling.
+            while batch == _SWEEP_BATCH:
+                await asyncio.sleep(0)
+                batch = self.sweep(_SWEEP_BATCH)
+                removed += batch
+            if removed:
+                logger.debug("Expired %d idle chat sessions", removed)
 
+    async def aclose(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
 
-def save_session(session_id: str, state: ConversationState) -> None:
-    _sessions[session_id] = state
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "sessions": len(self._entries),
+            "max_sessions": self._max_sessions,
+            "bytes": self.bytes,
+            "max_bytes": self._max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "sweeps": self.sweeps,
+            "conflicts": self.conflicts,
+        }
 
@@ -0,0 +1,51 @@
+"""
+Lightweight in-process latency and size metrics for the chatbot.
+
+Samples are kept in a bounded window so percentiles reflect recent traffic and
+memory stays constant. Snapshots are reported via GET /chat/stats.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class ValueRecorder:
+    def __init__(self, window: int = 1024) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self._samples.append(value)
+        self.count += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "max": max(self._samples) if self._samples else None,
+        }
+
+
+class LatencyRecorder(ValueRecorder):
+    """ValueRecorder for durations in seconds, reported in milliseconds."""
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        def _ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            "count": self.count,
+            "p50_ms": _ms(self.percentile(50)),
+            "p95_ms": _ms(self.percentile(95)),
+            "p99_ms": _ms(self.percentile(99)),
+        }
@@ -0,0 +1,81 @@
+"""
+Hashed character n-gram vectors for typo- and inflection-tolerant retrieval.
+
+Every passage is encoded once into a fixed-width vector: each non-stopword is
+padded with spaces and cut into character 3- and 4-grams, which are hashed
+(CRC32, stable across processes) into ``dimensions`` buckets with sublinear
+counts, then L2-normalised. The vectors of all passages form one contiguous
+``float32`` matrix, so cosine similarity against a query is a single
+matrix-vector product and needs no model, network or GPU.
+
+The same encoding of the index vocabulary lets misspelled query words
+("pricng", "integratoins") be resolved to the nearest known term, since
+they still share most of its n-grams. Those term vectors are stored in the
+index file too, and a lookup only compares the word against a small set of
+candidate rows.
+"""
+
+from __future__ import annotations
+
+import zlib
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .text_processing import STOPWORDS, tokenize
+
+NGRAM_DIMENSIONS = 1024
+NGRAM_SIZES = (3, 4)
+
+
+def encode(text: str, dimensions: int = NGRAM_DIMENSIONS) -> np.ndarray:
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for token in tokenize(text):
+        if token in STOPWORDS:
+            continue
+        padded = f" {token} "
+        for size in NGRAM_SIZES:
+            for position in range(len(padded) - size + 1):
+                bucket = zlib.crc32(padded[position : position + size].encode("utf-8")) % dimensions
+                vector[bucket] += 1.0
+    np.log1p(vector, out=vector)
+    norm = float(np.linalg.norm(vector))
+    if norm:
+        vector /= norm
+    return vector
+
+
+class NgramVectorIndex:
+    def __init__(self, vectors: np.ndarray) -> None:
+        # Shape (passages, dimensions); rows are unit length or zero.
+        self.vectors = vectors
+
+    @classmethod
+    def build(cls, texts: Sequence[str], dimensions: int = NGRAM_DIMENSIONS) -> "NgramVectorIndex":
+        vectors = np.zeros((len(texts), dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            vectors[row] = encode(text, dimensions)
+        return cls(vectors)
+
+    @property
+    def dimensions(self) -> int:
+        return self.vectors.shape[1]
+
+    def similarities(self, query: str) -> np.ndarray:
+        """Cosine similarity of ``query`` to every passage."""
+        return self.vectors @ encode(query, self.dimensions)
+
+    def similarity_matrix(self, queries: Sequence[str]) -> np.ndarray:
+        """Cosine similarities with shape (queries, passages)."""
+        if not queries:
+            return np.zeros((0, len(self.vectors)), dtype=np.float32)
+        encoded = np.stack([encode(query, self.dimensions) for query in queries])
+        return encoded @ self.vectors.T
+
+    def nearest_among(self, text: str, rows: np.ndarray, min_similarity: float) -> Optional[int]:
+        """Closest of ``rows`` to ``text``, or None when none reaches ``min_similarity``."""
+        if not len(rows):
+            return None
+        similarities = self.vectors[rows] @ encode(text, self.dimensions)
+        best = int(similarities.argmax())
+        return int(rows[best]) if similarities[best] >= min_similarity else None
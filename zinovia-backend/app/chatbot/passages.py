@@ -0,0 +1,134 @@
+"""
+Passage chunking and token-budgeted packing for knowledge retrieval.
+
+Sections are split at index time into overlapping windows of whole lines
+(about ``passage_tokens`` each, sharing about ``overlap_tokens`` with the
+previous window) so a match never drags a whole long section into the
+prompt. At query time the best-scoring passages are packed into a token
+budget. Lines already taken from an overlapping passage are not repeated,
+and passages from the same section are merged back into one excerpt under a
+``[Source: document > heading > sub-heading]`` breadcrumb.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .history import estimate_tokens
+
+SUBHEADING_PREFIX = "### "
+GAP_MARKER = "..."
+
+
+@dataclass(frozen=True)
+class KnowledgePassage:
+    document: str
+    section: int  # position of the parent section within its document
+    breadcrumb: Tuple[str, ...]
+    start: int  # first line of the window within the section, inclusive
+    lines: Tuple[str, ...]
+
+    @property
+    def heading(self) -> str:
+        return self.breadcrumb[0]
+
+    @property
+    def source(self) -> str:
+        return " > ".join((self.document, *self.breadcrumb))
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+
+def chunk_section(
+    document: str,
+    section: int,
+    heading: str,
+    content: str,
+    *,
+    passage_tokens: int,
+    overlap_tokens: int,
+) -> List[KnowledgePassage]:
+    lines = content.split("\n")
+    costs = [estimate_tokens(line) for line in lines]
+    subheadings: List[Optional[str]] = []
+    current: Optional[str] = None
+    for line in lines:
+        if line.startswith(SUBHEADING_PREFIX):
+            current = line[len(SUBHEADING_PREFIX) :].strip()
+        subheadings.append(current)
+
+    passages: List[KnowledgePassage] = []
+    start = 0
+    while start < len(lines):
+        end, total = start, 0
+        # A single oversized line still forms a passage of its own.
+        while end < len(lines) and (end == start or total + costs[end] <= passage_tokens):
+            total += costs[end]
+            end += 1
+        subheading = subheadings[start]
+        breadcrumb = (heading, subheading) if subheading else (heading,)
+        passages.append(KnowledgePassage(document, section, breadcrumb, start, tuple(lines[start:end])))
+        if end >= len(lines):
+            break
+
+        # Step back so the next window repeats roughly overlap_tokens of this one,
+        # while always advancing by at least one line.
+        next_start, overlap = end, 0
+        while next_start - 1 > start and overlap + costs[next_start - 1] <= overlap_tokens:
+            next_start -= 1
+            overlap += costs[next_start]
+        start = next_start
+    return passages
+
+
+def pack_passages(passages: Sequence[KnowledgePassage], budget_tokens: int) -> str:
+    """Pack passages (best first) into ``budget_tokens``, merging overlaps per section."""
+    selected: Dict[Tuple[str, int], Dict[int, str]] = {}
+    first_passage: Dict[Tuple[str, int], KnowledgePassage] = {}
+    used = 0
+    for passage in passages:
+        key = (passage.document, passage.section)
+        chosen = selected.get(key, {})
+        new_lines = [
+            (passage.start + offset, line)
+            for offset, line in enumerate(passage.lines)
+            if passage.start + offset not in chosen
+        ]
+        if not new_lines:
+            continue
+        cost = sum(estimate_tokens(line) for _, line in new_lines)
+        if key not in selected:
+            cost += estimate_tokens(f"[Source: {passage.source}]")
+        if used + cost > budget_tokens:
+            if selected:
+                continue
+            # The best passage is always included, truncated to the budget if necessary.
+            fitted, cost = [], 0
+            for number, line in new_lines:
+                line_cost = estimate_tokens(line)
+                if fitted and cost + line_cost > budget_tokens:
+                    break
+                fitted.append((number, line))
+                cost += line_cost
+            new_lines = fitted
+        chosen.update(new_lines)
+        selected[key] = chosen
+        # The breadcrumb comes from the earliest window, whose start opens the excerpt.
+        if key not in first_passage or passage.start < first_passage[key].start:
+            first_passage[key] = passage
+        used += cost
+
+    blocks: List[str] = []
+    for key, chosen in selected.items():
+        rendered: List[str] = []
+        previous: Optional[int] = None
+        for number in sorted(chosen):
+            if previous is not None and number != previous + 1:
+                rendered.append(GAP_MARKER)
+            rendered.append(chosen[number])
+            previous = number
+        blocks.append(f"[Source: {first_passage[key].source}]\n" + "\n".join(rendered))
+    return "\n\n".join(blocks)
@@ -0,0 +1,117 @@
+"""
+System prompt assembly for the onboarding assistant.
+
+Prompts are laid out so LLM servers with prefix (KV) caching can reuse work
+across turns and sessions: a byte-identical static prefix (persona, services
+listing, guidelines) comes first, followed by a precompiled per-state section,
+and only then the per-turn content (structured details, knowledge excerpt,
+conversation summary). Nothing volatile may be placed before the per-turn
+section.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from .conversation import Conversation
+from .services_descriptions import format_services_listing
+from .state import FLOW, OnboardingState
+
+PERSONA = (
+    "You are Zinovia's customer onboarding assistant. "
+    "You guide prospects through a short discovery flow and recommend services. "
+    "Keep responses friendly, concise, and professional. "
+    "If the user asks unrelated questions, answer them briefly and steer back to the flow.\n\n"
+)
+
+GUIDELINES = (
+    "Guidelines:\n"
+    "- Use only the knowledge base excerpt below together with the scripted onboarding instructions.\n"
+    "- Follow the 'Next action' guidance even if the excerpt does not describe it explicitly.\n"
+    "- Excerpt sections are tagged with their [Source: document > heading]; cite it when quoting specifics.\n"
+    "- If the user requests information not covered in the excerpt, reply exactly with \"I don't know.\" "
+    "Do not fabricate details.\n"
+    "When presenting services, prefer short paragraphs or bullet lists. "
+    "Thank the user during summary and reassure that a human will follow up soon.\n\n"
+)
+
+STATIC_PREFIX = (
+    PERSONA
+    + "Available services:\n"
+    + format_services_listing()
+    + "\n\n"
+    + GUIDELINES
+)
+
+STATE_INSTRUCTIONS: Dict[OnboardingState, str] = {
+    OnboardingState(name): state.instruction for name, state in FLOW.states.items()
+}
+DEFAULT_INSTRUCTION = "Continue the conversation helpfully."
+
+# Instructions that interpolate conversation fields are rendered per turn
+# instead of being baked into the state prefix.
+_DYNAMIC_INSTRUCTION_STATES = frozenset(
+    OnboardingState(name) for name, state in FLOW.states.items() if state.placeholders
+)
+
+
+def state_instruction(state: OnboardingState, conversation: Conversation) -> str:
+    flow_state = FLOW.states.get(state.value)
+    if flow_state is None:
+        return DEFAULT_INSTRUCTION
+    return flow_state.render_instruction(conversation)
+
+
+def _compile_state_prefix(state: OnboardingState) -> str:
+    prefix = f"{STATIC_PREFIX}Current onboarding state: {state.value}\n"
+    if state not in _DYNAMIC_INSTRUCTION_STATES:
+        prefix += f"Next action: {STATE_INSTRUCTIONS[state]}\n"
+    return prefix
+
+
+STATE_PREFIXES: Dict[OnboardingState, str] = {
+    state: _compile_state_prefix(state) for state in OnboardingState
+}
+
+
+def _structured_details(conversation: Conversation) -> str:
+    details: List[str] = []
+    if conversation.user_type:
+        details.append(f"User type: {conversation.user_type}")
+    if conversation.goal:
+        details.append(f"Goal: {conversation.goal}")
+    if conversation.selected_service:
+        details.append(f"Suggested service: {conversation.selected_service}")
+    if conversation.name:
+        details.append(f"Name: {conversation.name}")
+    if conversation.email:
+        details.append(f"Email: {conversation.email}")
+    return "\n".join(details) if details else "No structured details captured yet."
+
+
+def build_system_prompt(
+    conversation: Conversation,
+    knowledge_text: str,
+    knowledge_matched: bool,
+    state_override: Optional[OnboardingState] = None,
+) -> str:
+    state = state_override or OnboardingState(conversation.state)
+
+    parts = [STATE_PREFIXES[state]]
+    if state in _DYNAMIC_INSTRUCTION_STATES:
+        parts.append(f"Next action: {state_instruction(state, conversation)}\n")
+    parts.append(f"Structured details so far:\n{_structured_details(conversation)}\n\n")
+
+    knowledge_text = knowledge_text.strip() or "No knowledge base excerpt available."
+    parts.append(f"Knowledge base excerpt:\n{knowledge_text}\n\n")
+    if knowledge_matched:
+        parts.append("The excerpt above is the best-matching knowledge for the latest user request.")
+    else:
+        parts.append(
+            "No specific knowledge entry matched the latest user message. "
+            'If the user asks for information outside this excerpt, reply exactly with "I don\'t know."'
+        )
+
+    if conversation.summary:
+        parts.append(f"\n\nSummary of earlier conversation:\n{conversation.summary}")
+    return "".join(parts)
@@ -0,0 +1,156 @@
+"""
+Optional LRU + TTL cache for LLM replies.
+
+Replies are keyed on a hash of the full system prompt together with the
+normalized latest user message, so a hit only happens when the model would see
+the same instructions, state and knowledge excerpt. Caching is opt-in per
+onboarding state; states that carry personal details are never cached.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from .llm_client import BaseLLMClient
+from .text_processing import normalize_user_message
+
+# From SUMMARY onwards the system prompt carries the visitor's name, email and
+# rolling summary: keys would be unique per visitor, and replies may echo
+# those details back.
+PERSONAL_DATA_STATES = frozenset({"SUMMARY", "DONE"})
+
+
+def _last_user_message(messages: List[Dict[str, str]]) -> Optional[str]:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return message.get("content", "")
+    return None
+
+
+class ReplyCache:
+    def __init__(self, *, max_entries: int = 1024, ttl_seconds: float = 600.0) -> None:
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(system_prompt: str, user_message: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(system_prompt.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(normalize_user_message(user_message).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, reply = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return reply
+
+    def put(self, key: str, reply: str) -> None:
+        self._entries[key] = (time.monotonic() + self._ttl, reply)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class CachingLLMClient(BaseLLMClient):
+    """Serve repeated prompts from a ReplyCache before calling the wrapped client."""
+
+    def __init__(
+        self,
+        inner: BaseLLMClient,
+        *,
+        cacheable_states: Iterable[str],
+        max_entries: int = 1024,
+        ttl_seconds: float = 600.0,
+    ) -> None:
+        self._inner = inner
+        self._cacheable_states = frozenset(cacheable_states) - PERSONAL_DATA_STATES
+        self._cache = ReplyCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.bypassed = 0
+
+    def _cache_key(
+        self, system_prompt: str, messages: List[Dict[str, str]], state: Optional[str]
+    ) -> Optional[str]:
+        user_message = _last_user_message(messages)
+        if state not in self._cacheable_states or user_message is None:
+            self.bypassed += 1
+            return None
+        return self._cache.make_key(system_prompt, user_message)
+
+    async def chat(
+        self,
+        system_prompt: str,
+        messages: List[Dict[str, str]],
+        *,
+        state: Optional[str] = None,
+    ) -> str:
+        key = self._cache_key(system_prompt, messages, state)
+        if key is not None:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+
+        reply = await self._inner.chat(system_prompt, messages, state=state)
+        if key is not None:
+            self._cache.put(key, reply)
+        return reply
+
+    async def stream_chat(
+        self,
+        system_prompt: str,
+        messages: List[Dict[str, str]],
+        *,
+        state: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        key = self._cache_key(system_prompt, messages, state)
+        if key is not None:
+            cached = self._cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        parts: List[str] = []
+        async for delta in self._inner.stream_chat(system_prompt, messages, state=state):
+            parts.append(delta)
+            yield delta
+        if key is not None:
+            self._cache.put(key, "".join(parts))
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._inner.stats(),
+            "reply_cache": {**self._cache.stats(), "bypassed": self.bypassed},
+        }
@@ -0,0 +1,220 @@
+"""
+Latency-aware routing across several OpenAI-compatible LLM endpoints.
+
+Each request goes to the healthy endpoint with the lowest load score, either
+least outstanding requests or an EWMA of observed latency scaled by queue
+length, divided by the endpoint weight. Complete replies and streams are
+scored separately: streams are measured to their first token, which says
+nothing about how long a full completion takes, so each request kind is
+routed on its own EWMA. An endpoint without a measurement yet is scored at
+the pool's mean, and a call still outstanding counts for at least as long as
+it has been running, so a replica that hangs loses traffic before its first
+reply. A call cancelled mid-flight (for example by the resilient layer's
+timeout) counts as a failure. Endpoints that fail repeatedly are
+ejected for a cool-down period that doubles on repeated ejections; afterwards
+they rejoin the pool and one success resets their backoff.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .llm_client import BaseLLMClient
+from .metrics import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+LEAST_OUTSTANDING = "least_outstanding"
+EWMA = "ewma"
+
+# Request kinds with separate latency estimates.
+COMPLETE = "complete"
+STREAM = "stream"
+
+# Cancellation is how a caller's timeout reaches the routed call; it is not an Exception.
+_CALL_FAILURES = (Exception, asyncio.CancelledError)
+
+
+class RoutedEndpoint:
+    def __init__(
+        self,
+        name: str,
+        client: BaseLLMClient,
+        *,
+        weight: float = 1.0,
+        ewma_alpha: float = 0.3,
+    ) -> None:
+        self.name = name
+        self.client = client
+        self.weight = max(weight, 0.01)
+        # Start times of the calls in flight.
+        self._started: List[float] = []
+        self.ewma_seconds: Dict[str, Optional[float]] = {COMPLETE: None, STREAM: None}
+        self._alpha = ewma_alpha
+        self.latency = {COMPLETE: LatencyRecorder(), STREAM: LatencyRecorder()}
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self._backoff_level = 0
+
+    @property
+    def outstanding(self) -> int:
+        return len(self._started)
+
+    def begin(self) -> float:
+        started = time.monotonic()
+        self.requests += 1
+        self._started.append(started)
+        return started
+
+    def end(self, started: float) -> None:
+        self._started.remove(started)
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def score(self, strategy: str, kind: str, now: float, unmeasured_seconds: float = 0.0) -> float:
+        if strategy == EWMA:
+            ewma = self.ewma_seconds[kind]
+            estimate = ewma if ewma is not None else unmeasured_seconds
+            if self._started:
+                # A call that has not returned yet is at least this slow.
+                estimate = max(estimate, now - self._started[0])
+            return estimate * (self.outstanding + 1) / self.weight
+        return self.outstanding / self.weight
+
+    def record_success(self, seconds: float, kind: str) -> None:
+        self.latency[kind].observe(seconds)
+        previous = self.ewma_seconds[kind]
+        self.ewma_seconds[kind] = (
+            seconds if previous is None else self._alpha * seconds + (1 - self._alpha) * previous
+        )
+        self.consecutive_failures = 0
+        self._backoff_level = 0
+
+    def record_failure(self, eject_after: int, base_eject_seconds: float, max_eject_seconds: float) -> None:
+        self.errors += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures < eject_after:
+            return
+        duration = min(max_eject_seconds, base_eject_seconds * (2 ** self._backoff_level))
+        self._backoff_level += 1
+        self.ejections += 1
+        self.consecutive_failures = 0
+        self.ejected_until = time.monotonic() + duration
+        logger.warning("Ejecting LLM endpoint %s for %.1fs", self.name, duration)
+
+    def stats(self) -> Dict[str, Any]:
+        def _ms(seconds: Optional[float]) -> Optional[float]:
+            return round(seconds * 1000, 2) if seconds is not None else None
+
+        return {
+            "weight": self.weight,
+            "healthy": self.is_available(time.monotonic()),
+            "outstanding": self.outstanding,
+            "ewma_ms": _ms(self.ewma_seconds[COMPLETE]),
+            "stream_first_token_ewma_ms": _ms(self.ewma_seconds[STREAM]),
+            "requests": self.requests,
+            "errors": self.errors,
+            "ejections": self.ejections,
+            "latency": self.latency[COMPLETE].snapshot(),
+            "stream_first_token_latency": self.latency[STREAM].snapshot(),
+            **self.client.stats(),
+        }
+
+
+class RoutingLLMClient(BaseLLMClient):
+    def __init__(
+        self,
+        endpoints: List[RoutedEndpoint],
+        *,
+        strategy: str = EWMA,
+        eject_after_failures: int = 3,
+        eject_seconds: float = 10.0,
+        max_eject_seconds: float = 120.0,
+    ) -> None:
+        if not endpoints:
+            raise ValueError("RoutingLLMClient requires at least one endpoint")
+        if strategy not in (LEAST_OUTSTANDING, EWMA):
+            raise ValueError(f"Unknown routing strategy: {strategy}")
+        self._endpoints = endpoints
+        self._strategy = strategy
+        self._eject_after = eject_after_failures
+        self._eject_seconds = eject_seconds
+        self._max_eject_seconds = max_eject_seconds
+
+    def _select(self, kind: str) -> RoutedEndpoint:
+        now = time.monotonic()
+        available = [endpoint for endpoint in self._endpoints if endpoint.is_available(now)]
+        if not available:
+            # Fail open: prefer the endpoint whose ejection ends first.
+            return min(self._endpoints, key=lambda endpoint: endpoint.ejected_until)
+        measured = [
+            endpoint.ewma_seconds[kind] for endpoint in available if endpoint.ewma_seconds[kind] is not None
+        ]
+        pool_mean = sum(measured) / len(measured) if measured else 0.0
+        return min(available, key=lambda endpoint: endpoint.score(self._strategy, kind, now, pool_mean))
+
+    def _record_failure(self, endpoint: RoutedEndpoint) -> None:
+        endpoint.record_failure(self._eject_after, self._eject_seconds, self._max_eject_seconds)
+
+    async def chat(
+        self,
+        system_prompt: str,
+        messages: List[Dict[str, str]],
+        *,
+        state: Optional[str] = None,
+    ) -> str:
+        endpoint = self._select(COMPLETE)
+        started = endpoint.begin()
+        try:
+            reply = await endpoint.client.chat(system_prompt, messages, state=state)
+        except _CALL_FAILURES:
+            self._record_failure(endpoint)
+            raise
+        finally:
+            endpoint.end(started)
+        endpoint.record_success(time.monotonic() - started, COMPLETE)
+        return reply
+
+    async def stream_chat(
+        self,
+        system_prompt: str,
+        messages: List[Dict[str, str]],
+        *,
+        state: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        endpoint = self._select(STREAM)
+        started = endpoint.begin()
+        first_token: Optional[float] = None
+        try:
+            async for delta in endpoint.client.stream_chat(system_prompt, messages, state=state):
+                if first_token is None:
+                    first_token = time.monotonic() - started
+                yield delta
+        except _CALL_FAILURES:
+            self._record_failure(endpoint)
+            raise
+        finally:
+            endpoint.end(started)
+        # Time to first token is what routing should optimise for streamed replies.
+        endpoint.record_success(
+            first_token if first_token is not None else time.monotonic() - started, STREAM
+        )
+
+    async def aclose(self) -> None:
+        for endpoint in self._endpoints:
+            await endpoint.client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "routing": {
+                "strategy": self._strategy,
+                "endpoints": {endpoint.name: endpoint.stats() for endpoint in self._endpoints},
+            }
+        }
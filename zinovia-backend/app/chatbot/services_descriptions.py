@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import Dict, List
 
 SERVICES: Dict[str, str] = {
@@ -8,6 +9,7 @@ SERVICES: Dict[str, str] = {
 }
 
 
+@lru_cache(maxsize=1)
 def format_services_listing() -> str:
     lines: List[str] = []
     for name, description in SERVICES.items():
@@ -0,0 +1,80 @@
+"""
+Per-session locks that queue concurrent turns of the same conversation.
+
+Double-clicks and client retries can deliver two messages for one
+``session_id`` at once. Versioned saves (see ``session_store``) already stop
+the second from silently overwriting the first, but that turn is then
+rejected with a 409. With ``CHAT_SESSION_LOCK_ENABLED`` a turn instead waits
+for the session's previous turn to finish, so both are applied in order.
+
+Each session gets its own ``asyncio.Lock``, so unrelated sessions never wait
+on each other. Entries are reference-counted by holders and waiters and
+removed when the last one leaves, so the table only ever holds sessions with
+a turn in flight. A turn that waits longer than
+``CHAT_SESSION_LOCK_TIMEOUT_SECONDS`` gives up with a 409.
+
+Locks are per process. Across workers and instances, versioned saves remain
+the safety net.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+from .session_store import SessionConflictError
+
+
+class _LockEntry:
+    __slots__ = ("lock", "users")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class SessionLocks:
+    def __init__(self, *, timeout_seconds: float = 30.0) -> None:
+        self._entries: Dict[str, _LockEntry] = {}
+        self._timeout = timeout_seconds
+        self.acquired = 0
+        self.contended = 0
+        self.timeouts = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @asynccontextmanager
+    async def hold(self, session_id: str) -> AsyncIterator[None]:
+        entry = self._entries.get(session_id)
+        if entry is None:
+            entry = self._entries[session_id] = _LockEntry()
+        entry.users += 1
+        try:
+            if entry.users > 1:
+                self.contended += 1
+            try:
+                await asyncio.wait_for(entry.lock.acquire(), self._timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise SessionConflictError(
+                    "Another message for this conversation is still being processed. Please try again."
+                ) from None
+            self.acquired += 1
+            try:
+                yield
+            finally:
+                entry.lock.release()
+        finally:
+            entry.users -= 1
+            if entry.users == 0:
+                del self._entries[session_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active_sessions": len(self._entries),
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "timeouts": self.timeouts,
+        }
@@ -0,0 +1,265 @@
+"""
+Pluggable async storage for onboarding sessions.
+
+``/chat`` talks to a ``SessionStore`` chosen by ``CHAT_SESSION_BACKEND``:
+
+- ``memory`` (default): the bounded per-process LRU in ``memory_store``
+- ``redis``: sessions shared by every worker and instance
+
+With the Redis backend, a request can land on any uvicorn worker or Cloud
+Run instance without restarting the flow, so the chatbot scales
+horizontally without sticky sessions.
+
+Saves are compare-and-set on ``Conversation.version``: a save succeeds
+only if the stored version is still the one the conversation was loaded at
+(or the session no longer exists), and then bumps it. Otherwise it raises
+``SessionConflictError`` (409), so two concurrent turns of one session
+cannot silently overwrite each other.
+
+The Redis store draws connections from a pool. A load is one pipelined
+round trip (GET plus EXPIRE, so idle TTL slides with activity). A save
+WATCHes the key, reads only the short version header with GETRANGE and
+writes with ``SET ... EX`` in a MULTI block, which Redis aborts if another
+save got there first. Sessions are serialized compactly:
+
+- JSON written straight from the ``Conversation`` slots, without
+  default-valued fields and without a pydantic round trip
+- history stored as ``[role, content]`` pairs with one-letter role codes
+- zlib compression once a payload passes ``COMPRESS_MIN_BYTES``
+
+Any Redis-protocol client works, so the store can be exercised against
+``fakeredis``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Tuple
+
+from fastapi import HTTPException, status
+
+from .conversation import PROFILE_FIELDS, ROLE_ASSISTANT, ROLE_SYSTEM, ROLE_USER, Conversation, HistoryRing
+from .state import get_initial_state
+
+logger = logging.getLogger(__name__)
+
+# Payload tags: plain compact JSON, or the same JSON zlib-compressed.
+_JSON_TAG = b"j"
+_ZLIB_TAG = b"z"
+COMPRESS_MIN_BYTES = 512
+_ROLE_CODES = {ROLE_USER: "u", ROLE_ASSISTANT: "a", ROLE_SYSTEM: "s"}
+_ROLE_NAMES = {code: role for role, code in _ROLE_CODES.items()}
+# Redis values are framed as b"<version>|<payload>"; payloads written before
+# versioning start with a tag byte and read as version 0.
+_VERSION_SEPARATOR = b"|"
+_VERSION_HEADER_BYTES = 20
+
+
+def _split_version(value: bytes) -> Tuple[int, bytes]:
+    if value[:1].isdigit():
+        version, _, payload = value.partition(_VERSION_SEPARATOR)
+        return int(version), payload
+    return 0, value
+
+
+class SessionStoreUnavailableError(HTTPException):
+    def __init__(self, detail: str = "Conversation storage is temporarily unavailable.") -> None:
+        super().__init__(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=detail)
+
+
+class SessionConflictError(HTTPException):
+    def __init__(
+        self, detail: str = "This conversation was updated by another request. Please resend your message."
+    ) -> None:
+        super().__init__(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+
+def dump_session(conversation: Conversation) -> bytes:
+    data: Dict[str, Any] = {"state": conversation.state}
+    for name in PROFILE_FIELDS + ("summary", "summary_upto"):
+        value = getattr(conversation, name)
+        if value:
+            data[name] = value
+    history = conversation.history
+    if history.offset:
+        data["history_offset"] = history.offset
+    if len(history):
+        data["history"] = [[_ROLE_CODES.get(role, role), content] for role, content in history]
+    raw = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        return _ZLIB_TAG + zlib.compress(raw)
+    return _JSON_TAG + raw
+
+
+def load_session(payload: bytes) -> Conversation:
+    """Inverse of ``dump_session``; raises ``ValueError`` for payloads it cannot read."""
+    tag, body = payload[:1], payload[1:]
+    if tag == _ZLIB_TAG:
+        try:
+            body = zlib.decompress(body)
+        except zlib.error as exc:
+            raise ValueError(f"Corrupt compressed session: {exc}") from exc
+    elif tag != _JSON_TAG:
+        raise ValueError(f"Unknown session payload tag {tag!r}")
+    try:
+        data = json.loads(body)
+        messages = data.pop("history", ())
+        history = HistoryRing(offset=data.pop("history_offset", 0))
+        # Payloads written with a larger history keep only their newest messages.
+        history.offset += max(0, len(messages) - history.capacity)
+        history.extend((_ROLE_NAMES.get(role, role), content) for role, content in messages[-history.capacity :])
+        return Conversation(history=history, **data)
+    except (TypeError, KeyError, ValueError) as exc:
+        raise ValueError(f"Malformed session payload: {exc}") from exc
+
+
+class SessionStore(ABC):
+    @abstractmethod
+    async def get(self, session_id: str) -> Conversation:
+        """The stored session, or a fresh one in the initial state when there is none."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def save(self, session_id: str, conversation: Conversation) -> None:
+        """Store ``conversation`` and bump its version; raises ``SessionConflictError`` if it is stale."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        """Stop background work and release connections."""
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Operational counters exposed via the /chat/stats endpoint."""
+        return {}
+
+
+class RedisSessionStore(SessionStore):
+    def __init__(
+        self,
+        *,
+        url: str = "redis://localhost:6379/0",
+        client: Any = None,
+        key_prefix: str = "zinovia:chat:session:",
+        ttl_seconds: float = 1800.0,
+        max_connections: int = 50,
+        timeout_seconds: float = 1.0,
+    ) -> None:
+        try:
+            from redis import exceptions as redis_exceptions
+            from redis import asyncio as redis_asyncio
+        except ImportError as exc:
+            raise RuntimeError("CHAT_SESSION_BACKEND=redis requires the redis package") from exc
+
+        self._errors = (redis_exceptions.RedisError, OSError)
+        self._watch_error = redis_exceptions.WatchError
+        self._pool = None
+        if client is None:
+            # One pool per process; connections are reused across requests.
+            self._pool = redis_asyncio.ConnectionPool.from_url(
+                url,
+                max_connections=max_connections,
+                socket_timeout=timeout_seconds,
+                socket_connect_timeout=timeout_seconds,
+            )
+            client = redis_asyncio.Redis(connection_pool=self._pool)
+        self._client = client
+        self._key_prefix = key_prefix
+        self._ttl = max(1, int(ttl_seconds))
+        self._max_connections = max_connections
+        self.hits = 0
+        self.misses = 0
+        self.saves = 0
+        self.errors = 0
+        self.corrupt = 0
+        self.conflicts = 0
+        self.bytes_written = 0
+
+    def _key(self, session_id: str) -> str:
+        return self._key_prefix + session_id
+
+    async def get(self, session_id: str) -> Conversation:
+        key = self._key(session_id)
+        try:
+            async with self._client.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.expire(key, self._ttl)
+                payload, _ = await pipe.execute()
+        except self._errors as exc:
+            self.errors += 1
+            logger.warning("Session load failed for %s: %s", session_id, exc)
+            raise SessionStoreUnavailableError() from exc
+
+        if payload is not None:
+            version, payload = _split_version(payload)
+            try:
+                conversation = load_session(payload)
+            except ValueError as exc:
+                self.corrupt += 1
+                logger.warning("Discarding unreadable session %s: %s", session_id, exc)
+            else:
+                self.hits += 1
+                conversation.version = version
+                return conversation
+        self.misses += 1
+        return get_initial_state()
+
+    async def save(self, session_id: str, conversation: Conversation) -> None:
+        key = self._key(session_id)
+        version = conversation.version + 1
+        payload = str(version).encode() + _VERSION_SEPARATOR + dump_session(conversation)
+        try:
+            async with self._client.pipeline(transaction=True) as pipe:
+                await pipe.watch(key)
+                header = await pipe.getrange(key, 0, _VERSION_HEADER_BYTES)
+                if header and _split_version(header)[0] != conversation.version:
+                    raise self._watch_error()
+                pipe.multi()
+                pipe.set(key, payload, ex=self._ttl)
+                await pipe.execute()
+        except self._watch_error as exc:
+            self.conflicts += 1
+            logger.info("Rejected stale save for session %s (version %d)", session_id, conversation.version)
+            raise SessionConflictError() from exc
+        except self._errors as exc:
+            # The reply has already been produced; losing this turn beats failing the request.
+            self.errors += 1
+            logger.warning("Session save failed for %s: %s", session_id, exc)
+            return
+        conversation.version = version
+        self.saves += 1
+        self.bytes_written += len(payload)
+
+    async def delete(self, session_id: str) -> None:
+        try:
+            await self._client.delete(self._key(session_id))
+        except self._errors as exc:
+            self.errors += 1
+            logger.warning("Session delete failed for %s: %s", session_id, exc)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+        if self._pool is not None:
+            await self._pool.disconnect()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "saves": self.saves,
+            "errors": self.errors,
+            "corrupt": self.corrupt,
+            "conflicts": self.conflicts,
+            "mean_payload_bytes": round(self.bytes_written / self.saves) if self.saves else None,
+            "max_connections": self._max_connections,
+        }
+
@@ -0,0 +1,317 @@
+"""
+Durable session store backed by the application database (``CHAT_SESSION_BACKEND=sql``).
+
+Sessions survive instance restarts by living in the ``chat_sessions`` table
+(see the Alembic migration ``7b3e91c4a2f6``). The table is never written on
+the request path:
+
+- ``save`` updates a read-through LRU cache (an ``InMemorySessionStore``) and
+  records the serialized session in a write-behind buffer. Repeated saves of
+  the same session before a flush collapse into one row.
+- A background task flushes the buffer every
+  ``CHAT_SESSION_SQL_FLUSH_INTERVAL_SECONDS``, or as soon as
+  ``CHAT_SESSION_SQL_FLUSH_BATCH_SIZE`` sessions are dirty, with one bulk
+  upsert per batch (``INSERT ... ON CONFLICT DO UPDATE`` on PostgreSQL and
+  SQLite) in a worker thread.
+- ``get`` serves from the cache, then from unflushed writes, and only then
+  reads the table, off the event loop.
+- Version checks (see ``session_store``) run against the cache, which is
+  the authoritative copy while a session is live in this process. The
+  version is stored with each row, so a session evicted from the cache and
+  loaded again keeps rejecting saves from copies taken before the eviction.
+
+A flush that fails because the database is unreachable puts its rows back in
+the buffer (unless the session was saved again meanwhile) and is retried on
+the next interval. A batch the database rejects for its data (a constraint
+or a value that does not fit) is written again row by row, so one bad row
+cannot hold back the sessions batched with it; the rejected rows are logged,
+counted and dropped. ``aclose`` performs a final flush, so a graceful
+shutdown does not lose buffered turns. Rows idle for longer than
+``CHAT_SESSION_TTL_SECONDS`` are ignored on load and pruned in the
+background.
+
+The cache assumes a session is served by one process at a time. Deployments
+that spread one conversation across several instances should use the Redis
+backend instead.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.models import ChatSession
+
+from .memory_store import InMemorySessionStore
+from .conversation import Conversation
+from .session_store import SessionStore, SessionStoreUnavailableError, dump_session, load_session
+from .state import get_initial_state
+
+logger = logging.getLogger(__name__)
+
+_TABLE = ChatSession.__table__
+# Errors caused by a row's contents rather than by the database being unavailable.
+_REJECTED_ROW_ERRORS = (DataError, IntegrityError)
+
+
+class _PendingRow(NamedTuple):
+    state: str
+    payload: bytes
+    version: int
+    updated_at: datetime
+
+
+class SqlSessionStore(SessionStore):
+    def __init__(
+        self,
+        *,
+        engine: Optional[Engine] = None,
+        cache_max_sessions: int = 10_000,
+        cache_max_bytes: Optional[int] = None,
+        ttl_seconds: float = 1800.0,
+        flush_interval_seconds: float = 1.0,
+        flush_batch_size: int = 500,
+        prune_interval_seconds: float = 60.0,
+    ) -> None:
+        if engine is None:
+            from app.database import engine
+        self._engine = engine
+        self._cache = InMemorySessionStore(
+            max_sessions=cache_max_sessions,
+            max_bytes=cache_max_bytes,
+            ttl_seconds=ttl_seconds,
+            sweep_interval_seconds=prune_interval_seconds,
+        )
+        self._ttl = timedelta(seconds=ttl_seconds)
+        self._flush_interval = flush_interval_seconds
+        self._batch_size = max(1, flush_batch_size)
+        self._prune_interval = prune_interval_seconds
+        self._dirty: Dict[str, _PendingRow] = {}
+        # Rows handed to the current flush, still readable until committed.
+        self._flushing: Dict[str, _PendingRow] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self._last_prune = time.monotonic()
+        self.db_reads = 0
+        self.db_hits = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.flush_errors = 0
+        self.rows_rejected = 0
+        self.last_flush_ms: Optional[float] = None
+
+    async def get(self, session_id: str) -> Conversation:
+        conversation = self._cache.lookup(session_id)
+        if conversation is not None:
+            return conversation.copy()
+        pending = self._dirty.get(session_id) or self._flushing.get(session_id)
+        if pending is not None:
+            conversation = load_session(pending.payload)
+            conversation.version = pending.version
+        else:
+            conversation = await self._load(session_id)
+            if conversation is None:
+                return get_initial_state()
+            cached = self._cache.lookup(session_id)
+            if cached is not None:
+                # Another request loaded and maybe saved it while this one read the table.
+                return cached.copy()
+        self._cache.put(session_id, conversation)
+        return conversation.copy()
+
+    async def _load(self, session_id: str) -> Optional[Conversation]:
+        self.db_reads += 1
+        cutoff = datetime.now(timezone.utc) - self._ttl
+        try:
+            row = await asyncio.to_thread(self._read_row, session_id, cutoff)
+        except Exception as exc:
+            logger.warning("Session load failed for %s: %s", session_id, exc)
+            raise SessionStoreUnavailableError() from exc
+        if row is None:
+            return None
+        payload, version = row
+        try:
+            conversation = load_session(payload)
+        except ValueError as exc:
+            logger.warning("Discarding unreadable session %s: %s", session_id, exc)
+            return None
+        conversation.version = version
+        self.db_hits += 1
+        return conversation
+
+    def _read_row(self, session_id: str, cutoff: datetime) -> Optional[Tuple[bytes, int]]:
+        query = select(_TABLE.c.payload, _TABLE.c.version).where(
+            _TABLE.c.session_id == session_id, _TABLE.c.updated_at >= cutoff
+        )
+        with self._engine.connect() as connection:
+            row = connection.execute(query).one_or_none()
+        return (row.payload, row.version) if row is not None else None
+
+    async def save(self, session_id: str, conversation: Conversation) -> None:
+        await self._cache.save(session_id, conversation)
+        # Serialize now so the buffered row is a snapshot of exactly this turn.
+        self._dirty[session_id] = _PendingRow(
+            conversation.state, dump_session(conversation), conversation.version, datetime.now(timezone.utc)
+        )
+        self._ensure_flusher()
+        if len(self._dirty) >= self._batch_size:
+            self._wakeup.set()
+
+    async def delete(self, session_id: str) -> None:
+        await self._cache.delete(session_id)
+        self._dirty.pop(session_id, None)
+        async with self._flush_lock:
+            try:
+                await asyncio.to_thread(self._delete_rows, _TABLE.c.session_id == session_id)
+            except Exception as exc:
+                logger.warning("Session delete failed for %s: %s", session_id, exc)
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is not None and not self._flusher.done():
+            return
+        self._flusher = asyncio.get_running_loop().create_task(self._flush_forever())
+
+    async def _flush_forever(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            if time.monotonic() - self._last_prune >= self._prune_interval:
+                self._last_prune = time.monotonic()
+                await self._prune()
+
+    async def flush(self) -> int:
+        """Write every buffered session to the table; returns how many rows were written."""
+        async with self._flush_lock:
+            if not self._dirty:
+                return 0
+            self._flushing, self._dirty = self._dirty, {}
+            started = time.perf_counter()
+            try:
+                rejected = await asyncio.to_thread(self._write_rows, self._flushing)
+            except Exception as exc:
+                self.flush_errors += 1
+                logger.warning("Flushing %d chat sessions failed: %s", len(self._flushing), exc)
+                # Keep newer saves; retry the rest on the next interval.
+                for session_id, row in self._flushing.items():
+                    self._dirty.setdefault(session_id, row)
+                return 0
+            finally:
+                flushed, self._flushing = len(self._flushing), {}
+            for session_id, exc in rejected.items():
+                logger.error("Dropping chat session %s rejected by the database: %s", session_id, exc)
+            self.rows_rejected += len(rejected)
+            written = flushed - len(rejected)
+            self.flushes += 1
+            self.rows_written += written
+            self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+            return written
+
+    def _write_rows(self, pending: Dict[str, _PendingRow]) -> Dict[str, Exception]:
+        """Upsert ``pending`` in batches; returns the rows the database rejected, by session id."""
+        rows = [
+            {
+                "session_id": session_id,
+                "state": row.state,
+                "payload": row.payload,
+                "version": row.version,
+                "updated_at": row.updated_at,
+            }
+            for session_id, row in pending.items()
+        ]
+        rejected: Dict[str, Exception] = {}
+        for start in range(0, len(rows), self._batch_size):
+            batch = rows[start : start + self._batch_size]
+            try:
+                with self._engine.begin() as connection:
+                    self._upsert(connection, batch)
+            except _REJECTED_ROW_ERRORS:
+                # One bad row fails the whole statement; write the rest without it.
+                for row in batch:
+                    try:
+                        with self._engine.begin() as connection:
+                            self._upsert(connection, [row])
+                    except _REJECTED_ROW_ERRORS as exc:
+                        rejected[row["session_id"]] = exc
+        return rejected
+
+    def _upsert(self, connection: Any, rows: List[Dict[str, Any]]) -> None:
+        dialect = connection.dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            # No portable upsert: replace the batch inside the same transaction.
+            connection.execute(delete(_TABLE).where(_TABLE.c.session_id.in_([row["session_id"] for row in rows])))
+            connection.execute(insert(_TABLE), rows)
+            return
+        statement = dialect_insert(_TABLE)
+        statement = statement.on_conflict_do_update(
+            index_elements=[_TABLE.c.session_id],
+            set_={
+                "state": statement.excluded.state,
+                "payload": statement.excluded.payload,
+                "version": statement.excluded.version,
+                "updated_at": statement.excluded.updated_at,
+            },
+        )
+        connection.execute(statement, rows)
+
+    async def _prune(self) -> None:
+        cutoff = datetime.now(timezone.utc) - self._ttl
+        async with self._flush_lock:
+            try:
+                removed = await asyncio.to_thread(self._delete_rows, _TABLE.c.updated_at < cutoff)
+            except Exception as exc:
+                logger.warning("Pruning expired chat sessions failed: %s", exc)
+                return
+        if removed:
+            logger.debug("Pruned %d expired chat sessions", removed)
+
+    def _delete_rows(self, condition: Any) -> int:
+        with self._engine.begin() as connection:
+            return connection.execute(delete(_TABLE).where(condition)).rowcount
+
+    async def aclose(self) -> None:
+        if self._flusher is not None:
+            # Holding the lock guarantees the flusher is not midway through a write.
+            async with self._flush_lock:
+                self._flusher.cancel()
+                await asyncio.gather(self._flusher, return_exceptions=True)
+                self._flusher = None
+        written = await self.flush()
+        if self._dirty:
+            logger.error("Shutting down with %d chat sessions not persisted", len(self._dirty))
+        elif written:
+            logger.info("Flushed %d chat sessions on shutdown", written)
+        await self._cache.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        cache = self._cache.stats()
+        return {
+            "backend": "sql",
+            "cache_sessions": cache["sessions"],
+            "cache_hits": cache["hits"],
+            "cache_hit_rate": cache["hit_rate"],
+            "conflicts": cache["conflicts"],
+            "db_reads": self.db_reads,
+            "db_hits": self.db_hits,
+            "pending_writes": len(self._dirty) + len(self._flushing),
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "flush_errors": self.flush_errors,
+            "rows_rejected": self.rows_rejected,
+            "last_flush_ms": self.last_flush_ms,
+        }
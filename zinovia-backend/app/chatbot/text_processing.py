@@ -0,0 +1,103 @@
+"""
+Text analysis shared by knowledge-base indexing and querying.
+
+Indexing and query analysis must stay identical, so both go through
+``analyze``: lowercase word tokens, English stopwords removed, and a light
+suffix-stripping stemmer that folds common inflections (plurals, -ing/-ed,
+-ation) onto one stem.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import List
+
+# Part of the knowledge index content hash: bump whenever analysis output changes
+# so prebuilt index files are rebuilt.
+ANALYZER_VERSION = 1
+
+_TOKEN_PATTERN = re.compile(r"[a-zA-Z0-9']+")
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.,;:]+$")
+
+STOPWORDS = frozenset(
+    """
+    a about above after again against all am an and any are aren't as at be because been
+    before being below between both but by can can't cannot could couldn't did didn't do
+    does doesn't doing don't down during each few for from further had hadn't has hasn't
+    have haven't having he he'd he'll he's her here here's hers herself him himself his
+    how how's i i'd i'll i'm i've if in into is isn't it it's its itself let's me more
+    most mustn't my myself no nor not of off on once only or other ought our ours
+    ourselves out over own same shan't she she'd she'll she's should shouldn't so some
+    such than that that's the their theirs them themselves then there there's these they
+    they'd they'll they're they've this those through to too under until up very was
+    wasn't we we'd we'll we're we've were weren't what what's when when's where where's
+    which while who who's whom why why's will with won't would wouldn't you you'd you'll
+    you're you've your yours yourself yourselves tell please thanks thank hi hello hey
+    """.split()
+)
+
+
+def normalize_user_message(message: str) -> str:
+    """Cache key form of a message: lowercased, whitespace collapsed, trailing punctuation dropped."""
+    collapsed = _WHITESPACE.sub(" ", message.strip().lower())
+    return _TRAILING_PUNCTUATION.sub("", collapsed)
+
+
+# General commercial wording mapped onto the vocabulary a services catalogue
+# uses, for paraphrases that share no characters with it ("cost" vs
+# "$2,499/month"). Deliberately small: industry or document-specific entries
+# belong in the documents themselves. Applied to queries only, so documents
+# never need re-indexing for it.
+QUERY_SYNONYMS = {
+    "cost": "pricing packages",
+    "price": "pricing packages",
+    "pricing": "packages",
+    "fee": "pricing packages",
+    "quote": "pricing packages",
+    "plan": "packages",
+    "secure": "security compliance",
+    "safe": "security compliance",
+    "privacy": "security compliance",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def stem(token: str) -> str:
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    if token.endswith("ies") and len(token) > 4:
+        token = token[:-3] + "y"
+    elif token.endswith("sses"):
+        token = token[:-2]
+    elif token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        token = token[:-1]
+
+    if token.endswith("ation") and len(token) > 6:
+        token = token[:-3]
+    elif token.endswith("ing") and len(token) > 5:
+        token = token[:-3]
+    elif token.endswith("ed") and len(token) > 4:
+        token = token[:-2]
+
+    if token.endswith("e") and len(token) > 4:
+        token = token[:-1]
+    return token
+
+
+def expand_query(text: str) -> str:
+    """Append ``QUERY_SYNONYMS`` expansions for words in ``text``."""
+    extras = []
+    for token in tokenize(text):
+        expansion = QUERY_SYNONYMS.get(token) or (token.endswith("s") and QUERY_SYNONYMS.get(token[:-1]))
+        if expansion:
+            extras.append(expansion)
+    return f"{text} {' '.join(extras)}" if extras else text
+
+
+def analyze(text: str) -> List[str]:
+    """Tokenize, drop stopwords and stem; used for both documents and queries."""
+    return [stem(token) for token in tokenize(text) if token not in STOPWORDS]
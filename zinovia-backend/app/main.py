@@ -3,6 +3,8 @@ Zinovia Backend API
 FastAPI application for handling contact forms, newsletter subscriptions, and customer data
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
@@ -19,6 +21,19 @@ load_dotenv()
 # Initialize rate limiter
 limiter = Limiter(key_func=get_remote_address)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown hooks"""
+    await chatbot.load_knowledge_base()
+    yield
+    try:
+        await chatbot.close_llm_client()
+    finally:
+        # Always runs: the SQL session store flushes its buffered turns here.
+        await chatbot.close_session_store()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Zinovia API",
@@ -26,6 +41,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # Configure rate limiting
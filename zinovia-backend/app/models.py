@@ -2,7 +2,7 @@
 Database models
 """
 
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, JSON, LargeBinary
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -45,3 +45,13 @@ class FormSubmission(Base):
     user_agent = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+
+class ChatSession(Base):
+    """Persisted chatbot sessions, written behind by SqlSessionStore"""
+    __tablename__ = "chat_sessions"
+
+    session_id = Column(String(128), primary_key=True)
+    state = Column(String(50), nullable=False)
+    payload = Column(LargeBinary, nullable=False)  # app.chatbot.session_store.dump_session
+    version = Column(Integer, nullable=False, server_default="0")  # Conversation.version
+    updated_at = Column(DateTime(timezone=True), nullable=False, index=True)
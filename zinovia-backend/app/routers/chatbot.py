@@ -1,14 +1,37 @@
+import asyncio
+import json
 import logging
-from typing import Dict, List
+import time
+from contextlib import AbstractAsyncContextManager, nullcontext
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 
+from app.chatbot.admission import AdmissionController, AdmissionLLMClient, AdmissionRejectedError
+from app.chatbot.coalescing import CoalescingLLMClient
 from app.chatbot.config import Settings, get_settings
-from app.chatbot.llm_client import BaseLLMClient, OpenAICompatibleLLMClient
-from app.chatbot.memory_store import get_session, save_session
-from app.chatbot.models import ChatRequest, ChatResponse, ConversationState, Message
-from app.chatbot.knowledge_base import build_context
+from app.chatbot.llm_client import (
+    BaseLLMClient,
+    CircuitBreaker,
+    CircuitOpenError,
+    OpenAICompatibleLLMClient,
+    ResilientLLMClient,
+)
+from app.chatbot.memory_store import InMemorySessionStore
+from app.chatbot.conversation import ROLE_ASSISTANT, ROLE_USER, Conversation
+from app.chatbot.models import ChatRequest, ChatResponse
+from app.chatbot.knowledge_base import build_context, get_knowledge_base
+from app.chatbot.history import MESSAGE_OVERHEAD_TOKENS, append_messages, estimate_tokens, pack_history
+from app.chatbot.metrics import LatencyRecorder, ValueRecorder
+from app.chatbot.reply_cache import CachingLLMClient
+from app.chatbot.routing import RoutedEndpoint, RoutingLLMClient
+from app.chatbot.prompts import build_system_prompt, state_instruction
 from app.chatbot.services_descriptions import format_services_listing
+from app.chatbot.session_locks import SessionLocks
+from app.chatbot.session_store import RedisSessionStore, SessionStore
+from app.chatbot.sql_session_store import SqlSessionStore
 from app.chatbot.state import OnboardingState, advance_state
 
 logger = logging.getLogger(__name__)
@@ -16,72 +39,199 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 _llm_client: BaseLLMClient | None = None
+_session_store: SessionStore | None = None
+_session_locks: SessionLocks | None = None
+_time_to_first_token = LatencyRecorder()
+_stream_duration = LatencyRecorder()
+_prompt_tokens_before = ValueRecorder()
+_prompt_tokens_after = ValueRecorder()
+
+
+def _build_endpoint_client(
+    settings: Settings,
+    *,
+    base_url: str,
+    model_name: str | None = None,
+    api_path: str | None = None,
+    api_key: str | None = None,
+    identity_audience: str | None = None,
+) -> OpenAICompatibleLLMClient:
+    return OpenAICompatibleLLMClient(
+        base_url=base_url,
+        api_path=api_path or settings.llm_api_path,
+        model_name=model_name or settings.llm_model_name,
+        api_key=api_key or settings.llm_api_key,
+        identity_audience=identity_audience or settings.llm_identity_audience,
+        timeout_seconds=settings.llm_timeout_seconds,
+        http2=settings.llm_http2,
+        max_connections=settings.llm_pool_max_connections,
+        max_keepalive_connections=settings.llm_pool_max_keepalive,
+        keepalive_expiry=settings.llm_keepalive_expiry_seconds,
+        identity_refresh_margin_seconds=settings.llm_identity_refresh_margin_seconds,
+    )
+
+
+def _build_llm_client(settings: Settings) -> BaseLLMClient:
+    client: BaseLLMClient
+    admission = (
+        AdmissionController(
+            max_in_flight=settings.llm_max_in_flight,
+            max_queue=settings.llm_admission_max_queue,
+            queue_timeout_seconds=settings.llm_admission_queue_timeout_seconds,
+        )
+        if settings.llm_admission_enabled
+        else None
+    )
+    if settings.llm_endpoints:
+        client = RoutingLLMClient(
+            [
+                RoutedEndpoint(
+                    # Stats are public, so never fall back to the (internal) URL.
+                    endpoint.name or f"endpoint-{index}",
+                    _build_endpoint_client(
+                        settings,
+                        base_url=endpoint.base_url,
+                        model_name=endpoint.model_name,
+                        api_path=endpoint.api_path,
+                        api_key=endpoint.api_key,
+                        identity_audience=endpoint.identity_audience,
+                    ),
+                    weight=endpoint.weight,
+                )
+                for index, endpoint in enumerate(settings.llm_endpoints)
+            ],
+            strategy=settings.llm_routing_strategy,
+            eject_after_failures=settings.llm_routing_eject_after_failures,
+            eject_seconds=settings.llm_routing_eject_seconds,
+            max_eject_seconds=settings.llm_routing_max_eject_seconds,
+        )
+    else:
+        client = _build_endpoint_client(settings, base_url=settings.llm_api_base_url)
+    if settings.llm_breaker_enabled:
+        client = ResilientLLMClient(
+            client,
+            breaker=CircuitBreaker(
+                window_size=settings.llm_breaker_window,
+                min_calls=settings.llm_breaker_min_calls,
+                failure_rate_threshold=settings.llm_breaker_failure_rate,
+                slow_call_seconds=settings.llm_breaker_slow_call_seconds,
+                slow_call_rate_threshold=settings.llm_breaker_slow_call_rate,
+                open_seconds=settings.llm_breaker_open_seconds,
+                half_open_max_calls=settings.llm_breaker_half_open_calls,
+            ),
+            adaptive_timeout=settings.llm_adaptive_timeout_enabled,
+            timeout_multiplier=settings.llm_adaptive_timeout_multiplier,
+            min_timeout_seconds=settings.llm_adaptive_timeout_min_seconds,
+            max_timeout_seconds=settings.llm_timeout_seconds,
+            hedge_enabled=settings.llm_hedge_enabled,
+            hedge_percentile=settings.llm_hedge_percentile,
+            # Hedges sit below the admission layer, so they take their slots directly.
+            admission=admission,
+        )
+    if admission is not None:
+        client = AdmissionLLMClient(client, admission)
+    if settings.llm_coalescing_enabled:
+        client = CoalescingLLMClient(client, window_seconds=settings.llm_coalescing_window_seconds)
+    if settings.llm_reply_cache_enabled:
+        client = CachingLLMClient(
+            client,
+            cacheable_states=_split_csv(settings.llm_reply_cache_states),
+            max_entries=settings.llm_reply_cache_max_entries,
+            ttl_seconds=settings.llm_reply_cache_ttl_seconds,
+        )
+    return client
+
+
+def _split_csv(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
 
 
 def get_llm_client(settings: Settings = Depends(get_settings)) -> BaseLLMClient:
     global _llm_client
     if _llm_client is None:
-        _llm_client = OpenAICompatibleLLMClient(
-            base_url=settings.llm_api_base_url,
-            api_path=settings.llm_api_path,
-            model_name=settings.llm_model_name,
-            api_key=settings.llm_api_key,
-            identity_audience=settings.llm_identity_audience,
-        )
+        _llm_client = _build_llm_client(settings)
     return _llm_client
 
 
-def _state_instruction(state: OnboardingState, conversation: ConversationState) -> str:
-    match state:
-        case OnboardingState.GREETING:
-            return (
-                "Greet the user warmly, briefly introduce Zinovia's AI solutions, "
-                "and ask what brings them here today."
-            )
-        case OnboardingState.ASK_USER_TYPE:
-            return (
-                "Ask the user to identify themselves as an individual, small business, "
-                "or enterprise. If they already implied one, acknowledge it and confirm "
-                "before moving forward."
-            )
-        case OnboardingState.ASK_GOAL:
-            return (
-                "Ask about their primary goal or challenge. Encourage a concise description."
-            )
-        case OnboardingState.SHOW_SERVICES:
-            suggestion = conversation.selected_service or "the service that best fits them"
-            return (
-                "Present the available services with short descriptions. "
-                f"Highlight {suggestion} as a likely fit based on what you know. "
-                "After presenting options, transition by asking for their name."
-            )
-        case OnboardingState.COLLECT_CONTACT_NAME:
-            return "Politely ask for their name so we can personalize future communications."
-        case OnboardingState.COLLECT_CONTACT_EMAIL:
-            return (
-                "Ask for their email address. Mention that a professional or best contact email "
-                "is ideal and validate that it includes an '@' symbol."
-            )
-        case OnboardingState.SUMMARY:
-            return (
-                "Summarize the collected details (user type, goal, recommended service, name, email). "
-                "Confirm we will follow up soon and invite any final questions."
-            )
-        case OnboardingState.DONE:
-            return (
-                "The onboarding flow is complete. Answer follow-up questions helpfully using the "
-                "service knowledge while remaining friendly and concise."
-            )
-    return "Continue the conversation helpfully."
+async def close_llm_client() -> None:
+    global _llm_client
+    if _llm_client is not None:
+        await _llm_client.aclose()
+        _llm_client = None
+
+
+def _build_session_store(settings: Settings) -> SessionStore:
+    backend = settings.chat_session_backend.lower()
+    if backend == "redis":
+        return RedisSessionStore(
+            url=settings.chat_session_redis_url,
+            key_prefix=settings.chat_session_redis_key_prefix,
+            ttl_seconds=settings.chat_session_ttl_seconds,
+            max_connections=settings.chat_session_redis_max_connections,
+            timeout_seconds=settings.chat_session_redis_timeout_seconds,
+        )
+    if backend == "sql":
+        return SqlSessionStore(
+            cache_max_sessions=settings.chat_session_max_sessions,
+            cache_max_bytes=settings.chat_session_max_bytes,
+            ttl_seconds=settings.chat_session_ttl_seconds,
+            flush_interval_seconds=settings.chat_session_sql_flush_interval_seconds,
+            flush_batch_size=settings.chat_session_sql_flush_batch_size,
+            prune_interval_seconds=settings.chat_session_sweep_interval_seconds,
+        )
+    if backend != "memory":
+        raise ValueError(f"Unknown CHAT_SESSION_BACKEND {backend!r}; expected 'memory', 'redis' or 'sql'")
+    return InMemorySessionStore(
+        max_sessions=settings.chat_session_max_sessions,
+        max_bytes=settings.chat_session_max_bytes,
+        ttl_seconds=settings.chat_session_ttl_seconds,
+        sweep_interval_seconds=settings.chat_session_sweep_interval_seconds,
+    )
+
+
+def get_session_store(settings: Settings = Depends(get_settings)) -> SessionStore:
+    global _session_store
+    if _session_store is None:
+        _session_store = _build_session_store(settings)
+    return _session_store
+
+
+async def close_session_store() -> None:
+    global _session_store
+    if _session_store is not None:
+        await _session_store.aclose()
+        _session_store = None
+
+
+async def load_knowledge_base() -> None:
+    """Load the knowledge index at startup, off the event loop; later reloads run in the background."""
+    try:
+        await asyncio.to_thread(get_knowledge_base().snapshot)
+    except Exception:  # noqa: BLE001
+        # The first request retries and surfaces the error.
+        logger.exception("Could not load the knowledge base at startup")
+
+
+def get_session_locks(settings: Settings = Depends(get_settings)) -> SessionLocks | None:
+    global _session_locks
+    if not settings.chat_session_lock_enabled:
+        return None
+    if _session_locks is None:
+        _session_locks = SessionLocks(timeout_seconds=settings.chat_session_lock_timeout_seconds)
+    return _session_locks
+
+
+def _hold_session(session_locks: SessionLocks | None, session_id: str) -> AbstractAsyncContextManager[None]:
+    return session_locks.hold(session_id) if session_locks is not None else nullcontext()
 
 
 def _generate_fallback_reply(
-    conversation: ConversationState,
+    conversation: Conversation,
     state: OnboardingState,
     knowledge_text: str,
     knowledge_matched: bool,
 ) -> str:
-    instruction = _state_instruction(state, conversation)
+    instruction = state_instruction(state, conversation)
 
     if state == OnboardingState.GREETING:
         return (
@@ -138,8 +288,8 @@ def _generate_fallback_reply(
     if state == OnboardingState.DONE:
         if not knowledge_matched:
             return "I don't know."
-        excerpt = knowledge_text.strip()
-        snippet = "\n".join(excerpt.splitlines()[:6])
+        # Excerpt blocks are ordered best match first; quote just the top one.
+        snippet = knowledge_text.strip().split("\n\n", 1)[0]
         return (
             "Here's a quick summary from our knowledge base that matches your question:\n"
             f"{snippet}\n\nLet me know if you'd like to explore another area."
@@ -148,79 +298,33 @@ def _generate_fallback_reply(
     return instruction
 
 
-def _build_system_prompt(
-    conversation: ConversationState,
-    knowledge_text: str,
-    knowledge_matched: bool,
-    state_override: OnboardingState | None = None,
-) -> str:
-    state = state_override or OnboardingState(conversation.state)
-    details: List[str] = []
-    if conversation.user_type:
-        details.append(f"User type: {conversation.user_type}")
-    if conversation.goal:
-        details.append(f"Goal: {conversation.goal}")
-    if conversation.selected_service:
-        details.append(f"Suggested service: {conversation.selected_service}")
-    if conversation.name:
-        details.append(f"Name: {conversation.name}")
-    if conversation.email:
-        details.append(f"Email: {conversation.email}")
-
-    structured_summary = "\n".join(details) if details else "No structured details captured yet."
-
-    instruction = _state_instruction(state, conversation)
-
-    knowledge_text = knowledge_text.strip() or "No knowledge base excerpt available."
-    knowledge_notice = (
-        "The excerpt above is the best-matching knowledge for the latest user request."
-        if knowledge_matched
-        else (
-            "No specific knowledge entry matched the latest user message. "
-            'If the user asks for information outside this excerpt, reply exactly with "I don\'t know."'
-        )
+def _append_exchange(
+    conversation: Conversation, user_message: str, reply: str, settings: Settings
+) -> None:
+    append_messages(
+        conversation, ((ROLE_USER, user_message), (ROLE_ASSISTANT, reply)), settings.chat_summary_token_budget
     )
 
-    return (
-        "You are Zinovia's customer onboarding assistant. "
-        "You guide prospects through a short discovery flow and recommend services. "
-        "Keep responses friendly, concise, and professional. "
-        "If the user asks unrelated questions, answer them briefly and steer back to the flow.\n\n"
-        f"Current onboarding state: {state.value}\n"
-        f"Structured details so far:\n{structured_summary}\n\n"
-        "Available services:\n"
-        f"{format_services_listing()}\n\n"
-        f"Next action: {instruction}\n"
-        "Knowledge base excerpt:\n"
-        f"{knowledge_text}\n\n"
-        "Guidelines:\n"
-        "- Use only the knowledge base excerpt above together with the scripted onboarding instructions.\n"
-        "- Follow the 'Next action' guidance even if the excerpt does not describe it explicitly.\n"
-        "- If the user requests information not covered in the excerpt, reply exactly with \"I don't know.\" "
-        "Do not fabricate details.\n"
-        "When presenting services, prefer short paragraphs or bullet lists. "
-        "Thank the user during summary and reassure that a human will follow up soon.\n"
-        f"{knowledge_notice}"
-    )
 
+@dataclass
+class PreparedTurn:
+    conversation: Conversation
+    current_state: OnboardingState
+    state_for_prompt: OnboardingState
+    knowledge_text: str
+    knowledge_matched: bool
 
-def _conversation_history_to_messages(conversation: ConversationState) -> List[Dict[str, str]]:
-    # limit to last 12 messages to keep prompt manageable
-    recent_history = conversation.history[-12:]
-    return [msg.model_dump() for msg in recent_history]
+    @property
+    def needs_llm(self) -> bool:
+        return not (self.current_state == OnboardingState.DONE and not self.knowledge_matched)
 
 
-@router.post("/chat", response_model=ChatResponse, tags=["Chatbot"])
-async def chat_endpoint(
-    payload: ChatRequest,
-    settings: Settings = Depends(get_settings),
-    llm_client: BaseLLMClient = Depends(get_llm_client),
-) -> ChatResponse:
-    conversation = get_session(payload.session_id)
+def prepare_turn(conversation: Conversation, message: str) -> PreparedTurn:
+    """Advance the flow and retrieve knowledge for one user message; no I/O, no LLM."""
     previous_state = OnboardingState(conversation.state)
 
     # Determine state transitions and structured data updates
-    conversation = advance_state(conversation, payload.message)
+    conversation = advance_state(conversation, message)
     current_state = OnboardingState(conversation.state)
 
     state_for_prompt = current_state
@@ -231,64 +335,58 @@ async def chat_endpoint(
     ):
         state_for_prompt = OnboardingState.GREETING
 
-    knowledge_text, knowledge_matched = build_context(payload.message)
+    knowledge_text, knowledge_matched = build_context(message)
+    return PreparedTurn(
+        conversation=conversation,
+        current_state=current_state,
+        state_for_prompt=state_for_prompt,
+        knowledge_text=knowledge_text,
+        knowledge_matched=knowledge_matched,
+    )
 
-    if current_state == OnboardingState.DONE and not knowledge_matched:
-        reply = "I don't know."
-        conversation.history.extend(
-            [
-                Message(role="user", content=payload.message),
-                Message(role="assistant", content=reply),
-            ]
-        )
-        if len(conversation.history) > 50:
-            conversation.history = conversation.history[-50:]
-        save_session(payload.session_id, conversation)
-        debug_info = None
-        if settings.debug_mode:
-            debug_info = {
-                "state": conversation.state,
-                "user_type": conversation.user_type,
-                "goal": conversation.goal,
-                "selected_service": conversation.selected_service,
-                "history_length": len(conversation.history),
-                "knowledge_matched": knowledge_matched,
-            }
-        return ChatResponse(
-            reply=reply,
-            session_id=payload.session_id,
-            state=conversation.state,
-            finished=True,
-            debug=debug_info,
-        )
 
-    system_prompt = _build_system_prompt(
-        conversation, knowledge_text, knowledge_matched, state_for_prompt
+def _build_llm_request(
+    turn: PreparedTurn, user_message: str, settings: Settings
+) -> Tuple[str, List[Dict[str, str]], Dict[str, Any]]:
+    packed = pack_history(
+        turn.conversation,
+        budget_tokens=settings.chat_history_token_budget,
+        summary_budget_tokens=settings.chat_summary_token_budget,
+        reserved_tokens=estimate_tokens(user_message) + MESSAGE_OVERHEAD_TOKENS,
     )
-    history_messages = _conversation_history_to_messages(conversation)
-    history_messages.append({"role": "user", "content": payload.message})
-
-    try:
-        reply = await llm_client.chat(system_prompt, history_messages)
-    except Exception as exc:  # noqa: BLE001
-        logger.exception("LLM request failed; falling back to rule-based reply: %s", exc)
-        reply = _generate_fallback_reply(
-            conversation, current_state, knowledge_text, knowledge_matched
-        )
+    _prompt_tokens_before.observe(packed.tokens_before)
+    _prompt_tokens_after.observe(packed.tokens_after)
 
-    # Update history with latest exchange
-    conversation.history.extend(
-        [
-            Message(role="user", content=payload.message),
-            Message(role="assistant", content=reply),
-        ]
+    system_prompt = build_system_prompt(
+        turn.conversation, turn.knowledge_text, turn.knowledge_matched, turn.state_for_prompt
     )
-    if len(conversation.history) > 50:
-        conversation.history = conversation.history[-50:]
+    history_messages = packed.messages
+    history_messages.append({"role": "user", "content": user_message})
+    packing_debug = {
+        "history_tokens_before": packed.tokens_before,
+        "history_tokens_after": packed.tokens_after,
+        "history_messages_sent": len(history_messages),
+    }
+    return system_prompt, history_messages, packing_debug
 
-    save_session(payload.session_id, conversation)
 
-    if conversation.state in {OnboardingState.SUMMARY.value, OnboardingState.DONE.value}:
+async def _finish_turn(
+    payload: ChatRequest,
+    turn: PreparedTurn,
+    reply: str,
+    settings: Settings,
+    session_store: SessionStore,
+    extra_debug: Dict[str, Any] | None = None,
+) -> ChatResponse:
+    conversation = turn.conversation
+    # Update history with latest exchange
+    _append_exchange(conversation, payload.message, reply, settings)
+    await session_store.save(payload.session_id, conversation)
+
+    if turn.needs_llm and conversation.state in {
+        OnboardingState.SUMMARY.value,
+        OnboardingState.DONE.value,
+    }:
         logger.info(
             "Onboarding conversation summary",
             extra={
@@ -309,7 +407,8 @@ async def chat_endpoint(
             "goal": conversation.goal,
             "selected_service": conversation.selected_service,
             "history_length": len(conversation.history),
-            "knowledge_matched": knowledge_matched,
+            "knowledge_matched": turn.knowledge_matched,
+            **(extra_debug or {}),
         }
 
     return ChatResponse(
@@ -320,3 +419,167 @@ async def chat_endpoint(
         debug=debug_info,
     )
 
+
+@router.get("/chat/stats", tags=["Chatbot"])
+async def chat_stats(
+    llm_client: BaseLLMClient = Depends(get_llm_client),
+    session_store: SessionStore = Depends(get_session_store),
+    session_locks: SessionLocks | None = Depends(get_session_locks),
+) -> Dict[str, Any]:
+    return {
+        "llm": llm_client.stats(),
+        "streaming": {
+            "time_to_first_token": _time_to_first_token.snapshot(),
+            "stream_duration": _stream_duration.snapshot(),
+        },
+        "history_tokens": {
+            "before_packing": _prompt_tokens_before.snapshot(),
+            "after_packing": _prompt_tokens_after.snapshot(),
+        },
+        "knowledge": get_knowledge_base().stats(),
+        "sessions": session_store.stats(),
+        "session_locks": session_locks.stats() if session_locks is not None else None,
+    }
+
+
+@router.post("/chat", response_model=ChatResponse, tags=["Chatbot"])
+async def chat_endpoint(
+    payload: ChatRequest,
+    settings: Settings = Depends(get_settings),
+    llm_client: BaseLLMClient = Depends(get_llm_client),
+    session_store: SessionStore = Depends(get_session_store),
+    session_locks: SessionLocks | None = Depends(get_session_locks),
+) -> ChatResponse:
+    async with _hold_session(session_locks, payload.session_id):
+        turn = prepare_turn(await session_store.get(payload.session_id), payload.message)
+        return await _run_turn(payload, turn, settings, llm_client, session_store)
+
+
+async def _run_turn(
+    payload: ChatRequest,
+    turn: PreparedTurn,
+    settings: Settings,
+    llm_client: BaseLLMClient,
+    session_store: SessionStore,
+) -> ChatResponse:
+    if not turn.needs_llm:
+        return await _finish_turn(payload, turn, "I don't know.", settings, session_store)
+
+    system_prompt, history_messages, packing_debug = _build_llm_request(
+        turn, payload.message, settings
+    )
+
+    llm_fallback = False
+    try:
+        reply = await llm_client.chat(
+            system_prompt, history_messages, state=turn.state_for_prompt.value
+        )
+    except (CircuitOpenError, AdmissionRejectedError) as exc:
+        logger.info("LLM call not attempted (%s); serving rule-based reply", exc.detail)
+        llm_fallback = True
+        reply = _generate_fallback_reply(
+            turn.conversation, turn.current_state, turn.knowledge_text, turn.knowledge_matched
+        )
+    except Exception as exc:  # noqa: BLE001
+        logger.exception("LLM request failed; falling back to rule-based reply: %s", exc)
+        llm_fallback = True
+        reply = _generate_fallback_reply(
+            turn.conversation, turn.current_state, turn.knowledge_text, turn.knowledge_matched
+        )
+
+    return await _finish_turn(
+        payload, turn, reply, settings, session_store, {"llm_fallback": llm_fallback, **packing_debug}
+    )
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/chat/stream", tags=["Chatbot"])
+async def chat_stream_endpoint(
+    payload: ChatRequest,
+    settings: Settings = Depends(get_settings),
+    llm_client: BaseLLMClient = Depends(get_llm_client),
+    session_store: SessionStore = Depends(get_session_store),
+    session_locks: SessionLocks | None = Depends(get_session_locks),
+) -> StreamingResponse:
+    """
+    Streaming variant of POST /chat using Server-Sent Events.
+
+    Emits ``delta`` events with partial content, a ``fallback`` event carrying
+    the full rule-based reply if the LLM fails (clients should replace any
+    partial text), and a final ``done`` event with the ChatResponse payload.
+    If the turn cannot be completed (for example a concurrent request for the
+    same session won, or session storage is down), an ``error`` event with
+    ``status`` and ``detail`` replaces ``done``; the turn was not recorded.
+    """
+
+    async def event_stream() -> AsyncIterator[str]:
+        # The session lock is taken inside the stream so that it is always
+        # released with it, including when the client disconnects.
+        try:
+            async with _hold_session(session_locks, payload.session_id):
+                turn = prepare_turn(await session_store.get(payload.session_id), payload.message)
+                async for event in _stream_turn(payload, turn, settings, llm_client, session_store):
+                    yield event
+        except HTTPException as exc:
+            yield _sse_event("error", {"status": exc.status_code, "detail": exc.detail})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _stream_turn(
+    payload: ChatRequest,
+    turn: PreparedTurn,
+    settings: Settings,
+    llm_client: BaseLLMClient,
+    session_store: SessionStore,
+) -> AsyncIterator[str]:
+    if not turn.needs_llm:
+        reply = "I don't know."
+        yield _sse_event("delta", {"content": reply})
+        response = await _finish_turn(payload, turn, reply, settings, session_store)
+        yield _sse_event("done", response.model_dump())
+        return
+
+    system_prompt, history_messages, packing_debug = _build_llm_request(
+        turn, payload.message, settings
+    )
+    parts: List[str] = []
+    llm_fallback = False
+    started = time.perf_counter()
+    ttft: float | None = None
+    try:
+        async for delta in llm_client.stream_chat(
+            system_prompt, history_messages, state=turn.state_for_prompt.value
+        ):
+            if ttft is None:
+                ttft = time.perf_counter() - started
+                _time_to_first_token.observe(ttft)
+            parts.append(delta)
+            yield _sse_event("delta", {"content": delta})
+        reply = "".join(parts)
+        _stream_duration.observe(time.perf_counter() - started)
+    except Exception as exc:  # noqa: BLE001
+        if isinstance(exc, (CircuitOpenError, AdmissionRejectedError)):
+            logger.info("LLM call not attempted (%s); serving rule-based reply", exc.detail)
+        else:
+            logger.exception("LLM stream failed; falling back to rule-based reply: %s", exc)
+        reply = _generate_fallback_reply(
+            turn.conversation, turn.current_state, turn.knowledge_text, turn.knowledge_matched
+        )
+        llm_fallback = True
+        yield _sse_event("fallback", {"reply": reply})
+
+    extra_debug = {
+        "llm_fallback": llm_fallback,
+        **packing_debug,
+        "time_to_first_token_ms": round(ttft * 1000, 2) if ttft is not None else None,
+    }
+    response = await _finish_turn(payload, turn, reply, settings, session_store, extra_debug)
+    yield _sse_event("done", response.model_dump())
@@ -0,0 +1,126 @@
+"""
+Per-message keyword matching cost as the onboarding flow's keyword lists grow.
+
+Three matchers are run over the same onboarding-style messages, with keyword
+lists padded by synthetic phrases:
+
+- ``scan``: the former ``detect_service`` approach, one ``in`` check per keyword
+- ``alternation``: one regex with a flat ``a|b|c`` alternation of every phrase
+- ``trie``: the flow's compiled ``KeywordMatcher``, one trie-factored regex
+
+Compile time is reported too, because the flow is compiled once at startup.
+
+Run from the zinovia-backend directory:
+    python -m benchmarks.bench_flow_matching --sizes 10,100,1000,10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import string
+import time
+from typing import Callable, Dict, Sequence, Tuple
+
+from app.chatbot.flow import KeywordMatcher
+
+MESSAGES = [
+    "We are a small business looking to modernise our customer support",
+    "I need a new website for my bakery and maybe some online ordering",
+    "Our enterprise wants to move the data warehouse to the cloud",
+    "honestly just exploring what is possible right now",
+    "Could you help us automate invoice processing with AI?",
+    "we want dashboards and analytics for the sales team",
+    "Freelancer here, I build mobile apps for clients",
+    "Not sure yet, what do you usually recommend for teams like ours?",
+]
+BASE_KEYWORDS = {
+    "website": "web",
+    "web": "web",
+    "cloud": "cloud",
+    "devops": "cloud",
+    "infrastructure": "cloud",
+    "ai": "ai",
+    "automation": "ai",
+    "data": "data",
+    "analytics": "data",
+}
+
+Matcher = Callable[[str], Dict[str, str]]
+
+
+def synthetic_keywords(count: int, seed: int = 7) -> Dict[str, str]:
+    """``BASE_KEYWORDS`` padded with random one- and two-word phrases up to ``count``."""
+    rng = random.Random(seed)
+    keywords = dict(BASE_KEYWORDS)
+    while len(keywords) < count:
+        words = [
+            "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+            for _ in range(rng.choice((1, 1, 2)))
+        ]
+        keywords[" ".join(words)] = f"label{len(keywords) % 16}"
+    return keywords
+
+
+def scan_matcher(keywords: Dict[str, str]) -> Matcher:
+    def match(message: str) -> Dict[str, str]:
+        lowered = message.lower()
+        for keyword, label in keywords.items():
+            if keyword in lowered:
+                return {"service": label}
+        return {}
+
+    return match
+
+
+def alternation_matcher(keywords: Dict[str, str]) -> Matcher:
+    pattern = re.compile(
+        r"(?<!\w)(?:" + "|".join(re.escape(keyword) for keyword in keywords) + r")(?!\w)"
+    )
+
+    def match(message: str) -> Dict[str, str]:
+        found = pattern.search(message.lower())
+        return {"service": keywords[found.group()]} if found else {}
+
+    return match
+
+
+def trie_matcher(keywords: Dict[str, str]) -> Matcher:
+    return KeywordMatcher({keyword: [("service", label)] for keyword, label in keywords.items()}).match
+
+
+def measure(factory: Callable[[Dict[str, str]], Matcher], keywords: Dict[str, str], rounds: int) -> Tuple[float, float]:
+    """Compile time in ms and mean per-message match time in microseconds."""
+    started = time.perf_counter()
+    match = factory(keywords)
+    compile_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for message in MESSAGES:
+            match(message)
+    per_message_us = (time.perf_counter() - started) / (rounds * len(MESSAGES)) * 1e6
+    return compile_ms, per_message_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="Comma-separated keyword list sizes")
+    parser.add_argument("--rounds", type=int, default=500, help="Passes over the message set per size")
+    args = parser.parse_args()
+    sizes: Sequence[int] = [int(size) for size in args.sizes.split(",")]
+
+    matchers = (("scan", scan_matcher), ("alternation", alternation_matcher), ("trie", trie_matcher))
+    print(f"{len(MESSAGES)} messages, {args.rounds} rounds; per-message match time in microseconds")
+    header = f"{'keywords':>9}" + "".join(f" {name:>12}" for name, _ in matchers) + f" {'trie compile ms':>16}"
+    print(header)
+    for size in sizes:
+        keywords = synthetic_keywords(size)
+        rounds = max(1, args.rounds // max(1, size // 1000))
+        results = {name: measure(factory, keywords, rounds) for name, factory in matchers}
+        row = "".join(f" {results[name][1]:>12.2f}" for name, _ in matchers)
+        print(f"{size:>9}{row} {results['trie'][0]:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Compare lexical-only knowledge matching against hybrid lexical + n-gram retrieval.
+
+The lexical configuration (``hybrid=False``) is the BM25-only behaviour that
+decides ``knowledge_matched`` today. The hybrid configuration adds query
+expansion, typo correction against the vocabulary and passage cosine over
+hashed character n-gram vectors. Both are scored on labelled sets of
+paraphrased and misspelled questions plus small-talk negatives that should
+not match anything:
+
+- ``hybrid_eval.jsonl`` was used while tuning the thresholds and the synonym
+  table, so its numbers are optimistic.
+- ``hybrid_holdout.jsonl`` was written without looking at retrieval output
+  and is never used for tuning; quote its numbers.
+
+Each set reports:
+
+- recall@1 / recall@3 by passage heading, over the positive queries
+- match rate: share of positives for which ``build_context`` reports a match
+- false matches: share of negatives for which it does
+- p50 / p95 latency of an uncached ``build_context`` call
+
+``--scale`` copies the corpus N times into a temporary directory so the
+latency columns show how scoring grows with the number of passages.
+
+Run from the zinovia-backend directory:
+    python -m benchmarks.bench_hybrid --scale 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from app.chatbot.knowledge_base import DATA_DIR, KnowledgeBase
+
+DATA_PATH = Path(__file__).resolve().parent / "data"
+EVAL_SETS = {"tuning": DATA_PATH / "hybrid_eval.jsonl", "holdout": DATA_PATH / "hybrid_holdout.jsonl"}
+
+
+def load_eval_set(path: Path) -> List[Dict[str, object]]:
+    with path.open(encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def replicate_corpus(target: Path, scale: int) -> None:
+    for copy in range(scale):
+        for source in sorted(DATA_DIR.glob("*.md")):
+            shutil.copy(source, target / f"{source.stem}_{copy}.md")
+
+
+def evaluate(knowledge_base: KnowledgeBase, eval_set: List[Dict[str, object]]) -> Dict[str, float]:
+    positives = [example for example in eval_set if example["relevant"]]
+    negatives = [example for example in eval_set if not example["relevant"]]
+    hits_at_1 = hits_at_3 = matched = 0
+    for example in positives:
+        relevant = set(example["relevant"])
+        headings: List[str] = []
+        for passage in knowledge_base.search(example["query"], 10):
+            if passage.heading not in headings:
+                headings.append(passage.heading)
+        hits_at_1 += bool(relevant.intersection(headings[:1]))
+        hits_at_3 += bool(relevant.intersection(headings[:3]))
+        matched += knowledge_base.build_context(example["query"])[1]
+    false_matches = sum(knowledge_base.build_context(example["query"])[1] for example in negatives)
+    return {
+        "recall@1": hits_at_1 / len(positives),
+        "recall@3": hits_at_3 / len(positives),
+        "match_rate": matched / len(positives),
+        "false_matches": false_matches / len(negatives) if negatives else 0.0,
+    }
+
+
+def measure_latency(knowledge_base: KnowledgeBase, queries: List[str], rounds: int) -> Dict[str, float]:
+    samples: List[float] = []
+    for _ in range(rounds):
+        for query in queries:
+            started = time.perf_counter()
+            knowledge_base.build_context(query)
+            samples.append(time.perf_counter() - started)
+    samples.sort()
+    return {
+        "p50_ms": statistics.median(samples) * 1000,
+        "p95_ms": samples[int(len(samples) * 0.95) - 1] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", type=int, default=1, help="Copies of the corpus for the latency run")
+    parser.add_argument("--rounds", type=int, default=20, help="Passes over the query set for latency")
+    args = parser.parse_args()
+
+    eval_sets = {name: load_eval_set(path) for name, path in EVAL_SETS.items()}
+    for name, eval_set in eval_sets.items():
+        positives = sum(1 for example in eval_set if example["relevant"])
+        print(f"{name}: {len(eval_set)} labelled queries, {positives} positives, {len(eval_set) - positives} negatives")
+    queries = [example["query"] for eval_set in eval_sets.values() for example in eval_set]
+
+    with tempfile.TemporaryDirectory() as scaled_dir:
+        replicate_corpus(Path(scaled_dir), args.scale)
+        print(
+            f"{'set':<8} {'mode':<8} {'recall@1':>9} {'recall@3':>9} {'matched':>8} {'false':>7} "
+            f"{'p50 ms':>8} {'p95 ms':>8}"
+        )
+        for mode, hybrid in (("lexical", False), ("hybrid", True)):
+            # No context cache, so every call pays for scoring and packing.
+            scaled = KnowledgeBase(Path(scaled_dir), hybrid=hybrid, context_cache_size=0)
+            latency = measure_latency(scaled, queries, args.rounds)
+            for name, eval_set in eval_sets.items():
+                quality = evaluate(KnowledgeBase(DATA_DIR, hybrid=hybrid), eval_set)
+                print(
+                    f"{name:<8} {mode:<8} {quality['recall@1']:>9.3f} {quality['recall@3']:>9.3f} "
+                    f"{quality['match_rate']:>8.3f} {quality['false_matches']:>7.3f} "
+                    f"{latency['p50_ms']:>8.3f} {latency['p95_ms']:>8.3f}"
+                )
+        passages = len(scaled.snapshot().passages)
+        print(f"(latency over both sets and {passages} passages, corpus copied {args.scale}x)")
+
+
+if __name__ == "__main__":
+    main()
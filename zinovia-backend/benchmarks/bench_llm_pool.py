@@ -0,0 +1,100 @@
+"""
+Compare per-request httpx clients against the pooled OpenAICompatibleLLMClient.
+
+Starts the mock LLM server with zero latency and fires the same number of chat
+calls through both strategies, reporting throughput and latency percentiles.
+
+Run from the zinovia-backend directory:
+    python -m benchmarks.bench_llm_pool --requests 2000 --concurrency 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+import httpx
+
+from app.chatbot.llm_client import OpenAICompatibleLLMClient
+from benchmarks.mock_llm_server import MockConfig, start_in_thread
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_load(
+    call: Callable[[], Awaitable[None]], total: int, concurrency: int
+) -> tuple[float, List[float]]:
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_one() for _ in range(total)))
+    return time.perf_counter() - started, latencies
+
+
+def report(label: str, elapsed: float, latencies: List[float]) -> None:
+    print(
+        f"{label:<12} {len(latencies) / elapsed:9.1f} req/s  "
+        f"mean {statistics.mean(latencies) * 1000:7.2f} ms  "
+        f"p50 {percentile(latencies, 50) * 1000:7.2f} ms  "
+        f"p99 {percentile(latencies, 99) * 1000:7.2f} ms"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    base_url = f"http://127.0.0.1:{args.port}"
+    url = f"{base_url}/v1/chat/completions"
+    payload = {"model": "stub", "messages": [{"role": "user", "content": "hi"}]}
+
+    async def per_request_call() -> None:
+        async with httpx.AsyncClient(timeout=15.0) as client:
+            response = await client.post(url, json=payload)
+            response.json()
+
+    pooled = OpenAICompatibleLLMClient(
+        base_url=base_url,
+        api_path="/v1/chat/completions",
+        model_name="stub",
+        max_connections=args.concurrency,
+        max_keepalive_connections=args.concurrency,
+    )
+
+    async def pooled_call() -> None:
+        await pooled.chat("You are a stub.", [{"role": "user", "content": "hi"}])
+
+    # Warm up both paths so the first connection setup is not counted twice.
+    await run_load(per_request_call, args.concurrency, args.concurrency)
+    await run_load(pooled_call, args.concurrency, args.concurrency)
+
+    elapsed, latencies = await run_load(per_request_call, args.requests, args.concurrency)
+    report("per-request", elapsed, latencies)
+    elapsed, latencies = await run_load(pooled_call, args.requests, args.concurrency)
+    report("pooled", elapsed, latencies)
+    await pooled.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--port", type=int, default=18081)
+    arguments = parser.parse_args()
+    mock_config = MockConfig(latency_ms=0, tokens_per_second=0, reply_tokens=5)
+    server = start_in_thread(mock_config, arguments.port)
+    try:
+        asyncio.run(main(arguments))
+    finally:
+        server.should_exit = True
@@ -0,0 +1,135 @@
+"""
+Compare the legacy term-count scorer against the BM25 knowledge index.
+
+Reports retrieval quality (recall@1, recall@3, MRR) on a labelled query set
+and query throughput, including the batched ``search_batch`` path.
+``--scale`` replicates the corpus to show how each approach behaves as the
+knowledge base grows.
+
+Run from the zinovia-backend directory:
+    python -m benchmarks.bench_retrieval --scale 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+from app.chatbot.knowledge_base import get_knowledge_base
+from app.chatbot.knowledge_index import BM25Index
+
+EVAL_PATH = Path(__file__).resolve().parent / "data" / "retrieval_eval.jsonl"
+
+Ranker = Callable[[str, int], List[int]]
+
+
+def load_eval_set(path: Path = EVAL_PATH) -> List[Dict[str, object]]:
+    with path.open(encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def _legacy_tokenize(text: str) -> List[str]:
+    return re.findall(r"[a-zA-Z0-9']+", text.lower())
+
+
+def legacy_ranker(documents: Sequence[str]) -> Ranker:
+    """The scorer the knowledge base used before BM25: summed raw term counts."""
+    counts = [Counter(_legacy_tokenize(text)) for text in documents]
+
+    def rank(query: str, limit: int) -> List[int]:
+        tokens = _legacy_tokenize(query)
+        scored = []
+        for doc_id, section_counts in enumerate(counts):
+            score = sum(section_counts.get(token, 0) for token in tokens)
+            if score > 0:
+                scored.append((score, doc_id))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [doc_id for _, doc_id in scored[:limit]]
+
+    return rank
+
+
+def bm25_ranker(documents: Sequence[str]) -> Ranker:
+    index = BM25Index.build(documents)
+
+    def rank(query: str, limit: int) -> List[int]:
+        return [doc_id for _, doc_id in index.search(query, limit)]
+
+    return rank
+
+
+def measure_batch_qps(index: BM25Index, queries: Sequence[str], rounds: int) -> float:
+    batch = list(queries) * rounds
+    started = time.perf_counter()
+    index.search_batch(batch, 3)
+    elapsed = time.perf_counter() - started
+    return len(batch) / elapsed if elapsed else float("inf")
+
+
+def evaluate(rank: Ranker, titles: Sequence[str], eval_set: List[Dict[str, object]]) -> Dict[str, float]:
+    hits_at_1 = hits_at_3 = 0
+    reciprocal_ranks = 0.0
+    for example in eval_set:
+        relevant = set(example["relevant"])
+        ranked_titles = [titles[doc_id] for doc_id in rank(example["query"], 10)]
+        first_hit = next(
+            (position for position, title in enumerate(ranked_titles, 1) if title in relevant),
+            None,
+        )
+        if first_hit is not None:
+            hits_at_1 += first_hit == 1
+            hits_at_3 += first_hit <= 3
+            reciprocal_ranks += 1 / first_hit
+    total = len(eval_set)
+    return {
+        "recall@1": hits_at_1 / total,
+        "recall@3": hits_at_3 / total,
+        "mrr": reciprocal_ranks / total,
+    }
+
+
+def measure_qps(rank: Ranker, queries: Sequence[str], rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for query in queries:
+            rank(query, 3)
+    elapsed = time.perf_counter() - started
+    return rounds * len(queries) / elapsed if elapsed else float("inf")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", type=int, default=1, help="Replicate the corpus N times for QPS")
+    parser.add_argument("--rounds", type=int, default=200, help="Passes over the query set for QPS")
+    args = parser.parse_args()
+
+    sections = get_knowledge_base().snapshot().sections
+    documents = [f"{section.heading}\n{section.content}" for section in sections]
+    titles = [section.heading for section in sections]
+    eval_set = load_eval_set()
+    queries = [example["query"] for example in eval_set]
+
+    print(f"Corpus: {len(documents)} sections, {len(eval_set)} labelled queries")
+    print(f"{'scorer':<10} {'recall@1':>9} {'recall@3':>9} {'mrr':>7} {'qps':>12}")
+    scaled = documents * args.scale
+    rounds = max(1, args.rounds // args.scale)
+    for name, factory in (("legacy", legacy_ranker), ("bm25", bm25_ranker)):
+        quality = evaluate(factory(documents), titles, eval_set)
+        qps = measure_qps(factory(scaled), queries, rounds)
+        print(
+            f"{name:<10} {quality['recall@1']:>9.3f} {quality['recall@3']:>9.3f} "
+            f"{quality['mrr']:>7.3f} {qps:>12.0f}"
+        )
+    batch_qps = measure_batch_qps(BM25Index.build(scaled), queries, rounds)
+    print(f"{'bm25 batch':<10} {'':>9} {'':>9} {'':>7} {batch_qps:>12.0f}")
+    if args.scale > 1:
+        print(f"(QPS measured on the corpus replicated {args.scale}x: {len(scaled)} sections)")
+
+
+if __name__ == "__main__":
+    main()
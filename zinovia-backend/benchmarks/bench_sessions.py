@@ -0,0 +1,180 @@
+"""
+Memory and per-turn cost of live chat sessions: pydantic models vs ``Conversation``.
+
+Two representations are filled with the same synthetic sessions:
+
+- ``pydantic``: the former layout, a ``ConversationState`` model whose history
+  is a list of ``Message`` models (reproduced below, as the app no longer
+  defines them). Each turn appends two models, folds overflow
+  into the summary, copies the list with ``history[-50:]`` and
+  ``model_dump()``s every retained message for the LLM request.
+- ``compact``: the ``Conversation`` the router now uses, a ``__slots__``
+  object with a ``HistoryRing`` and interned roles. Each turn appends the
+  exchange with ``append_messages`` (which folds what the ring overwrites)
+  and builds the LLM messages straight from the ring.
+
+Memory is measured with tracemalloc over all live sessions and includes the
+message text. The turn benchmark also covers long sessions whose history
+has wrapped around the ring.
+
+Run from the zinovia-backend directory:
+    python -m benchmarks.bench_sessions --sessions 100000 --messages 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from pydantic import BaseModel, Field
+
+from app.chatbot.conversation import MAX_HISTORY_MESSAGES, ROLE_ASSISTANT, ROLE_USER, Conversation
+from app.chatbot.history import _summary_line, append_message, append_messages, estimate_tokens
+
+SUMMARY_BUDGET_TOKENS = 300
+USER_LINES = [
+    "We are a small business looking to modernise our customer support",
+    "Mostly we want to automate invoice processing",
+    "Ana Silva",
+    "ana.silva@example.com",
+    "What does a typical cloud migration cost?",
+]
+ASSISTANT_LINES = [
+    "Thanks! What's the primary goal or challenge you're hoping Zinovia can help with?",
+    "Here are the core ways we help partners. Which one sounds closest to what you need?",
+    "Great! Could you share the best name to use when we follow up?",
+    "Thanks! What's the best email address so our specialists can reach you?",
+]
+
+
+class Message(BaseModel):
+    role: str
+    content: str
+
+
+class ConversationState(BaseModel):
+    state: str
+    user_type: Optional[str] = None
+    goal: Optional[str] = None
+    selected_service: Optional[str] = None
+    name: Optional[str] = None
+    email: Optional[str] = None
+    history: List[Message] = Field(default_factory=list)
+    history_offset: int = 0
+    summary: Optional[str] = None
+    summary_upto: int = 0
+
+
+def _text(lines: Sequence[str], rng: random.Random, serial: int) -> str:
+    # A distinct string per message, as request bodies would be.
+    return f"{rng.choice(lines)} #{serial}"
+
+
+def build_pydantic(count: int, messages: int, seed: int = 3) -> List[ConversationState]:
+    rng = random.Random(seed)
+    sessions = []
+    for serial in range(count):
+        state = ConversationState(state="COLLECT_CONTACT_EMAIL", user_type="small_business", goal=f"goal {serial}")
+        for index in range(messages):
+            if index % 2 == 0:
+                state.history.append(Message(role="user", content=_text(USER_LINES, rng, serial)))
+            else:
+                state.history.append(Message(role="assistant", content=_text(ASSISTANT_LINES, rng, serial)))
+        sessions.append(state)
+    return sessions
+
+
+def build_compact(count: int, messages: int, seed: int = 3) -> List[Conversation]:
+    rng = random.Random(seed)
+    sessions = []
+    for serial in range(count):
+        conversation = Conversation("COLLECT_CONTACT_EMAIL", user_type="small_business", goal=f"goal {serial}")
+        for index in range(messages):
+            if index % 2 == 0:
+                append_message(conversation, ROLE_USER, _text(USER_LINES, rng, serial), SUMMARY_BUDGET_TOKENS)
+            else:
+                append_message(conversation, ROLE_ASSISTANT, _text(ASSISTANT_LINES, rng, serial), SUMMARY_BUDGET_TOKENS)
+        sessions.append(conversation)
+    return sessions
+
+
+def _pydantic_fold(state: ConversationState, upto: int) -> None:
+    start = max(state.summary_upto, state.history_offset)
+    if upto <= start:
+        return
+    lines = state.summary.splitlines() if state.summary else []
+    for absolute_index in range(start, upto):
+        message = state.history[absolute_index - state.history_offset]
+        lines.append(_summary_line(message.role, message.content))
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > SUMMARY_BUDGET_TOKENS:
+        lines.pop(0)
+    state.summary = "\n".join(lines)
+    state.summary_upto = upto
+
+
+def pydantic_turn(state: ConversationState, user_message: str, reply: str) -> List[Dict[str, Any]]:
+    state.history.extend([Message(role="user", content=user_message), Message(role="assistant", content=reply)])
+    overflow = len(state.history) - MAX_HISTORY_MESSAGES
+    if overflow > 0:
+        _pydantic_fold(state, state.history_offset + overflow)
+        state.history = state.history[-MAX_HISTORY_MESSAGES:]
+        state.history_offset += overflow
+    return [message.model_dump() for message in state.history]
+
+
+def compact_turn(conversation: Conversation, user_message: str, reply: str) -> List[Dict[str, Any]]:
+    append_messages(
+        conversation, ((ROLE_USER, user_message), (ROLE_ASSISTANT, reply)), SUMMARY_BUDGET_TOKENS
+    )
+    return [{"role": role, "content": content} for role, content in conversation.history]
+
+
+def measure_memory(build: Callable[[int, int], List[Any]], count: int, messages: int) -> float:
+    """Traced bytes per live session."""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    sessions = build(count, messages)
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del sessions
+    return used / count
+
+
+def measure_turns(sessions: List[Any], turn: Callable[[Any, str, str], Any], turns: int) -> float:
+    """Turns per second, cycling through ``sessions``."""
+    started = time.perf_counter()
+    for index in range(turns):
+        turn(sessions[index % len(sessions)], "Could you tell me more about pricing?", "Sure, here is an overview.")
+    return turns / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=100_000, help="Live sessions to hold in memory")
+    parser.add_argument("--messages", type=int, default=8, help="History messages per session")
+    parser.add_argument("--turns", type=int, default=100_000, help="Turns per throughput run")
+    args = parser.parse_args()
+
+    print(f"{args.sessions:,} sessions x {args.messages} messages")
+    print(f"{'layout':<10} {'bytes/session':>14} {'total MiB':>10} {'turns/s':>10} {'turns/s (wrapped)':>18}")
+    for name, build, turn in (("pydantic", build_pydantic, pydantic_turn), ("compact", build_compact, compact_turn)):
+        per_session = measure_memory(build, args.sessions, args.messages)
+        sessions = build(args.sessions, args.messages)
+        rate = measure_turns(sessions, turn, args.turns)
+        del sessions
+        # Long conversations whose history is at capacity, so every turn drops old messages.
+        wrapped = build(1_000, MAX_HISTORY_MESSAGES + 10)
+        wrapped_rate = measure_turns(wrapped, turn, args.turns // 4)
+        print(
+            f"{name:<10} {per_session:>14,.0f} {per_session * args.sessions / 2**20:>10,.1f} "
+            f"{rate:>10,.0f} {wrapped_rate:>18,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+End-to-end load test for POST /chat using scripted onboarding conversations.
+
+Each virtual visitor walks the full flow (GREETING to DONE) on its own
+session; new visitors arrive at a rate that yields the target request rate.
+Reports throughput, p50/p95/p99 latency per OnboardingState and the share of
+replies served by the rule-based fallback.
+
+Fallback detection relies on the ``debug.llm_fallback`` flag, so the backend
+must run with DEBUG_MODE=true. With ``--spawn`` the script starts the mock LLM
+server and the backend itself as subprocesses:
+
+    python -m benchmarks.load_chat --spawn --rps 30 --duration 60 --latency-ms 400 --error-rate 0.02
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.chatbot.metrics import LatencyRecorder
+from benchmarks.mock_llm_server import add_mock_arguments
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+ONBOARDING_SCRIPT: List[str] = [
+    "Hi there!",
+    "We're a small business",
+    "We want a faster website and some automation for customer support",
+    "Sounds great, tell me more",
+    "Jane Doe",
+    "jane.doe@example.com",
+    "Thanks!",
+    "What services do you offer?",
+]
+
+
+class LoadStats:
+    def __init__(self) -> None:
+        self.latency_by_state: Dict[str, LatencyRecorder] = defaultdict(
+            lambda: LatencyRecorder(window=100_000)
+        )
+        self.completed = 0
+        self.errors = 0
+        self.fallbacks = 0
+        self.flagged = 0
+        self.elapsed = 0.0
+
+    def record(self, state: str, seconds: float, debug: Optional[dict]) -> None:
+        self.completed += 1
+        self.latency_by_state[state].observe(seconds)
+        if debug is not None and "llm_fallback" in debug:
+            self.flagged += 1
+            self.fallbacks += int(bool(debug["llm_fallback"]))
+
+
+async def run_conversation(client: httpx.AsyncClient, path: str, stats: LoadStats) -> None:
+    session_id = str(uuid.uuid4())
+    for message in ONBOARDING_SCRIPT:
+        started = time.perf_counter()
+        try:
+            response = await client.post(path, json={"session_id": session_id, "message": message})
+        except httpx.HTTPError:
+            stats.errors += 1
+            return
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            stats.errors += 1
+            return
+        body = response.json()
+        stats.record(body["state"], elapsed, body.get("debug"))
+
+
+async def run_load(args: argparse.Namespace) -> LoadStats:
+    stats = LoadStats()
+    conversations_per_second = args.rps / len(ONBOARDING_SCRIPT)
+    interval = 1 / conversations_per_second
+    limits = httpx.Limits(max_connections=args.max_connections)
+    tasks: List[asyncio.Task] = []
+
+    async with httpx.AsyncClient(base_url=args.target, timeout=60.0, limits=limits) as client:
+        started = time.perf_counter()
+        next_arrival = started
+        while time.perf_counter() - started < args.duration:
+            tasks.append(asyncio.create_task(run_conversation(client, args.path, stats)))
+            next_arrival += interval
+            await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+        await asyncio.gather(*tasks)
+        stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+def print_report(stats: LoadStats) -> None:
+    elapsed = stats.elapsed or 1.0
+    print(f"completed requests: {stats.completed}  errors: {stats.errors}")
+    print(f"throughput: {stats.completed / elapsed:.1f} req/s over {elapsed:.1f}s")
+    if stats.flagged:
+        print(f"fallback rate: {stats.fallbacks / stats.flagged:.2%}")
+    else:
+        print("fallback rate: n/a (run the backend with DEBUG_MODE=true)")
+    print(f"{'state':<24}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for state, recorder in stats.latency_by_state.items():
+        snapshot = recorder.snapshot()
+        print(
+            f"{state:<24}{snapshot['count']:>8}{snapshot['p50_ms']:>10}"
+            f"{snapshot['p95_ms']:>10}{snapshot['p99_ms']:>10}"
+        )
+
+
+def _wait_for_http(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def spawn_services(args: argparse.Namespace) -> List[subprocess.Popen]:
+    mock_args = [
+        sys.executable, "-m", "benchmarks.mock_llm_server",
+        "--port", str(args.mock_port),
+        "--latency-ms", str(args.latency_ms),
+        "--latency-dist", args.latency_dist,
+        "--latency-spread", str(args.latency_spread),
+        "--error-rate", str(args.error_rate),
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--reply-tokens", str(args.reply_tokens),
+    ]
+    if args.seed is not None:
+        mock_args += ["--seed", str(args.seed)]
+    mock = subprocess.Popen(mock_args, cwd=BACKEND_DIR)
+
+    backend_port = httpx.URL(args.target).port or 8000
+    env = {
+        **os.environ,
+        "LLM_API_BASE_URL": f"http://127.0.0.1:{args.mock_port}",
+        "LLM_MODEL_NAME": "mock",
+        "DEBUG_MODE": "true",
+    }
+    backend = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--port", str(backend_port),
+            "--workers", str(args.workers),
+            "--log-level", "warning",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    processes = [mock, backend]
+    try:
+        _wait_for_http(f"http://127.0.0.1:{args.mock_port}/")
+        _wait_for_http(f"{args.target}/api/v1/health")
+    except RuntimeError:
+        stop_services(processes)
+        raise
+    return processes
+
+
+def stop_services(processes: List[subprocess.Popen]) -> None:
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--target", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/chat")
+    parser.add_argument("--rps", type=float, default=20.0, help="Target /chat requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to keep starting conversations")
+    parser.add_argument("--max-connections", type=int, default=500)
+    parser.add_argument("--spawn", action="store_true", help="Start the mock LLM and backend as subprocesses")
+    parser.add_argument("--mock-port", type=int, default=8090)
+    parser.add_argument("--workers", type=int, default=1)
+    add_mock_arguments(parser)
+    arguments = parser.parse_args()
+
+    spawned = spawn_services(arguments) if arguments.spawn else []
+    try:
+        print_report(asyncio.run(run_load(arguments)))
+    finally:
+        stop_services(spawned)
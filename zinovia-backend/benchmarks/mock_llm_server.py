@@ -0,0 +1,240 @@
+"""
+OpenAI-compatible mock LLM server for load testing the chatbot.
+
+Implements POST /v1/chat/completions (plain and ``stream: true``) with
+configurable time-to-first-token distribution, token rate and error rate, so
+capacity tests do not consume real model capacity. Usage blocks include a
+simulated ``prompt_tokens_details.cached_tokens`` for prefix-cache reporting.
+
+Run from the zinovia-backend directory:
+    python -m benchmarks.mock_llm_server --port 8090 --latency-ms 400 --latency-dist lognormal \
+        --tokens-per-second 40 --reply-tokens 60 --error-rate 0.02
+
+Then point the backend at it:
+    LLM_API_BASE_URL=http://127.0.0.1:8090 LLM_MODEL_NAME=mock uvicorn main:app --port 8000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FILLER_WORDS = (
+    "Zinovia helps teams design web apps, cloud platforms, AI assistants and data "
+    "pipelines tailored to their goals and budget"
+).split()
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 300.0
+    latency_dist: str = "fixed"
+    latency_spread: float = 0.5
+    error_rate: float = 0.0
+    tokens_per_second: float = 50.0
+    reply_tokens: int = 40
+    seed: Optional[int] = None
+
+
+class MockBehaviour:
+    def __init__(self, config: MockConfig) -> None:
+        self.config = config
+        self._random = random.Random(config.seed)
+
+    def first_token_delay(self) -> float:
+        base = self.config.latency_ms / 1000
+        spread = self.config.latency_spread
+        dist = self.config.latency_dist
+        if dist == "uniform":
+            return max(0.0, self._random.uniform(base * (1 - spread), base * (1 + spread)))
+        if dist == "exponential":
+            return self._random.expovariate(1 / base) if base > 0 else 0.0
+        if dist == "lognormal":
+            # Median equals latency_ms; spread is the sigma of the underlying normal.
+            return base * self._random.lognormvariate(0.0, spread) if base > 0 else 0.0
+        return base
+
+    def should_fail(self) -> bool:
+        return self._random.random() < self.config.error_rate
+
+    def token_interval(self) -> float:
+        rate = self.config.tokens_per_second
+        return 1 / rate if rate > 0 else 0.0
+
+    def reply_tokens(self) -> list[str]:
+        count = max(1, self.config.reply_tokens)
+        words = [FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(count)]
+        return ["[mock]"] + [f" {word}" for word in words]
+
+
+class PrefixCacheSimulator:
+    """Approximate block-based prefix caching (as in vLLM) to report cached prompt tokens."""
+
+    BLOCK_CHARS = 256
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, max_blocks: int = 100_000) -> None:
+        self._seen: Dict[int, None] = {}
+        self._max_blocks = max_blocks
+
+    def cached_tokens(self, prompt: str) -> int:
+        cached_blocks = 0
+        still_cached = True
+        for end in range(self.BLOCK_CHARS, len(prompt) + 1, self.BLOCK_CHARS):
+            block_hash = hash(prompt[:end])
+            if still_cached and block_hash in self._seen:
+                cached_blocks += 1
+            else:
+                still_cached = False
+                self._seen[block_hash] = None
+        while len(self._seen) > self._max_blocks:
+            self._seen.pop(next(iter(self._seen)))
+        return cached_blocks * self.BLOCK_CHARS // self.CHARS_PER_TOKEN
+
+
+def create_app(config: MockConfig) -> FastAPI:
+    behaviour = MockBehaviour(config)
+    prefix_cache = PrefixCacheSimulator()
+    app = FastAPI(title="Mock LLM", docs_url=None, redoc_url=None)
+    app.state.behaviour = behaviour
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "mock")
+        prompt = "".join(m.get("content", "") for m in body.get("messages", []))
+        prompt_tokens = len(prompt) // PrefixCacheSimulator.CHARS_PER_TOKEN
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": config.reply_tokens,
+            "total_tokens": prompt_tokens + config.reply_tokens,
+            "prompt_tokens_details": {"cached_tokens": prefix_cache.cached_tokens(prompt)},
+        }
+
+        await asyncio.sleep(behaviour.first_token_delay())
+        if behaviour.should_fail():
+            return JSONResponse(status_code=503, content={"error": {"message": "mock failure"}})
+
+        tokens = behaviour.reply_tokens()
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        if body.get("stream"):
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            return StreamingResponse(
+                _stream_chunks(
+                    completion_id,
+                    model,
+                    tokens,
+                    behaviour.token_interval(),
+                    usage if include_usage else None,
+                ),
+                media_type="text/event-stream",
+            )
+
+        await asyncio.sleep(behaviour.token_interval() * len(tokens))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": usage,
+        }
+
+    return app
+
+
+async def _stream_chunks(
+    completion_id: str,
+    model: str,
+    tokens: list[str],
+    interval: float,
+    usage: Optional[Dict[str, object]],
+) -> AsyncIterator[str]:
+    for index, token in enumerate(tokens):
+        if index and interval:
+            await asyncio.sleep(interval)
+        chunk: Dict[str, object] = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    if usage is not None:
+        usage_chunk = {"id": completion_id, "object": "chat.completion.chunk", "choices": [], "usage": usage}
+        yield f"data: {json.dumps(usage_chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def start_in_thread(config: MockConfig, port: int, host: str = "127.0.0.1") -> uvicorn.Server:
+    """Run the mock server on a background thread; set ``server.should_exit`` to stop it."""
+    server = uvicorn.Server(
+        uvicorn.Config(create_app(config), host=host, port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Median time to first token")
+    parser.add_argument(
+        "--latency-dist",
+        choices=["fixed", "uniform", "exponential", "lognormal"],
+        default="fixed",
+    )
+    parser.add_argument(
+        "--latency-spread",
+        type=float,
+        default=0.5,
+        help="Relative half-width for uniform, sigma for lognormal",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--reply-tokens", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_arguments(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        latency_spread=args.latency_spread,
+        error_rate=args.error_rate,
+        tokens_per_second=args.tokens_per_second,
+        reply_tokens=args.reply_tokens,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    add_mock_arguments(parser)
+    arguments = parser.parse_args()
+    uvicorn.run(
+        create_app(config_from_arguments(arguments)),
+        host=arguments.host,
+        port=arguments.port,
+        log_level="warning",
+    )
@@ -0,0 +1,194 @@
+"""
+Replay recorded conversations through the chatbot logic, without HTTP or an LLM.
+
+Each JSONL line is one conversation:
+``{"session_id": "...", "messages": [...]}``. Messages are either plain
+user strings, or ``{"role": ..., "content": ...}`` objects whose assistant
+turns are kept as recorded history. Each user message goes through the
+same ``prepare_turn`` as ``/chat``, which covers ``advance_state``,
+``build_context`` and the special-casing of the greeting turn. The system
+prompt is then built with ``build_system_prompt``.
+
+Conversations are streamed from the file in batches and spread over a
+process pool. Every worker builds its own knowledge base from the shared
+index file. The report covers:
+
+- throughput in messages per second
+- the state funnel: how many conversations reached each state, how many
+  ended there, and how many messages left the state unchanged, which shows
+  where visitors stall
+- the knowledge-match rate per state
+
+Run from the zinovia-backend directory:
+    python -m benchmarks.replay_transcripts benchmarks/data/transcripts_sample.jsonl --repeat 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Set
+
+from app.chatbot.conversation import ROLE_USER
+from app.chatbot.history import append_message
+from app.chatbot.prompts import build_system_prompt
+from app.chatbot.state import FLOW, get_initial_state
+from app.routers.chatbot import prepare_turn
+
+SAMPLE_PATH = Path(__file__).resolve().parent / "data" / "transcripts_sample.jsonl"
+SUMMARY_BUDGET_TOKENS = 300
+
+
+@dataclass
+class ReplayStats:
+    conversations: int = 0
+    messages: int = 0
+    skipped_lines: int = 0
+    prompt_chars: int = 0
+    busy_seconds: float = 0.0
+    reached: Counter = field(default_factory=Counter)
+    ended: Counter = field(default_factory=Counter)
+    stalled: Counter = field(default_factory=Counter)
+    messages_by_state: Counter = field(default_factory=Counter)
+    matched_by_state: Counter = field(default_factory=Counter)
+
+    def merge(self, other: "ReplayStats") -> None:
+        self.conversations += other.conversations
+        self.messages += other.messages
+        self.skipped_lines += other.skipped_lines
+        self.prompt_chars += other.prompt_chars
+        self.busy_seconds += other.busy_seconds
+        for name in ("reached", "ended", "stalled", "messages_by_state", "matched_by_state"):
+            getattr(self, name).update(getattr(other, name))
+
+
+def replay_conversation(messages: List[Any], stats: ReplayStats) -> None:
+    conversation = get_initial_state()
+    visited: Set[str] = {conversation.state}
+    for entry in messages:
+        if isinstance(entry, dict):
+            if entry.get("role") != ROLE_USER:
+                append_message(conversation, entry["role"], entry["content"], SUMMARY_BUDGET_TOKENS)
+                continue
+            entry = entry["content"]
+        previous_state = conversation.state
+        turn = prepare_turn(conversation, entry)
+        prompt = build_system_prompt(
+            turn.conversation, turn.knowledge_text, turn.knowledge_matched, turn.state_for_prompt
+        )
+        stats.messages += 1
+        stats.prompt_chars += len(prompt)
+        if conversation.state == previous_state and FLOW.transitions[previous_state] is not None:
+            stats.stalled[previous_state] += 1
+        visited.add(conversation.state)
+        stats.messages_by_state[conversation.state] += 1
+        stats.matched_by_state[conversation.state] += turn.knowledge_matched
+        append_message(conversation, ROLE_USER, entry, SUMMARY_BUDGET_TOKENS)
+    stats.conversations += 1
+    stats.reached.update(visited)
+    stats.ended[conversation.state] += 1
+
+
+def replay_batch(lines: List[str]) -> ReplayStats:
+    """Worker entry point: replay raw JSONL lines and return their counters."""
+    stats = ReplayStats()
+    started = time.perf_counter()
+    for line in lines:
+        try:
+            record = json.loads(line)
+            messages = record["messages"]
+        except (ValueError, KeyError, TypeError):
+            stats.skipped_lines += 1
+            continue
+        replay_conversation(messages, stats)
+    stats.busy_seconds = time.perf_counter() - started
+    return stats
+
+
+def read_batches(path: Path, batch_size: int, repeat: int) -> Iterator[List[str]]:
+    batch: List[str] = []
+    for _ in range(repeat):
+        with path.open(encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                batch.append(line)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+
+def replay_file(path: Path, *, workers: int, batch_size: int, repeat: int = 1) -> ReplayStats:
+    total = ReplayStats()
+    batches = read_batches(path, batch_size, repeat)
+    if workers <= 1:
+        for batch in batches:
+            total.merge(replay_batch(batch))
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Bounded in-flight work keeps memory flat however large the file is.
+        pending: Set[Future] = set()
+        for batch in batches:
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    total.merge(future.result())
+            pending.add(pool.submit(replay_batch, batch))
+        for future in pending:
+            total.merge(future.result())
+    return total
+
+
+def _rate(numerator: int, denominator: int) -> str:
+    return f"{numerator / denominator:.1%}" if denominator else "-"
+
+
+def print_report(stats: ReplayStats, elapsed: float, workers: int) -> None:
+    rate = stats.messages / elapsed if elapsed else float("inf")
+    print(
+        f"Replayed {stats.conversations} conversations, {stats.messages} messages "
+        f"in {elapsed:.2f}s with {workers} worker(s): {rate:,.0f} messages/s"
+    )
+    if stats.busy_seconds:
+        print(f"Per worker: {stats.messages / stats.busy_seconds:,.0f} messages/s of busy time")
+    if stats.skipped_lines:
+        print(f"Skipped {stats.skipped_lines} malformed lines")
+    if stats.messages:
+        print(f"Mean system prompt: {stats.prompt_chars / stats.messages:,.0f} characters")
+
+    print(f"\n{'state':<24} {'reached':>9} {'ended':>8} {'stalled':>9} {'messages':>9} {'kb match':>9}")
+    for name in FLOW.states:
+        print(
+            f"{name:<24} {_rate(stats.reached[name], stats.conversations):>9} "
+            f"{_rate(stats.ended[name], stats.conversations):>8} {stats.stalled[name]:>9} "
+            f"{stats.messages_by_state[name]:>9} "
+            f"{_rate(stats.matched_by_state[name], stats.messages_by_state[name]):>9}"
+        )
+    matched = sum(stats.matched_by_state.values())
+    print(f"\nKnowledge match rate: {_rate(matched, stats.messages)} of messages")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", type=Path, nargs="?", default=SAMPLE_PATH, help="JSONL transcript file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes; 1 replays in-process")
+    parser.add_argument("--batch-size", type=int, default=200, help="Conversations per worker task")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the file N times (for benchmarking)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    stats = replay_file(args.path, workers=args.workers, batch_size=args.batch_size, repeat=args.repeat)
+    print_report(stats, time.perf_counter() - started, args.workers)
+
+
+if __name__ == "__main__":
+    main()
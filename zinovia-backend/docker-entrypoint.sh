@@ -36,6 +36,11 @@ if [ "$MIGRATION_STATUS" -ne 0 ]; then
   fi
 fi
 
+echo "Building knowledge index..."
+if ! python -m app.chatbot.knowledge_base build; then
+  echo "Knowledge index build failed; workers will build it on first use."
+fi
+
 echo "Starting application..."
 exec "$@"
 
@@ -0,0 +1,78 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.chatbot.config import Settings, get_settings
+from app.chatbot.llm_client import BaseLLMClient
+from app.chatbot.session_locks import SessionLocks
+from app.chatbot.session_store import SessionStore
+from app.main import app
+from app.routers import chatbot
+
+
+def make_settings(**overrides: Any) -> Settings:
+    """Settings for tests: no .env, a dummy LLM endpoint, every optional LLM layer off."""
+    values = {
+        "LLM_MODEL_NAME": "test-model",
+        "LLM_API_BASE_URL": "http://llm.test",
+        "LLM_BREAKER_ENABLED": False,
+        "LLM_ADMISSION_ENABLED": False,
+        "LLM_COALESCING_ENABLED": False,
+        **overrides,
+    }
+    return Settings(_env_file=None, **values)
+
+
+class ScriptedLLMClient(BaseLLMClient):
+    """Replies "re: <latest message>"; ``before_reply`` gets that message first and may block or raise."""
+
+    def __init__(self, before_reply: Optional[Callable[[str], Awaitable[None]]] = None) -> None:
+        self.before_reply = before_reply
+        self.prompts: List[Dict[str, Any]] = []
+
+    async def chat(
+        self, system_prompt: str, messages: List[Dict[str, str]], *, state: Optional[str] = None
+    ) -> str:
+        self.prompts.append({"system": system_prompt, "messages": messages, "state": state})
+        message = messages[-1]["content"]
+        if self.before_reply is not None:
+            await self.before_reply(message)
+        return f"re: {message}"
+
+
+@pytest.fixture
+def chat_app():
+    """The app with the given settings, LLM client, session store and (optionally) session locks injected."""
+
+    def build(
+        *,
+        session_store: SessionStore,
+        llm_client: Optional[BaseLLMClient] = None,
+        settings: Optional[Settings] = None,
+        session_locks: Optional[SessionLocks] = None,
+    ) -> FastAPI:
+        settings = settings or make_settings()
+        llm_client = llm_client or ScriptedLLMClient()
+        app.dependency_overrides[get_settings] = lambda: settings
+        app.dependency_overrides[chatbot.get_llm_client] = lambda: llm_client
+        app.dependency_overrides[chatbot.get_session_store] = lambda: session_store
+        if session_locks is not None:
+            app.dependency_overrides[chatbot.get_session_locks] = lambda: session_locks
+        chatbot._session_locks = None
+        return app
+
+    yield build
+    app.dependency_overrides.clear()
+    chatbot._session_locks = None
+
+
+@pytest.fixture
+def chat_api(chat_app):
+    """Like ``chat_app``, wrapped in a TestClient that skips the app's startup and shutdown hooks."""
+
+    def build(**dependencies: Any) -> TestClient:
+        return TestClient(chat_app(**dependencies))
+
+    return build
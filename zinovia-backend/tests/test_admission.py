@@ -0,0 +1,134 @@
+import asyncio
+from typing import Dict, List, Optional
+
+import pytest
+
+from app.chatbot.admission import AdmissionController, AdmissionLLMClient, AdmissionRejectedError
+from app.chatbot.llm_client import BaseLLMClient
+from app.chatbot.memory_store import InMemorySessionStore
+
+from .conftest import ScriptedLLMClient
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+async def _settle() -> None:
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_queued_calls_are_served_by_state_priority():
+    served = []
+
+    async def record(message: str) -> None:
+        served.append(message)
+
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=10)
+        client = AdmissionLLMClient(ScriptedLLMClient(record), controller)
+        await controller.acquire(0)  # hold the only slot while the queue fills
+        calls = [
+            asyncio.ensure_future(client.chat("system", [{"role": "user", "content": state}], state=state))
+            for state in ("DONE", "ASK_GOAL", "SUMMARY", "COLLECT_CONTACT_NAME")
+        ]
+        await _settle()
+        assert controller.queue_depth == 4
+        controller.release()
+        await asyncio.gather(*calls)
+        return controller
+
+    controller = asyncio.run(scenario())
+
+    assert served == ["SUMMARY", "COLLECT_CONTACT_NAME", "ASK_GOAL", "DONE"]
+    assert controller.stats()["in_flight"] == 0
+
+
+def test_concurrency_never_exceeds_the_cap():
+    in_flight = [0, 0]  # current, peak
+
+    async def slow(message: str) -> None:
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight)
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+
+    async def scenario():
+        controller = AdmissionController(max_in_flight=3, max_queue=20)
+        client = AdmissionLLMClient(ScriptedLLMClient(slow), controller)
+        await asyncio.gather(*(client.chat("system", MESSAGES) for _ in range(12)))
+        return controller
+
+    controller = asyncio.run(scenario())
+
+    assert in_flight[1] == 3
+    assert controller.admitted == 12
+
+
+def test_full_queue_rejects_immediately():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=1)
+        await controller.acquire(0)
+        queued = asyncio.ensure_future(controller.acquire(2))
+        await _settle()
+        with pytest.raises(AdmissionRejectedError) as excinfo:
+            await controller.acquire(0)
+        controller.release()
+        await queued
+        return controller, excinfo.value
+
+    controller, error = asyncio.run(scenario())
+
+    assert error.status_code == 503
+    assert "queue full" in error.detail
+    assert controller.rejected_queue_full == 1
+
+
+def test_wait_past_the_deadline_is_rejected_and_leaves_the_queue():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, queue_timeout_seconds=0.02)
+        await controller.acquire(0)
+        with pytest.raises(AdmissionRejectedError):
+            await controller.acquire(0)
+        assert controller.queue_depth == 0
+        controller.release()
+        return controller
+
+    controller = asyncio.run(scenario())
+
+    assert controller.rejected_timeout == 1
+    assert controller.stats()["in_flight"] == 0
+
+
+def test_cancelled_waiter_does_not_take_a_slot():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1)
+        await controller.acquire(0)
+        waiter = asyncio.ensure_future(controller.acquire(0))
+        await _settle()
+        waiter.cancel()
+        await _settle()
+        controller.release()
+        return controller
+
+    controller = asyncio.run(scenario())
+
+    assert controller.stats()["in_flight"] == 0
+    assert controller.queue_depth == 0
+
+
+class SaturatedLLMClient(BaseLLMClient):
+    async def chat(
+        self, system_prompt: str, messages: List[Dict[str, str]], *, state: Optional[str] = None
+    ) -> str:
+        raise AdmissionRejectedError("queue full")
+
+
+def test_rejected_chat_turn_gets_the_rule_based_reply(chat_api):
+    store = InMemorySessionStore()
+    client = chat_api(session_store=store, llm_client=SaturatedLLMClient())
+
+    response = client.post("/chat", json={"session_id": "s1", "message": "hello"})
+
+    assert response.status_code == 200
+    assert response.json()["reply"]
+    assert len(store.lookup("s1").history) == 2
@@ -0,0 +1,80 @@
+import json
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.chatbot.memory_store import InMemorySessionStore
+from app.chatbot.session_store import SessionStore, SessionStoreUnavailableError
+
+from .conftest import ScriptedLLMClient
+
+
+class StreamingLLMClient(ScriptedLLMClient):
+    """Streams the scripted reply word by word; raises after ``fail_after`` words if set."""
+
+    def __init__(self, fail_after: Optional[int] = None) -> None:
+        super().__init__()
+        self.fail_after = fail_after
+
+    async def stream_chat(
+        self, system_prompt: str, messages: List[Dict[str, str]], *, state: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        reply = await self.chat(system_prompt, messages, state=state)
+        for index, word in enumerate(reply.split(" ")):
+            if index == self.fail_after:
+                raise RuntimeError("stream dropped")
+            yield word if index == 0 else f" {word}"
+
+
+class UnavailableStore(InMemorySessionStore):
+    async def get(self, session_id: str):
+        raise SessionStoreUnavailableError()
+
+
+def _events(body: str) -> List[Tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def _history(store: InMemorySessionStore) -> List[str]:
+    return [content for _, content in store.lookup("s1").history]
+
+
+def _stream(chat_api, store: SessionStore, llm_client, message: str = "hello"):
+    client = chat_api(session_store=store, llm_client=llm_client)
+    response = client.post("/chat/stream", json={"session_id": "s1", "message": message})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return _events(response.text)
+
+
+def test_stream_relays_deltas_then_done(chat_api):
+    store = InMemorySessionStore()
+
+    events = _stream(chat_api, store, StreamingLLMClient(), "we are a startup")
+
+    assert [name for name, _ in events] == ["delta", "delta", "delta", "delta", "delta", "done"]
+    assert "".join(data["content"] for name, data in events if name == "delta") == "re: we are a startup"
+    done = events[-1][1]
+    assert done["reply"] == "re: we are a startup"
+    assert done["session_id"] == "s1"
+    assert _history(store) == ["we are a startup", "re: we are a startup"]
+
+
+def test_failed_stream_sends_fallback_and_records_it(chat_api):
+    store = InMemorySessionStore()
+
+    events = _stream(chat_api, store, StreamingLLMClient(fail_after=1))
+
+    names = [name for name, _ in events]
+    assert names == ["delta", "fallback", "done"]
+    fallback = events[1][1]["reply"]
+    assert fallback and events[-1][1]["reply"] == fallback
+    assert _history(store) == ["hello", fallback]
+
+
+def test_unavailable_store_ends_the_stream_with_an_error_event(chat_api):
+    events = _stream(chat_api, UnavailableStore(), StreamingLLMClient())
+
+    assert events == [("error", {"status": 503, "detail": "Conversation storage is temporarily unavailable."})]
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from app.chatbot.coalescing import CoalescingLLMClient
+
+from .conftest import ScriptedLLMClient
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+class BlockingLLMClient(ScriptedLLMClient):
+    """Holds every reply until ``release`` is set; fails instead if ``error`` is set."""
+
+    def __init__(self) -> None:
+        super().__init__(self._wait)
+        self.release = asyncio.Event()
+        self.error = None
+
+    async def _wait(self, message: str) -> None:
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+
+
+async def _settle() -> None:
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_identical_concurrent_requests_share_one_upstream_call():
+    async def scenario():
+        upstream = BlockingLLMClient()
+        client = CoalescingLLMClient(upstream)
+        calls = [asyncio.ensure_future(client.chat("system", MESSAGES)) for _ in range(5)]
+        await _settle()
+        upstream.release.set()
+        return upstream, client, await asyncio.gather(*calls)
+
+    upstream, client, replies = asyncio.run(scenario())
+
+    assert replies == ["re: hello"] * 5
+    assert len(upstream.prompts) == 1
+    assert client.stats()["coalescing"] == {"leaders": 1, "coalesced": 4, "shared_errors": 0, "in_flight": 0}
+
+
+def test_different_payloads_are_not_coalesced():
+    async def scenario():
+        upstream = ScriptedLLMClient()
+        client = CoalescingLLMClient(upstream)
+        await asyncio.gather(
+            client.chat("system", MESSAGES),
+            client.chat("other system", MESSAGES),
+            client.chat("system", [{"role": "user", "content": "hi"}]),
+        )
+        return upstream
+
+    assert len(asyncio.run(scenario()).prompts) == 3
+
+
+def test_followers_receive_the_leaders_error():
+    async def scenario():
+        upstream = BlockingLLMClient()
+        upstream.error = RuntimeError("upstream down")
+        client = CoalescingLLMClient(upstream)
+        calls = [asyncio.ensure_future(client.chat("system", MESSAGES)) for _ in range(3)]
+        await _settle()
+        upstream.release.set()
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        return client, results
+
+    client, results = asyncio.run(scenario())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert client.shared_errors == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def scenario():
+        upstream = BlockingLLMClient()
+        client = CoalescingLLMClient(upstream)
+        leader = asyncio.ensure_future(client.chat("system", MESSAGES))
+        follower = asyncio.ensure_future(client.chat("system", MESSAGES))
+        await _settle()
+        leader.cancel()
+        await _settle()
+        upstream.release.set()
+        return leader, await follower
+
+    leader, reply = asyncio.run(scenario())
+
+    assert leader.cancelled()
+    assert reply == "re: hello"
+
+
+@pytest.mark.parametrize("window_seconds, upstream_calls", [(0.0, 2), (60.0, 1)])
+def test_recent_reply_is_shared_only_within_the_window(window_seconds, upstream_calls):
+    async def scenario():
+        upstream = ScriptedLLMClient()
+        client = CoalescingLLMClient(upstream, window_seconds=window_seconds)
+        await client.chat("system", MESSAGES)
+        await client.chat("system", MESSAGES)
+        return upstream
+
+    assert len(asyncio.run(scenario()).prompts) == upstream_calls
+
+
+def test_recent_reply_expires(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.chatbot.coalescing.time.monotonic", lambda: now[0])
+
+    async def scenario():
+        upstream = ScriptedLLMClient()
+        client = CoalescingLLMClient(upstream, window_seconds=1.0)
+        await client.chat("system", MESSAGES)
+        now[0] += 1.0
+        await client.chat("system", MESSAGES)
+        return upstream
+
+    assert len(asyncio.run(scenario()).prompts) == 2
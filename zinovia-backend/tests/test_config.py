@@ -0,0 +1,30 @@
+from app.chatbot.config import KnowledgeSettings, Settings
+
+ENV_FILE = """\
+LLM_MODEL_NAME=test-model
+LLM_API_BASE_URL=http://llm.internal
+KNOWLEDGE_BASE_DIR=/srv/knowledge
+KNOWLEDGE_RELOAD_INTERVAL_SECONDS=0
+KNOWLEDGE_HYBRID_ENABLED=true
+"""
+
+
+def test_one_env_file_configures_both_settings_classes(tmp_path):
+    env_file = tmp_path / ".env"
+    env_file.write_text(ENV_FILE, encoding="utf-8")
+
+    settings = Settings(_env_file=env_file)
+    knowledge = KnowledgeSettings(_env_file=env_file)
+
+    assert settings.llm_model_name == "test-model"
+    assert settings.llm_api_base_url == "http://llm.internal"
+    assert knowledge.knowledge_base_dir == "/srv/knowledge"
+    assert knowledge.knowledge_reload_interval_seconds == 0
+    assert knowledge.knowledge_hybrid_enabled is True
+
+
+def test_knowledge_settings_do_not_need_llm_configuration(tmp_path):
+    env_file = tmp_path / ".env"
+    env_file.write_text("KNOWLEDGE_CONTEXT_CACHE_SIZE=16\n", encoding="utf-8")
+
+    assert KnowledgeSettings(_env_file=env_file).knowledge_context_cache_size == 16
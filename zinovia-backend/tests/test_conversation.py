@@ -0,0 +1,76 @@
+import pytest
+
+from app.chatbot.conversation import ROLE_ASSISTANT, ROLE_USER, Conversation, HistoryRing
+from app.chatbot.session_store import dump_session, load_session
+
+
+def _messages(count: int):
+    return [(ROLE_USER if index % 2 == 0 else ROLE_ASSISTANT, f"m{index}") for index in range(count)]
+
+
+def test_ring_keeps_the_newest_messages_and_counts_dropped_ones():
+    ring = HistoryRing(capacity=3)
+    ring.extend(_messages(5))
+
+    assert list(ring) == _messages(5)[2:]
+    assert ring.offset == 2 and ring.full
+    assert (ring[0], ring[-1]) == ((ROLE_USER, "m2"), (ROLE_USER, "m4"))
+    assert list(ring.iter_from(1)) == _messages(5)[3:]
+    with pytest.raises(IndexError):
+        ring[3]
+
+
+def test_roles_are_interned():
+    ring = HistoryRing()
+    ring.append("".join(["us", "er"]), "hello")
+
+    assert ring[0][0] is ROLE_USER
+
+
+def test_copies_are_independent():
+    conversation = Conversation("ASK_GOAL", goal="Automate invoices", history=HistoryRing(capacity=2))
+    conversation.history.extend(_messages(2))
+
+    copy = conversation.copy()
+    copy.history.append(ROLE_USER, "m2")
+    copy.goal = "Cloud migration"
+
+    assert list(conversation.history) == _messages(2)
+    assert conversation.goal == "Automate invoices"
+    assert copy != conversation
+
+
+def test_conversation_has_no_instance_dict():
+    with pytest.raises(AttributeError):
+        Conversation("GREETING").unknown_field = 1
+
+
+@pytest.mark.parametrize("message_count, compressed", [(4, False), (60, True)])
+def test_session_round_trips_through_dump_and_load(message_count, compressed):
+    conversation = Conversation(
+        "SUMMARY", user_type="enterprise", name="Ada", summary="user: hi", summary_upto=2
+    )
+    conversation.history.extend((role, content * 10) for role, content in _messages(message_count))
+
+    payload = dump_session(conversation)
+    loaded = load_session(payload)
+
+    assert payload.startswith(b"z" if compressed else b"j")
+    assert loaded == conversation
+    assert loaded.history.offset == max(0, message_count - conversation.history.capacity)
+
+
+def test_longer_history_than_the_ring_keeps_the_newest_messages():
+    conversation = Conversation("DONE", history=HistoryRing(capacity=100))
+    conversation.history.extend(_messages(80))
+
+    loaded = load_session(dump_session(conversation))
+
+    assert list(loaded.history) == _messages(80)[-loaded.history.capacity :]
+    assert loaded.history.offset == 80 - loaded.history.capacity
+
+
+@pytest.mark.parametrize("payload", [b"", b"x{}", b"j{not json", b"j{}", b"zcorrupt"])
+def test_unreadable_payloads_raise_value_error(payload):
+    with pytest.raises(ValueError):
+        load_session(payload)
@@ -0,0 +1,97 @@
+import re
+
+import pytest
+
+from app.chatbot.conversation import Conversation
+from app.chatbot.flow import FlowDefinitionError, compile_flow, trie_pattern
+from app.chatbot.state import advance_state
+
+
+def _ask_user_type() -> Conversation:
+    return Conversation("ASK_USER_TYPE")
+
+
+@pytest.mark.parametrize(
+    "message, user_type",
+    [
+        ("We are two freelancers", "individual"),
+        ("I run a couple of startups", "small_business"),
+        ("we are small businesses in retail", "small_business"),
+        ("Enterprises like ours", "enterprise"),
+        ("We are a group of companies", "enterprise"),
+        ("Just a small business", "small_business"),
+        ("I'm an INDIVIDUAL", "individual"),
+    ],
+)
+def test_user_type_matches_singular_and_plural_keywords(message, user_type):
+    conversation = advance_state(_ask_user_type(), message)
+
+    assert conversation.user_type == user_type
+    assert conversation.state == "ASK_GOAL"
+
+
+def test_unmatched_user_type_stays_in_state_and_writes_nothing():
+    conversation = advance_state(_ask_user_type(), "not sure yet")
+
+    assert conversation.state == "ASK_USER_TYPE"
+    assert conversation.user_type is None
+
+
+def test_keywords_match_whole_words_only():
+    conversation = Conversation("ASK_GOAL", user_type="enterprise")
+
+    conversation = advance_state(conversation, "I said our email setup needs work")
+
+    assert conversation.goal == "I said our email setup needs work"
+    # "ai" inside "said" / "email" is not a keyword hit, so the user type fallback applies.
+    assert conversation.selected_service == "Cloud Infrastructure & DevOps"
+
+
+def test_leftmost_keyword_selects_the_service():
+    conversation = advance_state(Conversation("ASK_GOAL"), "Analytics dashboards for our website")
+
+    assert conversation.selected_service == "Data Analytics & Insights"
+
+
+def test_email_pattern_is_required():
+    conversation = advance_state(Conversation("COLLECT_CONTACT_EMAIL"), "not an email")
+    assert conversation.state == "COLLECT_CONTACT_EMAIL"
+
+    conversation = advance_state(conversation, " ana@example.com ")
+    assert conversation.state == "SUMMARY"
+    assert conversation.email == "ana@example.com"
+
+
+def test_trie_pattern_prefers_the_longest_phrase():
+    pattern = re.compile(rf"(?:{trie_pattern(['web', 'website', 'webinar'])})")
+
+    assert pattern.fullmatch("website")
+    assert pattern.fullmatch("webinar")
+    assert pattern.match("websites").group() == "website"
+    assert not pattern.fullmatch("we")
+
+
+@pytest.mark.parametrize(
+    "definition, message",
+    [
+        ({"states": {}}, "no states"),
+        ({"initial": "A", "states": {"A": {"instruction": "x", "next": "B"}}}, "next state 'B'"),
+        ({"initial": "B", "states": {"A": {"instruction": "x"}}}, "Initial state 'B'"),
+        (
+            {"initial": "A", "states": {"A": {"instruction": "x", "extract": [{"field": "state", "type": "text"}]}}},
+            "not a conversation field",
+        ),
+        (
+            {"initial": "A", "states": {"A": {"instruction": "x", "extract": [{"field": "goal", "type": "nope"}]}}},
+            "unknown extractor type",
+        ),
+        (
+            {"initial": "A", "states": {"A": {"instruction": "x", "extract": [{"field": "goal", "type": "keywords"}]}}},
+            "non-empty mapping",
+        ),
+        ({"initial": "A", "states": {"A": {"instruction": "Hi {password}"}}}, "not a conversation field"),
+    ],
+)
+def test_invalid_definitions_are_rejected(definition, message):
+    with pytest.raises(FlowDefinitionError, match=message):
+        compile_flow(definition)
@@ -0,0 +1,41 @@
+from app.chatbot.conversation import ROLE_ASSISTANT, ROLE_USER, Conversation
+from app.chatbot.history import append_messages, estimate_tokens, message_tokens, pack_history
+
+SUMMARY_BUDGET_TOKENS = 300
+
+
+def _conversation(turns: int) -> Conversation:
+    conversation = Conversation("DONE")
+    for turn in range(1, turns + 1):
+        append_messages(
+            conversation,
+            (
+                (ROLE_USER, f"u{turn} tell me more about your services please"),
+                (ROLE_ASSISTANT, f"a{turn} here is an overview of what we offer"),
+            ),
+            SUMMARY_BUDGET_TOKENS,
+        )
+    return conversation
+
+
+def test_summarized_messages_are_not_resent_when_reserved_budget_shrinks():
+    conversation = _conversation(7)
+    # A long latest message reserves most of the budget, so older turns are folded.
+    pack_history(
+        conversation, budget_tokens=200, summary_budget_tokens=SUMMARY_BUDGET_TOKENS, reserved_tokens=140
+    )
+    summary_upto = conversation.summary_upto
+    assert summary_upto > 0
+
+    packed = pack_history(
+        conversation, budget_tokens=200, summary_budget_tokens=SUMMARY_BUDGET_TOKENS, reserved_tokens=10
+    )
+
+    assert conversation.summary_upto == summary_upto
+    sent = [message["content"] for message in packed.messages]
+    unsummarized = conversation.history.iter_from(summary_upto - conversation.history.offset)
+    assert sent == [content for _, content in unsummarized]
+    for content in sent:
+        assert content not in conversation.summary
+    expected = sum(message_tokens(content) for content in sent) + 10 + estimate_tokens(conversation.summary)
+    assert packed.tokens_after == expected
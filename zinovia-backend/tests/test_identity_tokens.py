@@ -0,0 +1,137 @@
+import asyncio
+import base64
+import json
+import threading
+
+import pytest
+
+from app.chatbot.identity_tokens import DEFAULT_TOKEN_LIFETIME_SECONDS, IdentityTokenCache, decode_token_expiry
+
+NOW = 1_000_000.0
+
+
+def _jwt(expires_at: float, name: str = "token") -> str:
+    claims = base64.urlsafe_b64encode(json.dumps({"exp": expires_at, "sub": name}).encode()).rstrip(b"=")
+    return f"header.{claims.decode()}.signature"
+
+
+class TokenServer:
+    """Mints a new token per fetch, valid for ``lifetime`` seconds from the fake clock."""
+
+    def __init__(self, clock, lifetime: float = 3600.0) -> None:
+        self.clock = clock
+        self.lifetime = lifetime
+        self.fetches = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def fetch(self, audience: str) -> str:
+        self.release.wait(5)
+        self.fetches += 1
+        return _jwt(self.clock[0] + self.lifetime, name=f"{audience}-{self.fetches}")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [NOW]
+    monkeypatch.setattr("app.chatbot.identity_tokens.time.time", lambda: now[0])
+    return now
+
+
+def test_decode_token_expiry():
+    assert decode_token_expiry(_jwt(NOW + 60)) == NOW + 60
+    assert decode_token_expiry("not-a-jwt") is None
+    no_exp = base64.urlsafe_b64encode(b'{"sub": "token"}').decode()
+    assert decode_token_expiry(f"header.{no_exp}.signature") is None
+
+
+def test_token_is_reused_until_the_refresh_window(clock):
+    server = TokenServer(clock)
+
+    async def scenario():
+        cache = IdentityTokenCache(server.fetch, refresh_margin_seconds=300)
+        first = await cache.get_token("https://llm")
+        clock[0] += 3000
+        again = await cache.get_token("https://llm")
+        return cache, first, again
+
+    cache, first, again = asyncio.run(scenario())
+
+    assert first == again
+    assert server.fetches == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "refreshes": 1, "failures": 0, "cached_audiences": 1}
+
+
+def test_token_in_refresh_window_is_served_while_replaced_in_background(clock):
+    server = TokenServer(clock)
+
+    async def scenario():
+        cache = IdentityTokenCache(server.fetch, refresh_margin_seconds=300)
+        first = await cache.get_token("https://llm")
+        clock[0] += 3400  # 200s left: inside the margin, still valid
+        server.release.clear()
+        served = await cache.get_token("https://llm")
+        assert served == first
+        server.release.set()
+        await cache._inflight["https://llm"]
+        return first, await cache.get_token("https://llm")
+
+    first, refreshed = asyncio.run(scenario())
+
+    assert refreshed != first
+    assert server.fetches == 2
+
+
+def test_concurrent_misses_share_one_fetch(clock):
+    server = TokenServer(clock)
+
+    async def scenario():
+        cache = IdentityTokenCache(server.fetch)
+        return await asyncio.gather(*(cache.get_token("https://llm") for _ in range(5)))
+
+    tokens = asyncio.run(scenario())
+
+    assert len(set(tokens)) == 1
+    assert server.fetches == 1
+
+
+def test_expired_token_is_fetched_again(clock):
+    server = TokenServer(clock)
+
+    async def scenario():
+        cache = IdentityTokenCache(server.fetch, min_validity_seconds=30)
+        first = await cache.get_token("https://llm")
+        clock[0] += 3580  # 20s left: too little to send with a request
+        return first, await cache.get_token("https://llm")
+
+    first, second = asyncio.run(scenario())
+
+    assert first != second
+    assert server.fetches == 2
+
+
+def test_token_without_expiry_gets_the_default_lifetime(clock):
+    async def scenario():
+        cache = IdentityTokenCache(lambda audience: "opaque-token")
+        await cache.get_token("https://llm")
+        return cache
+
+    cache = asyncio.run(scenario())
+
+    assert cache._tokens["https://llm"].expires_at == NOW + DEFAULT_TOKEN_LIFETIME_SECONDS
+
+
+def test_failed_fetch_is_raised_and_counted(clock):
+    def fail(audience: str) -> str:
+        raise RuntimeError("metadata server unreachable")
+
+    async def scenario():
+        cache = IdentityTokenCache(fail)
+        with pytest.raises(RuntimeError):
+            await cache.get_token("https://llm")
+        return cache
+
+    cache = asyncio.run(scenario())
+
+    assert cache.stats()["failures"] == 1
+    assert cache.stats()["cached_audiences"] == 0
@@ -0,0 +1,199 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from app.chatbot.knowledge_base import ContextCache, KnowledgeBase
+
+PRICING = """# Pricing
+
+## Packages
+
+Pricing packages start with a fixed-fee discovery sprint.
+"""
+
+SECURITY = """# Security
+
+## Compliance
+
+Security reviews cover encryption, access control and compliance audits.
+"""
+
+
+def _write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def _knowledge_base(tmp_path: Path, **options) -> KnowledgeBase:
+    return KnowledgeBase(tmp_path / "docs", index_path=tmp_path / "knowledge.idx", **options)
+
+
+def _documents(results) -> list:
+    return [passage.document for passage in results]
+
+
+def test_indexes_every_markdown_file_under_the_directory(tmp_path):
+    _write(tmp_path / "docs" / "pricing.md", PRICING)
+    _write(tmp_path / "docs" / "policies" / "security.md", SECURITY)
+    _write(tmp_path / "docs" / "notes.txt", "pricing encryption")
+
+    knowledge_base = _knowledge_base(tmp_path)
+
+    assert _documents(knowledge_base.search("pricing packages", limit=1)) == ["pricing.md"]
+    assert _documents(knowledge_base.search("encryption audits", limit=1)) == ["policies/security.md"]
+    assert knowledge_base.snapshot().version == 1
+
+
+def test_refresh_picks_up_added_edited_and_removed_documents(tmp_path):
+    _write(tmp_path / "docs" / "pricing.md", PRICING)
+    knowledge_base = _knowledge_base(tmp_path, reload_interval_seconds=0)
+    assert knowledge_base.search("encryption") == []
+
+    _write(tmp_path / "docs" / "security.md", SECURITY)
+    assert knowledge_base.refresh()
+    assert _documents(knowledge_base.search("encryption")) == ["security.md"]
+
+    _write(tmp_path / "docs" / "security.md", SECURITY.replace("encryption", "hashing"))
+    assert knowledge_base.refresh()
+    assert knowledge_base.search("encryption") == []
+
+    (tmp_path / "docs" / "security.md").unlink()
+    assert knowledge_base.refresh()
+    assert knowledge_base.search("hashing") == []
+    assert knowledge_base.snapshot().version == 4
+
+
+def test_touched_but_unchanged_document_is_not_reindexed(tmp_path):
+    path = tmp_path / "docs" / "pricing.md"
+    _write(path, PRICING)
+    knowledge_base = _knowledge_base(tmp_path, reload_interval_seconds=0)
+    knowledge_base.snapshot()
+    reindexed = knowledge_base.documents_reindexed
+
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert not knowledge_base.refresh()
+    assert knowledge_base.documents_reindexed == reindexed
+    assert knowledge_base.snapshot().version == 1
+
+
+def test_changes_are_reloaded_in_the_background(tmp_path):
+    _write(tmp_path / "docs" / "pricing.md", PRICING)
+    knowledge_base = _knowledge_base(tmp_path, reload_interval_seconds=0.01)
+    first = knowledge_base.snapshot()
+
+    _write(tmp_path / "docs" / "security.md", SECURITY)
+    time.sleep(0.02)
+    # The caller keeps the published snapshot while the rescan runs in a thread.
+    assert knowledge_base.snapshot() is first
+
+    deadline = time.monotonic() + 5
+    while knowledge_base.reloads < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert knowledge_base.snapshot().version == 2
+    assert _documents(knowledge_base.search("encryption")) == ["security.md"]
+
+
+
+def test_search_batch_matches_single_searches(tmp_path):
+    _write(tmp_path / "docs" / "pricing.md", PRICING)
+    _write(tmp_path / "docs" / "security.md", SECURITY)
+    knowledge_base = _knowledge_base(tmp_path)
+    queries = ["pricing packages", "encryption audits", "nothing relevant here"]
+
+    batched = knowledge_base.search_batch(queries, limit=1)
+
+    assert batched == [knowledge_base.search(query, limit=1) for query in queries]
+    assert [_documents(results) for results in batched] == [["pricing.md"], ["security.md"], []]
+
+
+def test_second_process_maps_the_written_index_file(tmp_path):
+    _write(tmp_path / "docs" / "pricing.md", PRICING)
+    _write(tmp_path / "docs" / "security.md", SECURITY)
+    builder = _knowledge_base(tmp_path)
+    builder.snapshot()
+
+    worker = _knowledge_base(tmp_path)
+
+    assert worker.search_batch(["pricing packages", "encryption"]) == builder.search_batch(
+        ["pricing packages", "encryption"]
+    )
+    assert (builder.index_file_writes, builder.index_file_loads) == (1, 0)
+    assert (worker.index_file_writes, worker.index_file_loads) == (0, 1)
+    assert worker.documents_reindexed == 0
+
+
+def test_edit_after_mapping_reindexes_only_the_changed_document(tmp_path):
+    _write(tmp_path / "docs" / "pricing.md", PRICING)
+    _write(tmp_path / "docs" / "security.md", SECURITY)
+    _knowledge_base(tmp_path).snapshot()
+    worker = _knowledge_base(tmp_path, reload_interval_seconds=0)
+    worker.snapshot()
+
+    _write(tmp_path / "docs" / "security.md", SECURITY.replace("encryption", "hashing"))
+    assert worker.refresh()
+
+    assert worker.documents_reindexed == 1
+    assert _documents(worker.search("hashing", limit=1)) == ["security.md"]
+    assert _documents(worker.search("pricing packages", limit=1)) == ["pricing.md"]
+    assert worker.index_file_writes == 1
+
+
+def test_stale_index_file_is_rebuilt(tmp_path):
+    _write(tmp_path / "docs" / "pricing.md", PRICING)
+    _knowledge_base(tmp_path).snapshot()
+    _write(tmp_path / "docs" / "security.md", SECURITY)
+
+    worker = _knowledge_base(tmp_path)
+
+    assert _documents(worker.search("encryption", limit=1)) == ["security.md"]
+    assert (worker.index_file_loads, worker.index_file_writes) == (0, 1)
+
+
+def test_build_context_is_memoized_per_normalized_query(tmp_path, monkeypatch):
+    _write(tmp_path / "docs" / "pricing.md", PRICING)
+    knowledge_base = _knowledge_base(tmp_path, reload_interval_seconds=0)
+    first = knowledge_base.build_context("What are your pricing packages?")
+
+    def fail(*args):
+        raise AssertionError("scored a memoized query")
+
+    monkeypatch.setattr(knowledge_base, "_score", fail)
+    again = knowledge_base.build_context("  what are your PRICING packages ")
+
+    assert again == first and first[1]
+    assert knowledge_base.stats()["context_cache"]["hits"] == 1
+
+
+def test_new_snapshot_invalidates_memoized_contexts(tmp_path):
+    _write(tmp_path / "docs" / "pricing.md", PRICING)
+    knowledge_base = _knowledge_base(tmp_path, reload_interval_seconds=0)
+    assert knowledge_base.build_context("encryption")[1] is False
+
+    _write(tmp_path / "docs" / "security.md", SECURITY)
+    assert knowledge_base.refresh()
+    text, matched = knowledge_base.build_context("encryption")
+
+    assert matched and "encryption" in text
+    assert knowledge_base.stats()["context_cache"]["invalidations"] == 1
+
+
+def test_context_cache_evicts_least_recently_used():
+    cache = ContextCache(max_entries=2)
+    cache.put(1, "a", ("A", True))
+    cache.put(1, "b", ("B", True))
+    cache.get(1, "a")
+    cache.put(1, "c", ("C", True))
+
+    assert cache.get(1, "b") is None
+    assert cache.get(1, "a") == ("A", True)
+    assert cache.stats()["evictions"] == 1
+    assert cache.get(2, "a") is None
+    assert cache.stats()["size"] == 0
+
+def test_missing_directory_fails_the_first_load(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        _knowledge_base(tmp_path).snapshot()
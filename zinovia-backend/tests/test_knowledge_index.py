@@ -0,0 +1,156 @@
+import math
+import struct
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from app.chatbot.knowledge_index import (
+    BM25_B,
+    BM25_K1,
+    INDEX_FORMAT_VERSION,
+    BM25Index,
+    IndexFileError,
+    read_index_file,
+    top_k,
+    write_index_file,
+)
+from app.chatbot.text_processing import analyze
+
+DOCUMENTS = [
+    "Pricing packages start with a fixed-fee discovery sprint.",
+    "Security reviews cover encryption, access control and compliance audits.",
+    "Cloud migration moves workloads to managed cloud platforms with cloud cost reviews.",
+    "Our AI assistants answer customer questions and hand over to support staff.",
+    "",
+]
+QUERIES = ["cloud cost", "", "pricing packages", "unknown words", "encryption compliance audits", "customer support"]
+
+
+def _reference_scores(documents, query):
+    """Textbook BM25, one section at a time."""
+    analyzed = [analyze(text) for text in documents]
+    average_length = sum(map(len, analyzed)) / len(analyzed)
+    scores = []
+    for terms in analyzed:
+        counts = Counter(terms)
+        score = 0.0
+        for term in set(analyze(query)):
+            frequency = sum(1 for other in analyzed if term in other)
+            if not counts[term]:
+                continue
+            idf = math.log1p((len(analyzed) - frequency + 0.5) / (frequency + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * len(terms) / average_length)
+            score += idf * counts[term] * (BM25_K1 + 1) / (counts[term] + norm)
+        scores.append(score)
+    return scores
+
+
+@pytest.mark.parametrize(
+    "query", ["cloud cost", "pricing packages", "encryption compliance", "customer support", "unknown words"]
+)
+def test_scores_match_textbook_bm25(query):
+    index = BM25Index.build(DOCUMENTS)
+
+    np.testing.assert_allclose(index.scores(query), _reference_scores(DOCUMENTS, query), rtol=1e-5)
+
+
+def test_search_ranks_positive_scores_best_first():
+    index = BM25Index.build(DOCUMENTS)
+
+    results = index.search("cloud reviews", limit=3)
+
+    assert [doc_id for _, doc_id in results] == [2, 1]
+    assert results[0][0] > results[1][0] > 0
+    assert index.search("unknown words", limit=3) == []
+
+
+def test_postings_are_grouped_by_term_with_ascending_sections():
+    index = BM25Index.build(DOCUMENTS)
+
+    for term, row in index.vocabulary.items():
+        sections = index.doc_ids[index.indptr[row] : index.indptr[row + 1]]
+        assert list(sections) == sorted(sections)
+        assert list(sections) == [doc_id for doc_id, text in enumerate(DOCUMENTS) if term in analyze(text)]
+    assert len(index) == len(DOCUMENTS)
+
+
+def test_section_term_counts_round_trip():
+    index = BM25Index.build(DOCUMENTS)
+
+    assert index.section_term_counts() == [Counter(analyze(text)) for text in DOCUMENTS]
+
+
+def test_top_k_breaks_ties_by_document_order():
+    scores = np.array([0.5, 2.0, 0.0, 2.0, 1.0], dtype=np.float32)
+
+    assert top_k(scores, 3) == [(2.0, 1), (2.0, 3), (1.0, 4)]
+    assert top_k(scores, 10) == [(2.0, 1), (2.0, 3), (1.0, 4), (0.5, 0)]
+    assert top_k(scores, 0) == []
+
+
+@pytest.mark.parametrize("batch_rows", [512, 2])
+def test_batched_scores_match_single_queries(monkeypatch, batch_rows):
+    monkeypatch.setattr("app.chatbot.knowledge_index._BATCH_ROWS", batch_rows)
+    index = BM25Index.build(DOCUMENTS)
+
+    matrix = index.score_matrix(QUERIES)
+
+    assert matrix.shape == (len(QUERIES), len(DOCUMENTS))
+    for row, query in zip(matrix, QUERIES):
+        np.testing.assert_array_equal(row, index.scores(query))
+    assert not matrix[1].any() and not matrix[3].any()
+    assert index.search_batch(QUERIES, limit=2) == [index.search(query, limit=2) for query in QUERIES]
+
+
+def test_repeated_query_terms_score_once():
+    index = BM25Index.build(DOCUMENTS)
+
+    np.testing.assert_array_equal(index.scores("cloud cloud cloud"), index.scores("cloud"))
+
+
+def test_index_file_round_trips_as_read_only_aligned_arrays(tmp_path):
+    index = BM25Index.build(DOCUMENTS)
+    arrays = {**index.arrays(), "ngrams": np.random.default_rng(0).random((5, 8), dtype=np.float32)}
+    path = tmp_path / "knowledge.idx"
+
+    write_index_file(path, arrays, {"vocabulary": index.terms(), "passages": len(index)})
+    loaded, metadata = read_index_file(path)
+
+    assert metadata == {"vocabulary": index.terms(), "passages": len(index)}
+    for name, array in arrays.items():
+        np.testing.assert_array_equal(loaded[name], array)
+        assert loaded[name].dtype == array.dtype
+        assert not loaded[name].flags.writeable
+        assert loaded[name].ctypes.data % 64 == 0
+    mapped = BM25Index.from_terms(metadata["vocabulary"], loaded, metadata["passages"])
+    assert mapped.search_batch(QUERIES, limit=3) == index.search_batch(QUERIES, limit=3)
+    assert list(tmp_path.iterdir()) == [path]
+
+
+@pytest.mark.parametrize(
+    "damage, message",
+    [
+        (lambda data: b"NOPE" + data[4:], "not a knowledge index"),
+        (lambda data: data[:4] + struct.pack("<I", INDEX_FORMAT_VERSION + 1) + data[8:], "format version"),
+        (lambda data: data[:-8], "truncated"),
+        (lambda data: data[:6], "truncated"),
+    ],
+)
+def test_damaged_index_file_is_rejected(tmp_path, damage, message):
+    path = tmp_path / "knowledge.idx"
+    write_index_file(path, BM25Index.build(DOCUMENTS).arrays(), {})
+    path.write_bytes(damage(path.read_bytes()))
+
+    with pytest.raises(IndexFileError, match=message):
+        read_index_file(path)
+
+
+def test_missing_index_file_is_an_index_file_error(tmp_path):
+    with pytest.raises(IndexFileError):
+        read_index_file(tmp_path / "missing.idx")
+
+
+def test_unsupported_dtype_is_not_written(tmp_path):
+    with pytest.raises(ValueError):
+        write_index_file(tmp_path / "knowledge.idx", {"values": np.zeros(3, dtype=np.float64)}, {})
@@ -0,0 +1,134 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.chatbot.llm_client import OpenAICompatibleLLMClient
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+class FakeUpstream:
+    """Answers the LLM client's requests in-process and records every pooled httpx client created."""
+
+    def __init__(self) -> None:
+        self.status_code = 200
+        self.stream_body = ""
+        self.requests = []
+        self.clients = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.status_code >= 400:
+            return httpx.Response(self.status_code, text="upstream failure")
+        if json.loads(request.content).get("stream"):
+            return httpx.Response(200, text=self.stream_body)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "hi there"}}]})
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    fake = FakeUpstream()
+    real_client = httpx.AsyncClient
+
+    def make_client(**options):
+        client = real_client(transport=httpx.MockTransport(fake.handle), **options)
+        fake.clients.append(client)
+        return client
+
+    monkeypatch.setattr(httpx, "AsyncClient", make_client)
+    return fake
+
+
+def _client(**options) -> OpenAICompatibleLLMClient:
+    return OpenAICompatibleLLMClient(
+        base_url="http://llm.test/v1", api_path="/v1/chat/completions", model_name="test-model", **options
+    )
+
+
+def test_one_pooled_http_client_serves_every_call(upstream):
+    async def scenario():
+        client = _client(http2=False, api_key="secret")
+        replies = [await client.chat("system", MESSAGES) for _ in range(3)]
+        pooled = upstream.clients[0]
+        await client.aclose()
+        return replies, pooled
+
+    replies, pooled = asyncio.run(scenario())
+
+    assert replies == ["hi there"] * 3
+    assert len(upstream.clients) == 1
+    assert pooled.is_closed
+    request = upstream.requests[0]
+    assert str(request.url) == "http://llm.test/v1/chat/completions"
+    assert request.headers["Authorization"] == "Bearer secret"
+    assert json.loads(request.content) == {
+        "model": "test-model",
+        "messages": [{"role": "system", "content": "system"}, *MESSAGES],
+    }
+
+
+def test_closed_client_is_recreated_on_next_call(upstream):
+    async def scenario():
+        client = _client(http2=False)
+        await client.chat("system", MESSAGES)
+        await client.aclose()
+        await client.chat("system", MESSAGES)
+        await client.aclose()
+
+    asyncio.run(scenario())
+
+    assert len(upstream.clients) == 2
+
+
+def test_upstream_error_status_maps_to_502(upstream):
+    upstream.status_code = 500
+
+    async def scenario():
+        client = _client(http2=False)
+        try:
+            with pytest.raises(HTTPException) as excinfo:
+                await client.chat("system", MESSAGES)
+        finally:
+            await client.aclose()
+        return excinfo.value
+
+    assert asyncio.run(scenario()).status_code == 502
+
+
+def _stream(client: OpenAICompatibleLLMClient):
+    async def scenario():
+        try:
+            return [delta async for delta in client.stream_chat("system", MESSAGES)]
+        finally:
+            await client.aclose()
+
+    return asyncio.run(scenario())
+
+
+def test_stream_chat_relays_openai_sse_deltas(upstream):
+    chunks = [
+        {"choices": [{"delta": {"role": "assistant"}}]},
+        {"choices": [{"delta": {"content": "hi"}}]},
+        {"choices": [{"delta": {"content": " there"}}]},
+        {"choices": [], "usage": {"prompt_tokens": 12, "prompt_tokens_details": {"cached_tokens": 8}}},
+    ]
+    upstream.stream_body = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks)
+    upstream.stream_body += ": keep-alive\n\ndata: [DONE]\n\ndata: {\"ignored\": true}\n\n"
+    client = _client(http2=False)
+
+    assert _stream(client) == ["hi", " there"]
+    assert json.loads(upstream.requests[0].content)["stream"] is True
+    assert client.stats()["prefix_cache"]["cached_tokens"] == 8
+
+
+def test_stream_chat_relays_ollama_ndjson_deltas(upstream):
+    chunks = [
+        {"message": {"content": "hi"}, "done": False},
+        {"message": {"content": " there"}, "done": True},
+    ]
+    upstream.stream_body = "".join(json.dumps(chunk) + "\n" for chunk in chunks)
+
+    assert _stream(_client(http2=False)) == ["hi", " there"]
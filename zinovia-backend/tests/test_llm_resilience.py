@@ -0,0 +1,170 @@
+import asyncio
+from typing import Dict, List, Optional
+
+import pytest
+from fastapi import HTTPException
+
+from app.chatbot.admission import AdmissionController, AdmissionLLMClient
+from app.chatbot.llm_client import BaseLLMClient, CircuitBreaker, CircuitOpenError, ResilientLLMClient
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+class SlowFirstCallClient(BaseLLMClient):
+    """The first call takes ``first_delay`` seconds, later calls ``delay``; tracks peak concurrency."""
+
+    def __init__(self, first_delay: float, delay: float = 0.0) -> None:
+        self.first_delay = first_delay
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def chat(
+        self, system_prompt: str, messages: List[Dict[str, str]], *, state: Optional[str] = None
+    ) -> str:
+        self.calls += 1
+        call = self.calls
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.first_delay if call == 1 else self.delay)
+        finally:
+            self.in_flight -= 1
+        return f"call {call}"
+
+
+class FailingClient(BaseLLMClient):
+    async def chat(
+        self, system_prompt: str, messages: List[Dict[str, str]], *, state: Optional[str] = None
+    ) -> str:
+        raise RuntimeError("upstream error")
+
+
+def _warm_up(client: ResilientLLMClient, samples: int = 512, seconds: float = 0.01) -> None:
+    # A full window, so the few calls a test makes do not move the percentiles.
+    for _ in range(samples):
+        client._latencies.observe(seconds)
+
+
+def test_breaker_opens_on_failure_rate_and_recovers_through_half_open(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.chatbot.llm_client.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(window_size=4, min_calls=4, failure_rate_threshold=0.5, open_seconds=30)
+
+    for success in (True, False, True, False):
+        assert breaker.allow_request()
+        breaker.record(success, 0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    now[0] += 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # one probe at a time
+    breaker.record(True, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["rejected"] == 2
+
+
+def test_breaker_opens_on_slow_calls():
+    breaker = CircuitBreaker(min_calls=2, slow_call_seconds=1.0, slow_call_rate_threshold=1.0)
+
+    breaker.record(True, 2.0)
+    breaker.record(True, 3.0)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_open_breaker_rejects_without_calling_upstream():
+    async def scenario():
+        client = ResilientLLMClient(FailingClient(), breaker=CircuitBreaker(min_calls=2))
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await client.chat("system", MESSAGES)
+        with pytest.raises(CircuitOpenError):
+            await client.chat("system", MESSAGES)
+
+    asyncio.run(scenario())
+
+
+def test_timeout_follows_observed_latency():
+    client = ResilientLLMClient(
+        FailingClient(), timeout_multiplier=3.0, min_timeout_seconds=0.5, max_timeout_seconds=10.0
+    )
+    assert client.current_timeout() == 10.0  # too few samples yet
+
+    _warm_up(client, seconds=1.0)
+    assert client.current_timeout() == pytest.approx(3.0)
+
+    _warm_up(client, seconds=0.01)
+    assert client.current_timeout() == 0.5
+
+
+def test_slow_call_times_out_with_504():
+    async def scenario():
+        client = ResilientLLMClient(SlowFirstCallClient(first_delay=1.0), max_timeout_seconds=0.02)
+        with pytest.raises(HTTPException) as excinfo:
+            await client.chat("system", MESSAGES)
+        return client, excinfo.value
+
+    client, error = asyncio.run(scenario())
+    assert error.status_code == 504
+    assert client.timeouts == 1
+
+
+def test_hedge_wins_when_the_first_attempt_is_slow():
+    async def scenario():
+        upstream = SlowFirstCallClient(first_delay=1.0)
+        client = ResilientLLMClient(upstream, hedge_enabled=True, max_timeout_seconds=5.0)
+        _warm_up(client)
+        reply = await client.chat("system", MESSAGES)
+        return client, reply
+
+    client, reply = asyncio.run(scenario())
+    assert reply == "call 2"
+    assert (client.hedges_sent, client.hedges_won) == (1, 1)
+
+
+def test_hedge_takes_an_admission_slot():
+    async def scenario():
+        upstream = SlowFirstCallClient(first_delay=0.2, delay=0.1)
+        admission = AdmissionController(max_in_flight=2, max_queue=10)
+        resilient = ResilientLLMClient(upstream, hedge_enabled=True, admission=admission)
+        _warm_up(resilient)
+        client = AdmissionLLMClient(resilient, admission)
+
+        hedged = asyncio.ensure_future(client.chat("system", MESSAGES))
+        await asyncio.sleep(0.05)  # past the hedge delay: the hedge holds the second slot
+        assert admission.stats()["in_flight"] == 2
+        queued = asyncio.ensure_future(client.chat("system", MESSAGES))
+        await asyncio.sleep(0)
+        assert admission.queue_depth == 1
+
+        await asyncio.gather(hedged, queued)
+        return upstream, resilient, admission
+
+    upstream, resilient, admission = asyncio.run(scenario())
+    assert upstream.peak_in_flight == 2
+    # The queued call found a free slot once the first one finished, so it was hedged too.
+    assert resilient.hedges_sent == 2
+    assert admission.stats()["in_flight"] == 0
+
+
+def test_hedge_is_skipped_when_admission_is_saturated():
+    async def scenario():
+        upstream = SlowFirstCallClient(first_delay=0.1, delay=0.1)
+        admission = AdmissionController(max_in_flight=1, max_queue=10)
+        resilient = ResilientLLMClient(upstream, hedge_enabled=True, admission=admission)
+        _warm_up(resilient)
+        client = AdmissionLLMClient(resilient, admission)
+
+        replies = await asyncio.gather(*(client.chat("system", MESSAGES) for _ in range(3)))
+        return upstream, resilient, admission, replies
+
+    upstream, resilient, admission, replies = asyncio.run(scenario())
+    assert sorted(replies) == ["call 1", "call 2", "call 3"]
+    assert upstream.peak_in_flight == 1
+    assert resilient.hedges_sent == 0
+    assert resilient.hedges_skipped == 3
+    assert admission.stats()["in_flight"] == 0
@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from app.chatbot.conversation import ROLE_USER, Conversation
+from app.chatbot.memory_store import InMemorySessionStore, estimate_session_bytes
+from app.chatbot.session_store import SessionConflictError
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _conversation(text: str = "hello") -> Conversation:
+    conversation = Conversation("ASK_GOAL", goal="Automate invoices")
+    conversation.history.append(ROLE_USER, text)
+    return conversation
+
+
+def _store(clock: Clock, **options) -> InMemorySessionStore:
+    return InMemorySessionStore(clock=clock, sweep_interval_seconds=0, **options)
+
+
+def test_least_recently_used_session_is_evicted_at_the_count_cap():
+    async def scenario():
+        store = _store(Clock(), max_sessions=2)
+        await store.save("a", _conversation())
+        await store.save("b", _conversation())
+        await store.get("a")
+        await store.save("c", _conversation())
+        return store
+
+    store = asyncio.run(scenario())
+
+    assert store.lookup("b") is None
+    assert store.lookup("a") is not None and store.lookup("c") is not None
+    assert store.stats()["evictions"] == 1
+
+
+def test_byte_cap_evicts_idle_sessions_but_never_the_one_just_saved():
+    large = _conversation("x" * 1000)
+
+    async def scenario():
+        store = _store(Clock(), max_bytes=estimate_session_bytes(large) + 100)
+        await store.save("a", _conversation())
+        await store.save("big", large)
+        await store.save("bigger", _conversation("y" * 5000))
+        return store
+
+    store = asyncio.run(scenario())
+
+    assert len(store) == 1 and store.lookup("bigger") is not None
+    assert store.bytes == estimate_session_bytes(store.lookup("bigger"))
+    assert store.stats()["evictions"] == 2
+
+
+def test_idle_sessions_expire_and_access_extends_their_life():
+    clock = Clock()
+
+    async def scenario():
+        store = _store(clock, ttl_seconds=60)
+        await store.save("a", _conversation())
+        await store.save("b", _conversation())
+        clock.now += 50
+        await store.get("a")
+        clock.now += 20
+        return store, await store.get("a"), await store.get("b")
+
+    store, kept, expired = asyncio.run(scenario())
+
+    assert kept.history and not expired.history
+    assert expired.state == "GREETING"
+    assert store.stats()["expirations"] == 1
+    assert store.bytes == estimate_session_bytes(kept)
+
+
+def test_sweep_drops_only_expired_sessions_from_the_idle_end():
+    clock = Clock()
+
+    async def scenario():
+        store = _store(clock, ttl_seconds=60)
+        for session in ("a", "b", "c"):
+            await store.save(session, _conversation())
+            clock.now += 10
+        clock.now += 45  # a and b are past their TTL, c is not
+        return store
+
+    store = asyncio.run(scenario())
+
+    assert store.sweep(limit=1) == 1
+    assert store.sweep() == 1
+    assert len(store) == 1 and store.lookup("c") is not None
+
+
+def test_background_sweeper_runs_until_closed():
+    clock = Clock()
+
+    async def scenario():
+        store = InMemorySessionStore(clock=clock, ttl_seconds=1, sweep_interval_seconds=0.01)
+        await store.save("a", _conversation())
+        clock.now += 5
+        for _ in range(100):
+            if not len(store):
+                break
+            await asyncio.sleep(0.01)
+        await store.aclose()
+        return store
+
+    store = asyncio.run(scenario())
+
+    assert len(store) == 0
+    assert store.stats()["sweeps"] >= 1
+
+
+def test_get_returns_a_copy_and_stale_saves_conflict():
+    async def scenario():
+        store = _store(Clock())
+        await store.save("a", _conversation())
+        first = await store.get("a")
+        second = await store.get("a")
+        first.goal = "first"
+        await store.save("a", first)
+        second.goal = "second"
+        with pytest.raises(SessionConflictError):
+            await store.save("a", second)
+        return store
+
+    store = asyncio.run(scenario())
+
+    assert store.lookup("a").goal == "first"
+    assert store.stats()["conflicts"] == 1
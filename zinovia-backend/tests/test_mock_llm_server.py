@@ -0,0 +1,72 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.chatbot.llm_client import OpenAICompatibleLLMClient
+from benchmarks.mock_llm_server import MockConfig, PrefixCacheSimulator, create_app
+
+SYSTEM_PROMPT = "You are the Zinovia onboarding assistant. " * 20
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+@pytest.fixture
+def mock_llm(monkeypatch):
+    """An LLM client whose pooled httpx client talks to the mock server in-process."""
+    real_client = httpx.AsyncClient
+
+    def build(**config) -> OpenAICompatibleLLMClient:
+        app = create_app(MockConfig(latency_ms=0, tokens_per_second=0, reply_tokens=5, seed=1, **config))
+        monkeypatch.setattr(
+            httpx, "AsyncClient", lambda **options: real_client(transport=httpx.ASGITransport(app=app), **options)
+        )
+        return OpenAICompatibleLLMClient(
+            base_url="http://mock-llm", api_path="/v1/chat/completions", model_name="mock", http2=False
+        )
+
+    return build
+
+
+def test_plain_and_streamed_replies_match(mock_llm):
+    async def scenario():
+        client = mock_llm()
+        try:
+            reply = await client.chat(SYSTEM_PROMPT, MESSAGES)
+            streamed = [delta async for delta in client.stream_chat(SYSTEM_PROMPT, MESSAGES)]
+        finally:
+            await client.aclose()
+        return client, reply, streamed
+
+    client, reply, streamed = asyncio.run(scenario())
+
+    assert reply.startswith("[mock] Zinovia")
+    assert "".join(streamed) == reply
+    assert len(streamed) == 6
+    # The second request repeats the first one's prompt prefix.
+    prefix_cache = client.stats()["prefix_cache"]
+    assert prefix_cache["responses_with_cache_info"] == 2
+    assert prefix_cache["cached_tokens"] > 0
+
+
+def test_error_rate_surfaces_as_502(mock_llm):
+    async def scenario():
+        client = mock_llm(error_rate=1.0)
+        try:
+            with pytest.raises(HTTPException) as excinfo:
+                await client.chat(SYSTEM_PROMPT, MESSAGES)
+        finally:
+            await client.aclose()
+        return excinfo.value
+
+    assert asyncio.run(scenario()).status_code == 502
+
+
+def test_prefix_cache_counts_only_the_shared_leading_blocks():
+    cache = PrefixCacheSimulator()
+    block = PrefixCacheSimulator.BLOCK_CHARS
+    tokens_per_block = block // PrefixCacheSimulator.CHARS_PER_TOKEN
+
+    assert cache.cached_tokens("a" * block * 3) == 0
+    assert cache.cached_tokens("a" * block * 3) == 3 * tokens_per_block
+    assert cache.cached_tokens("a" * block * 2 + "b" * block) == 2 * tokens_per_block
@@ -0,0 +1,58 @@
+import numpy as np
+
+from app.chatbot.config import KnowledgeSettings
+from app.chatbot.knowledge_base import KnowledgeBase
+from app.chatbot.ngram_vectors import NgramVectorIndex, encode
+
+CORPUS = """# Services
+
+## Pricing
+
+Our pricing packages start with a fixed-fee discovery sprint.
+
+## Healthcare
+
+We build patient intake assistants for healthcare providers.
+"""
+
+
+def test_encoding_is_unit_length_and_ignores_stopwords():
+    vector = encode("integrations")
+
+    assert vector.dtype == np.float32
+    assert np.isclose(np.linalg.norm(vector), 1.0)
+    assert not encode("the and of").any()
+
+
+def test_misspelled_word_is_nearest_to_its_term():
+    terms = NgramVectorIndex.build(["integration", "infrastructure", "pricing"])
+
+    assert terms.nearest_among("integratoins", np.arange(3), 0.5) == 0
+    assert terms.nearest_among("integratoins", np.array([1, 2]), 0.5) is None
+
+
+def test_similarity_matrix_has_one_row_per_query():
+    index = NgramVectorIndex.build(["cloud migration", "data analytics"])
+
+    similarities = index.similarity_matrix(["cloud", "analytics", "zebra"])
+
+    assert similarities.shape == (3, 2)
+    assert similarities[0].argmax() == 0
+    assert similarities[1].argmax() == 1
+    assert not similarities[2].any()
+
+
+def test_hybrid_scoring_is_off_by_default():
+    assert KnowledgeSettings(_env_file=None).knowledge_hybrid_enabled is False
+
+
+def test_hybrid_mode_tolerates_typos(tmp_path):
+    corpus = tmp_path / "docs"
+    corpus.mkdir()
+    (corpus / "services.md").write_text(CORPUS, encoding="utf-8")
+
+    lexical = KnowledgeBase(corpus, index_path=tmp_path / "lexical.idx")
+    hybrid = KnowledgeBase(corpus, index_path=tmp_path / "hybrid.idx", hybrid=True)
+
+    assert lexical.search("helthcare") == []
+    assert [passage.heading for passage in hybrid.search("helthcare", limit=1)] == ["Healthcare"]
@@ -0,0 +1,80 @@
+from app.chatbot.history import estimate_tokens
+from app.chatbot.passages import GAP_MARKER, KnowledgePassage, chunk_section, pack_passages
+
+# Ten lines of five tokens each.
+LINES = [f"w{number} one two six ten" for number in range(10)]
+
+
+def _chunk(content: str, passage_tokens: int = 15, overlap_tokens: int = 5):
+    return chunk_section(
+        "guide.md", 0, "Services", content, passage_tokens=passage_tokens, overlap_tokens=overlap_tokens
+    )
+
+
+def test_windows_cover_the_section_within_budget_and_overlap():
+    assert all(estimate_tokens(line) == 5 for line in LINES)
+
+    passages = _chunk("\n".join(LINES))
+
+    windows = [(passage.start, len(passage.lines)) for passage in passages]
+    assert windows == [(0, 3), (2, 3), (4, 3), (6, 3), (8, 2)]
+    covered = {passage.start + offset for passage in passages for offset in range(len(passage.lines))}
+    assert covered == set(range(len(LINES)))
+    for passage in passages:
+        assert passage.lines == tuple(LINES[passage.start : passage.start + len(passage.lines)])
+
+
+def test_oversized_line_forms_its_own_passage_and_windows_advance():
+    long_line = " ".join(["word"] * 40)
+
+    passages = _chunk("\n".join([long_line, LINES[0], long_line]), overlap_tokens=100)
+
+    assert [passage.start for passage in passages] == [0, 1, 2]
+    assert passages[0].lines == (long_line,)
+
+
+def test_passages_carry_their_subheading_in_the_breadcrumb():
+    content = "\n".join([LINES[0], "### Pricing", LINES[1], LINES[2]])
+
+    passages = _chunk(content, passage_tokens=6, overlap_tokens=0)
+
+    assert [passage.breadcrumb for passage in passages] == [
+        ("Services",),
+        ("Services", "Pricing"),
+        ("Services", "Pricing"),
+        ("Services", "Pricing"),
+    ]
+    assert passages[1].source == "guide.md > Services > Pricing"
+
+
+def test_overlapping_passages_of_a_section_are_merged_without_repeats():
+    passages = _chunk("\n".join(LINES))
+
+    packed = pack_passages([passages[1], passages[0], passages[3]], budget_tokens=200)
+
+    lines = packed.split("\n")
+    assert lines[0] == "[Source: guide.md > Services]"
+    assert lines[1:] == LINES[0:5] + [GAP_MARKER] + LINES[6:9]
+
+
+def test_packing_stops_at_the_budget_but_keeps_the_best_passage():
+    other = KnowledgePassage("faq.md", 0, ("FAQ",), 0, ("faq answer one two",))
+    passages = _chunk("\n".join(LINES))
+
+    # The first passage costs 15 tokens plus its [Source: ...] line.
+    budget = 15 + estimate_tokens("[Source: guide.md > Services]") + 2
+    packed = pack_passages([passages[0], other], budget_tokens=budget)
+    assert "faq answer" not in packed
+    assert packed.split("\n")[1:] == LINES[0:3]
+
+    truncated = pack_passages([passages[0]], budget_tokens=11)
+    assert truncated.split("\n")[1:] == LINES[0:2]
+
+
+def test_sections_are_packed_as_separate_blocks_in_rank_order():
+    first = KnowledgePassage("faq.md", 0, ("FAQ",), 0, ("faq answer",))
+    second = KnowledgePassage("guide.md", 2, ("Support",), 0, ("support hours",))
+
+    packed = pack_passages([second, first], budget_tokens=100)
+
+    assert packed == "[Source: guide.md > Support]\nsupport hours\n\n[Source: faq.md > FAQ]\nfaq answer"
@@ -0,0 +1,62 @@
+import pytest
+
+from app.chatbot.conversation import Conversation
+from app.chatbot.memory_store import InMemorySessionStore
+from app.chatbot.prompts import STATE_PREFIXES, STATIC_PREFIX, build_system_prompt
+from app.chatbot.state import OnboardingState
+
+from .conftest import ScriptedLLMClient
+
+
+@pytest.mark.parametrize("state", list(OnboardingState))
+def test_every_state_prompt_starts_with_the_shared_static_prefix(state):
+    prompt = build_system_prompt(Conversation(state.value), "excerpt", True)
+
+    assert prompt.startswith(STATE_PREFIXES[state])
+    assert STATE_PREFIXES[state].startswith(STATIC_PREFIX)
+
+
+def test_per_turn_content_comes_after_the_state_prefix():
+    first = Conversation("ASK_GOAL", user_type="startup")
+    second = Conversation("ASK_GOAL", user_type="enterprise", summary="user: we are big")
+
+    prompts = [
+        build_system_prompt(first, "pricing excerpt", True),
+        build_system_prompt(second, "support excerpt", False),
+    ]
+
+    prefix = STATE_PREFIXES[OnboardingState.ASK_GOAL]
+    for prompt, volatile in zip(prompts, ("startup", "enterprise")):
+        assert prompt.startswith(prefix)
+        assert volatile not in prefix and volatile in prompt[len(prefix):]
+    assert prompts[1].endswith("Summary of earlier conversation:\nuser: we are big")
+
+
+def test_placeholder_instruction_is_rendered_per_turn():
+    conversation = Conversation("SHOW_SERVICES", selected_service="Cloud Migration")
+
+    prompt = build_system_prompt(conversation, "", False)
+
+    prefix = STATE_PREFIXES[OnboardingState.SHOW_SERVICES]
+    assert "{selected_service}" not in prompt
+    assert "Highlight Cloud Migration as a likely fit" in prompt[len(prefix):]
+
+
+def test_state_override_selects_the_prefix():
+    prompt = build_system_prompt(Conversation("ASK_USER_TYPE"), "", False, OnboardingState.GREETING)
+
+    assert prompt.startswith(STATE_PREFIXES[OnboardingState.GREETING])
+
+
+def test_chat_sends_the_same_prefix_to_every_session(chat_api):
+    llm = ScriptedLLMClient()
+    client = chat_api(session_store=InMemorySessionStore(), llm_client=llm)
+
+    for session_id in ("s1", "s2"):
+        client.post("/chat", json={"session_id": session_id, "message": "hello"})
+        client.post("/chat", json={"session_id": session_id, "message": "we are a startup"})
+
+    prompts = [prompt["system"] for prompt in llm.prompts]
+    assert prompts[0] == prompts[2]
+    assert prompts[1] == prompts[3]
+    assert all(prompt.startswith(STATIC_PREFIX) for prompt in prompts)
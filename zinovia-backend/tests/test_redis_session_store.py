@@ -0,0 +1,177 @@
+import asyncio
+
+import pytest
+
+from app.chatbot.conversation import ROLE_ASSISTANT, ROLE_USER, Conversation
+from app.chatbot.session_store import (
+    RedisSessionStore,
+    SessionConflictError,
+    SessionStoreUnavailableError,
+)
+
+fakeredis = pytest.importorskip("fakeredis")
+
+KEY_PREFIX = "test:session:"
+TTL_SECONDS = 600
+
+
+def _store(server, **options) -> RedisSessionStore:
+    return RedisSessionStore(
+        client=fakeredis.FakeAsyncRedis(server=server), key_prefix=KEY_PREFIX, ttl_seconds=TTL_SECONDS, **options
+    )
+
+
+def _conversation() -> Conversation:
+    conversation = Conversation("COLLECT_CONTACT_NAME", user_type="enterprise", goal="Migrate to the cloud")
+    conversation.history.extend([(ROLE_USER, "We are an enterprise"), (ROLE_ASSISTANT, "What is your goal?")])
+    conversation.summary = "user: hello"
+    conversation.summary_upto = 2
+    return conversation
+
+
+def test_saved_session_round_trips():
+    async def scenario():
+        store = _store(fakeredis.FakeServer())
+        assert (await store.get("s1")).state == "GREETING"
+
+        conversation = _conversation()
+        await store.save("s1", conversation)
+        loaded = await store.get("s1")
+
+        assert conversation.version == 1
+        assert loaded == conversation
+        assert store.stats()["hits"] == 1 and store.stats()["misses"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_large_sessions_are_compressed_and_round_trip():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        store = _store(server)
+        conversation = _conversation()
+        conversation.history.extend((ROLE_USER, f"message {index} " * 20) for index in range(20))
+
+        await store.save("s1", conversation)
+        raw = await fakeredis.FakeAsyncRedis(server=server).get(KEY_PREFIX + "s1")
+
+        assert raw.startswith(b"1|z")
+        assert len(raw) < sum(len(content) for _, content in conversation.history)
+        assert await store.get("s1") == conversation
+
+    asyncio.run(scenario())
+
+
+def test_loading_a_session_slides_its_ttl():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        store = _store(server)
+        redis = fakeredis.FakeAsyncRedis(server=server)
+        await store.save("s1", _conversation())
+        assert 0 < await redis.ttl(KEY_PREFIX + "s1") <= TTL_SECONDS
+
+        await redis.expire(KEY_PREFIX + "s1", 5)
+        await store.get("s1")
+
+        assert await redis.ttl(KEY_PREFIX + "s1") > 5
+
+    asyncio.run(scenario())
+
+
+def test_save_from_a_stale_copy_conflicts():
+    async def scenario():
+        store = _store(fakeredis.FakeServer())
+        await store.save("s1", _conversation())
+        first = await store.get("s1")
+        second = await store.get("s1")
+
+        first.goal = "first"
+        await store.save("s1", first)
+        second.goal = "second"
+        with pytest.raises(SessionConflictError) as excinfo:
+            await store.save("s1", second)
+
+        assert excinfo.value.status_code == 409
+        assert (await store.get("s1")).goal == "first"
+        assert store.stats()["conflicts"] == 1
+
+    asyncio.run(scenario())
+
+
+class _RacingClient:
+    """Lets another writer update the key between a save's WATCH and its MULTI/EXEC."""
+
+    def __init__(self, client, rival_write) -> None:
+        self._client = client
+        self._rival_write = rival_write
+
+    def pipeline(self, transaction: bool = True):
+        pipe = self._client.pipeline(transaction=transaction)
+        read_header = pipe.getrange
+
+        async def getrange(*args):
+            header = await read_header(*args)
+            await self._rival_write()
+            return header
+
+        pipe.getrange = getrange
+        return pipe
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def test_write_between_watch_and_exec_aborts_the_save():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        rival = _store(server)
+        await rival.save("s1", _conversation())
+        racing_copy = await rival.get("s1")
+        rival_copy = await rival.get("s1")
+
+        async def rival_write():
+            rival_copy.goal = "rival"
+            await rival.save("s1", rival_copy)
+
+        store = RedisSessionStore(
+            client=_RacingClient(fakeredis.FakeAsyncRedis(server=server), rival_write),
+            key_prefix=KEY_PREFIX,
+            ttl_seconds=TTL_SECONDS,
+        )
+        racing_copy.goal = "racing"
+        with pytest.raises(SessionConflictError):
+            await store.save("s1", racing_copy)
+
+        assert racing_copy.version == 1
+        assert (await rival.get("s1")).goal == "rival"
+
+    asyncio.run(scenario())
+
+
+def test_unavailable_redis_fails_loads_with_503_and_skips_saves():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        store = _store(server)
+        server.connected = False
+
+        with pytest.raises(SessionStoreUnavailableError) as excinfo:
+            await store.get("s1")
+        assert excinfo.value.status_code == 503
+
+        conversation = _conversation()
+        await store.save("s1", conversation)
+        assert conversation.version == 0
+        assert store.stats()["errors"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_chat_answers_503_when_redis_is_down(chat_api):
+    server = fakeredis.FakeServer()
+    server.connected = False
+    client = chat_api(session_store=_store(server))
+
+    response = client.post("/chat", json={"session_id": "s1", "message": "hello"})
+
+    assert response.status_code == 503
+    assert response.json() == {"detail": "Conversation storage is temporarily unavailable."}
@@ -0,0 +1,74 @@
+import json
+
+from benchmarks.replay_transcripts import ReplayStats, replay_batch, replay_conversation, replay_file
+
+COMPLETED = [
+    "Hi there!",
+    "We're a small business",
+    "We want a faster website and some automation for customer support",
+    "Sounds great, tell me more",
+    "Jane Doe",
+    "jane.doe@example.com",
+    "Thanks!",
+]
+
+
+def test_completed_conversation_walks_the_whole_funnel():
+    stats = ReplayStats()
+
+    replay_conversation(COMPLETED, stats)
+
+    assert stats.conversations == 1 and stats.messages == len(COMPLETED)
+    assert stats.ended == {"DONE": 1}
+    assert set(stats.reached) == {
+        "GREETING",
+        "ASK_USER_TYPE",
+        "ASK_GOAL",
+        "SHOW_SERVICES",
+        "COLLECT_CONTACT_NAME",
+        "COLLECT_CONTACT_EMAIL",
+        "SUMMARY",
+        "DONE",
+    }
+    assert not stats.stalled
+    assert stats.prompt_chars > 0
+
+
+def test_invalid_answer_counts_as_a_stall():
+    stats = ReplayStats()
+
+    replay_conversation(COMPLETED[:5] + ["jane at example"], stats)
+
+    assert stats.stalled == {"COLLECT_CONTACT_EMAIL": 1}
+    assert stats.ended == {"COLLECT_CONTACT_EMAIL": 1}
+
+
+def test_recorded_assistant_turns_are_history_not_messages():
+    stats = ReplayStats()
+
+    replay_conversation([{"role": "assistant", "content": "Hi!"}, {"role": "user", "content": "hello"}], stats)
+
+    assert stats.messages == 1
+    assert stats.messages_by_state == {"ASK_USER_TYPE": 1}
+
+
+def test_malformed_lines_are_skipped():
+    lines = ["not json", json.dumps({"session_id": "s1"}), json.dumps({"messages": COMPLETED})]
+
+    stats = replay_batch(lines)
+
+    assert stats.skipped_lines == 2
+    assert stats.conversations == 1
+
+
+def test_worker_pool_matches_a_single_process(tmp_path):
+    path = tmp_path / "transcripts.jsonl"
+    lines = [json.dumps({"messages": COMPLETED[:length]}) for length in range(1, len(COMPLETED) + 1)]
+    path.write_text("\n".join(lines) + "\n\n", encoding="utf-8")
+
+    single = replay_file(path, workers=1, batch_size=2, repeat=3)
+    pooled = replay_file(path, workers=2, batch_size=2, repeat=3)
+
+    assert single.conversations == pooled.conversations == 3 * len(COMPLETED)
+    for name in ("messages", "skipped_lines", "prompt_chars", "reached", "ended", "stalled", "matched_by_state"):
+        assert getattr(pooled, name) == getattr(single, name)
@@ -0,0 +1,95 @@
+import asyncio
+from typing import Dict, List
+
+import pytest
+
+from app.chatbot.reply_cache import CachingLLMClient, ReplyCache
+
+from .conftest import ScriptedLLMClient
+
+
+def _messages(text: str) -> List[Dict[str, str]]:
+    return [{"role": "assistant", "content": "What can I help with?"}, {"role": "user", "content": text}]
+
+
+def _ask(client: CachingLLMClient, text: str, *, state: str = "ASK_GOAL", system_prompt: str = "system") -> str:
+    return asyncio.run(client.chat(system_prompt, _messages(text), state=state))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.chatbot.reply_cache.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_normalized_repeat_is_served_from_cache():
+    upstream = ScriptedLLMClient()
+    client = CachingLLMClient(upstream, cacheable_states={"ASK_GOAL"})
+
+    first = _ask(client, "What do you offer?")
+    second = _ask(client, "  what do   you OFFER ")
+
+    assert second == first
+    assert len(upstream.prompts) == 1
+    assert client.stats()["reply_cache"]["hits"] == 1
+
+
+def test_different_system_prompt_is_a_different_entry():
+    upstream = ScriptedLLMClient()
+    client = CachingLLMClient(upstream, cacheable_states={"ASK_GOAL"})
+
+    _ask(client, "What do you offer?", system_prompt="knowledge: pricing")
+    _ask(client, "What do you offer?", system_prompt="knowledge: support")
+
+    assert len(upstream.prompts) == 2
+
+
+@pytest.mark.parametrize("state", ["SUMMARY", "DONE", "ASK_USER_TYPE"])
+def test_personal_and_unlisted_states_are_never_cached(state):
+    upstream = ScriptedLLMClient()
+    client = CachingLLMClient(upstream, cacheable_states={"ASK_GOAL", "SUMMARY", "DONE"})
+
+    _ask(client, "thanks", state=state)
+    _ask(client, "thanks", state=state)
+
+    assert len(upstream.prompts) == 2
+    assert client.stats()["reply_cache"]["size"] == 0
+    assert client.stats()["reply_cache"]["bypassed"] == 2
+
+
+def test_streamed_reply_is_cached_whole():
+    upstream = ScriptedLLMClient()
+    client = CachingLLMClient(upstream, cacheable_states={"ASK_GOAL"})
+
+    async def stream() -> List[str]:
+        return [delta async for delta in client.stream_chat("system", _messages("hello"), state="ASK_GOAL")]
+
+    first = asyncio.run(stream())
+    second = asyncio.run(stream())
+
+    assert first == second == ["re: hello"]
+    assert len(upstream.prompts) == 1
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ReplyCache(ttl_seconds=60)
+    cache.put("key", "reply")
+
+    clock[0] += 59
+    assert cache.get("key") == "reply"
+    clock[0] += 1
+    assert cache.get("key") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ReplyCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,128 @@
+import asyncio
+from typing import Dict, List, Optional
+
+import pytest
+from fastapi import HTTPException
+
+from app.chatbot.config import Settings
+from app.chatbot.llm_client import BaseLLMClient, CircuitBreaker, ResilientLLMClient
+from app.chatbot.routing import COMPLETE, EWMA, LEAST_OUTSTANDING, STREAM, RoutedEndpoint, RoutingLLMClient
+from app.routers.chatbot import _build_llm_client
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+class FakeClient(BaseLLMClient):
+    def __init__(self, reply: str = "ok", hang: bool = False) -> None:
+        self.reply = reply
+        self.hang = hang
+        self.calls = 0
+
+    async def chat(
+        self, system_prompt: str, messages: List[Dict[str, str]], *, state: Optional[str] = None
+    ) -> str:
+        self.calls += 1
+        if self.hang:
+            await asyncio.Event().wait()
+        return self.reply
+
+
+def _resilient(router: RoutingLLMClient) -> ResilientLLMClient:
+    # A breaker that never opens, so every call reaches the router.
+    return ResilientLLMClient(
+        router,
+        breaker=CircuitBreaker(min_calls=1000),
+        adaptive_timeout=False,
+        max_timeout_seconds=0.02,
+    )
+
+
+def test_hung_endpoint_is_ejected_after_timeouts():
+    hung = RoutedEndpoint("hung", FakeClient(hang=True))
+    fast = RoutedEndpoint("fast", FakeClient("fast"))
+    client = _resilient(RoutingLLMClient([hung, fast], eject_after_failures=3, eject_seconds=60))
+
+    async def run() -> List[str]:
+        outcomes = []
+        for _ in range(20):
+            try:
+                outcomes.append(await client.chat("system", MESSAGES))
+            except HTTPException as exc:
+                outcomes.append(exc.status_code)
+        return outcomes
+
+    outcomes = asyncio.run(run())
+
+    assert outcomes.count(504) == 3
+    assert outcomes[3:] == ["fast"] * 17
+    assert hung.errors == 3
+    assert hung.ejections == 1
+    assert hung.outstanding == 0
+    assert fast.requests == 17
+
+
+def test_cancelled_stream_counts_as_endpoint_failure():
+    hung = RoutedEndpoint("hung", FakeClient(hang=True))
+    client = _resilient(RoutingLLMClient([hung], eject_after_failures=1))
+
+    async def run() -> None:
+        async for _ in client.stream_chat("system", MESSAGES):
+            pass
+
+    with pytest.raises(HTTPException):
+        asyncio.run(run())
+    assert hung.errors == 1
+    assert hung.ejections == 1
+    assert hung.outstanding == 0
+
+
+def test_unmeasured_endpoint_is_scored_at_the_pool_mean():
+    quick = RoutedEndpoint("quick", FakeClient())
+    slow = RoutedEndpoint("slow", FakeClient())
+    new = RoutedEndpoint("new", FakeClient())
+    quick.record_success(0.1, COMPLETE)
+    slow.record_success(0.3, COMPLETE)
+    router = RoutingLLMClient([new, slow, quick])
+
+    assert router._select(COMPLETE) is quick
+    # Nothing measured for streams yet: every endpoint is sampled alike.
+    assert router._select(STREAM) is new
+
+
+def test_outstanding_call_counts_for_its_elapsed_time():
+    endpoint = RoutedEndpoint("replica", FakeClient())
+    started = endpoint.begin()
+
+    assert endpoint.score(EWMA, COMPLETE, started + 2.0) == pytest.approx(4.0)
+    endpoint.end(started)
+    assert endpoint.score(EWMA, COMPLETE, started + 2.0) == 0.0
+
+
+def test_least_outstanding_prefers_idle_endpoint():
+    busy = RoutedEndpoint("busy", FakeClient())
+    idle = RoutedEndpoint("idle", FakeClient())
+    router = RoutingLLMClient([busy, idle], strategy=LEAST_OUTSTANDING)
+    busy.begin()
+
+    assert router._select(COMPLETE) is idle
+
+
+def test_unnamed_endpoints_do_not_expose_their_url():
+    settings = Settings(
+        _env_file=None,
+        LLM_MODEL_NAME="test-model",
+        LLM_ENDPOINTS=[
+            {"base_url": "https://internal-replica-a.example"},
+            {"name": "named", "base_url": "https://internal-replica-b.example"},
+        ],
+        LLM_BREAKER_ENABLED=False,
+        LLM_ADMISSION_ENABLED=False,
+        LLM_COALESCING_ENABLED=False,
+        LLM_REPLY_CACHE_ENABLED=False,
+    )
+    client = _build_llm_client(settings)
+    try:
+        assert list(client.stats()["routing"]["endpoints"]) == ["endpoint-0", "named"]
+        assert "internal-replica" not in str(client.stats())
+    finally:
+        asyncio.run(client.aclose())
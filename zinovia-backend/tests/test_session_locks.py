@@ -0,0 +1,139 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.chatbot.memory_store import InMemorySessionStore
+from app.chatbot.session_locks import SessionLocks
+from app.chatbot.session_store import SessionConflictError
+
+from .conftest import ScriptedLLMClient, make_settings
+
+
+class GatedLLMClient(ScriptedLLMClient):
+    """Holds the reply to each of ``messages`` until its gate is set."""
+
+    def __init__(self, *messages: str) -> None:
+        super().__init__(self._wait_for_gate)
+        self.gates = {message: asyncio.Event() for message in messages}
+
+    async def _wait_for_gate(self, message: str) -> None:
+        await self.gates[message].wait()
+
+
+async def _wait_until(condition) -> None:
+    for _ in range(500):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def _client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def _post(client: httpx.AsyncClient, message: str):
+    return asyncio.ensure_future(client.post("/chat", json={"session_id": "s1", "message": message}))
+
+
+def test_concurrent_turns_of_one_session_queue_and_both_are_kept(chat_app):
+    store = InMemorySessionStore()
+    locks = SessionLocks(timeout_seconds=5)
+
+    async def scenario():
+        llm = GatedLLMClient("hello", "we are a startup")
+        async with _client(chat_app(session_store=store, llm_client=llm, session_locks=locks)) as client:
+            first = _post(client, "hello")
+            await _wait_until(lambda: len(llm.prompts) == 1)
+            second = _post(client, "we are a startup")
+            await _wait_until(lambda: locks.stats()["contended"] == 1)
+            # The second turn waits on the lock, not on the LLM.
+            assert len(llm.prompts) == 1
+
+            for gate in llm.gates.values():
+                gate.set()
+            responses = await asyncio.gather(first, second)
+        return responses
+
+    responses = asyncio.run(scenario())
+
+    assert [response.status_code for response in responses] == [200, 200]
+    conversation = asyncio.run(store.get("s1"))
+    assert [content for _, content in conversation.history] == [
+        "hello",
+        "re: hello",
+        "we are a startup",
+        "re: we are a startup",
+    ]
+    assert conversation.version == 2
+    assert len(locks) == 0
+
+
+def test_turn_waiting_past_the_lock_timeout_gets_409(chat_app):
+    store = InMemorySessionStore()
+    locks = SessionLocks(timeout_seconds=0.05)
+
+    async def scenario():
+        llm = GatedLLMClient("hello")
+        async with _client(chat_app(session_store=store, llm_client=llm, session_locks=locks)) as client:
+            first = _post(client, "hello")
+            await _wait_until(lambda: len(llm.prompts) == 1)
+            second = await client.post("/chat", json={"session_id": "s1", "message": "hello again"})
+            llm.gates["hello"].set()
+            return await first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first.status_code == 200
+    assert second.status_code == 409
+    assert "still being processed" in second.json()["detail"]
+    assert locks.stats()["timeouts"] == 1
+    assert len(locks) == 0
+
+
+def test_without_locks_the_later_save_is_rejected(chat_app):
+    store = InMemorySessionStore()
+    settings = make_settings(CHAT_SESSION_LOCK_ENABLED=False)
+
+    async def scenario():
+        llm = GatedLLMClient("hello", "hi there")
+        async with _client(chat_app(session_store=store, llm_client=llm, settings=settings)) as client:
+            first = _post(client, "hello")
+            second = _post(client, "hi there")
+            # Both turns loaded the same version before either saved.
+            await _wait_until(lambda: len(llm.prompts) == 2)
+            llm.gates["hello"].set()
+            first_response = await first
+            llm.gates["hi there"].set()
+            return first_response, await second
+
+    first, second = asyncio.run(scenario())
+
+    assert first.status_code == 200
+    assert second.status_code == 409
+    conversation = asyncio.run(store.get("s1"))
+    assert [content for _, content in conversation.history] == ["hello", "re: hello"]
+
+
+def test_lock_entries_are_removed_once_idle():
+    locks = SessionLocks(timeout_seconds=0.05)
+
+    async def scenario():
+        async with locks.hold("a"):
+            async with locks.hold("b"):
+                assert len(locks) == 2
+            assert len(locks) == 1
+            with pytest.raises(SessionConflictError):
+                async with locks.hold("a"):
+                    pass
+            assert len(locks) == 1
+        assert len(locks) == 0
+
+        with pytest.raises(RuntimeError):
+            async with locks.hold("c"):
+                raise RuntimeError("turn failed")
+        assert len(locks) == 0
+
+    asyncio.run(scenario())
+    assert locks.stats() == {"active_sessions": 0, "acquired": 3, "contended": 1, "timeouts": 1}
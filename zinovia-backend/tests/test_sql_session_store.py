@@ -0,0 +1,182 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine, event, select, text
+
+from app import main
+from app.chatbot.conversation import ROLE_ASSISTANT, ROLE_USER, Conversation
+from app.chatbot.models import ChatRequest
+from app.chatbot.session_store import SessionConflictError
+from app.chatbot.sql_session_store import SqlSessionStore
+from app.models import ChatSession
+from app.routers import chatbot
+
+TABLE = ChatSession.__table__
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sessions.db'}")
+    TABLE.create(engine)
+    yield engine
+    engine.dispose()
+
+
+def _store(engine, **options) -> SqlSessionStore:
+    # Flushes only happen when a test calls flush() or aclose().
+    return SqlSessionStore(engine=engine, flush_interval_seconds=3600, prune_interval_seconds=3600, **options)
+
+
+def _conversation(goal: str = "Automate invoices") -> Conversation:
+    conversation = Conversation("COLLECT_CONTACT_NAME", user_type="small_business", goal=goal)
+    conversation.history.extend([(ROLE_USER, "We are a small business"), (ROLE_ASSISTANT, "What is your goal?")])
+    return conversation
+
+
+def _rows(engine):
+    with engine.connect() as connection:
+        return {row.session_id: row for row in connection.execute(select(TABLE))}
+
+
+def test_saves_are_written_behind_in_one_flush(engine):
+    async def scenario():
+        store = _store(engine)
+        for session in ("s1", "s2"):
+            await store.save(session, _conversation())
+        again = await store.get("s1")
+        again.goal = "Cloud migration"
+        await store.save("s1", again)
+        assert _rows(engine) == {}
+        assert store.stats()["pending_writes"] == 2
+
+        assert await store.flush() == 2
+        await store.aclose()
+        return store
+
+    store = asyncio.run(scenario())
+
+    rows = _rows(engine)
+    assert sorted(rows) == ["s1", "s2"]
+    assert (rows["s1"].state, rows["s1"].version) == ("COLLECT_CONTACT_NAME", 2)
+    assert store.stats()["flushes"] == 1 and store.stats()["rows_written"] == 2
+
+
+def test_reloaded_session_keeps_its_version(engine):
+    async def scenario():
+        writer = _store(engine)
+        first = _conversation()
+        await writer.save("s1", first)
+        stale = first.copy()
+        await writer.save("s1", first)
+        await writer.aclose()
+
+        # A new process: empty cache, the session comes back from the table.
+        reader = _store(engine)
+        loaded = await reader.get("s1")
+        assert loaded == first
+        assert loaded.version == 2
+        assert reader.stats()["db_hits"] == 1
+
+        with pytest.raises(SessionConflictError):
+            await reader.save("s1", stale)
+        await reader.save("s1", loaded)
+        await reader.aclose()
+
+    asyncio.run(scenario())
+    assert _rows(engine)["s1"].version == 3
+
+
+def test_rejected_row_does_not_hold_back_its_batch(engine):
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TRIGGER reject_bad BEFORE INSERT ON chat_sessions WHEN NEW.session_id LIKE 'bad%' "
+                "BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+            )
+        )
+
+    async def scenario():
+        store = _store(engine)
+        for session in ("good-1", "bad-1", "good-2"):
+            await store.save(session, _conversation())
+        written = await store.flush()
+        await store.aclose()
+        return store, written
+
+    store, written = asyncio.run(scenario())
+
+    assert written == 2
+    assert sorted(_rows(engine)) == ["good-1", "good-2"]
+    assert store.stats()["rows_rejected"] == 1
+    assert store.stats()["pending_writes"] == 0
+
+
+def test_failed_flush_keeps_rows_for_the_next_attempt(engine):
+    broken = {"on": True}
+
+    @event.listens_for(engine, "begin")
+    def fail_while_broken(connection):
+        if broken["on"]:
+            raise ConnectionError("database unreachable")
+
+    async def scenario():
+        store = _store(engine)
+        await store.save("s1", _conversation())
+        assert await store.flush() == 0
+        assert store.stats()["flush_errors"] == 1
+        assert store.stats()["pending_writes"] == 1
+
+        broken["on"] = False
+        assert await store.flush() == 1
+        await store.aclose()
+
+    asyncio.run(scenario())
+    assert list(_rows(engine)) == ["s1"]
+
+
+def test_unflushed_sessions_are_served_after_cache_eviction(engine):
+    async def scenario():
+        store = _store(engine, cache_max_sessions=1)
+        first = _conversation("first")
+        await store.save("s1", first)
+        await store.save("s2", _conversation("second"))
+
+        loaded = await store.get("s1")
+        assert loaded.goal == "first"
+        assert loaded.version == 1
+        assert store.stats()["db_reads"] == 0
+        await store.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_session_id_is_bounded_to_the_column_width():
+    assert ChatRequest(session_id="s" * 128, message="hi").session_id == "s" * 128
+    with pytest.raises(ValidationError):
+        ChatRequest(session_id="s" * 129, message="hi")
+
+
+def test_shutdown_closes_the_session_store_when_the_llm_client_fails(monkeypatch):
+    closed = []
+
+    async def load_knowledge_base():
+        return None
+
+    async def close_llm_client():
+        raise RuntimeError("close failed")
+
+    async def close_session_store():
+        closed.append("sessions")
+
+    monkeypatch.setattr(chatbot, "load_knowledge_base", load_knowledge_base)
+    monkeypatch.setattr(chatbot, "close_llm_client", close_llm_client)
+    monkeypatch.setattr(chatbot, "close_session_store", close_session_store)
+
+    async def run_lifespan():
+        async with main.lifespan(main.app):
+            pass
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_lifespan())
+    assert closed == ["sessions"]